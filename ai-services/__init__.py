@@ -1 +1 @@
-# AI Services Package
+# AI Services Package
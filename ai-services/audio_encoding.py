@@ -0,0 +1,160 @@
+from typing import Any, BinaryIO, Dict, List, Optional, Union
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+
+# Output format: (libsndfile format, subtype, file extension, media type)
+FORMATS = {
+    "wav": ("WAV", "PCM_16", "wav", "audio/wav"),
+    "flac": ("FLAC", "PCM_16", "flac", "audio/flac"),
+    "ogg": ("OGG", "VORBIS", "ogg", "audio/ogg"),
+    "opus": ("OGG", "OPUS", "opus", "audio/ogg; codecs=opus")
+}
+# Input rates the Opus encoder accepts
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+def available_formats() -> List[str]:
+    """Output formats the local libsndfile can encode"""
+    return [
+        name for name, (container, subtype, _, _) in FORMATS.items()
+        if sf.check_format(container, subtype)
+    ]
+
+def check_output(format: str, sample_rate: int, quality: Optional[float] = None) -> None:
+    """Raise ValueError unless the format, rate and quality can be encoded"""
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported audio format: {format}")
+    if format not in available_formats():
+        raise ValueError(f"Audio format not supported by the local libsndfile: {format}")
+    if format == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        raise ValueError(
+            f"Opus needs a sample rate of {', '.join(map(str, OPUS_SAMPLE_RATES))}, "
+            f"not {sample_rate}"
+        )
+    if quality is not None and not 0.0 <= quality <= 1.0:
+        raise ValueError(f"Quality must be between 0 and 1: {quality}")
+
+class _ChunkWriter:
+    """Write-only file object that hands out the bytes written so far
+    
+    Encoders that seek back to patch a header after the fact (FLAC and WAV
+    do on close) cannot change bytes already drained; those writes are
+    dropped. Ogg encoders only ever append.
+    """
+    
+    def __init__(self):
+        self.pending = bytearray()
+        self.drained = 0  # Bytes handed out, and offset of the first pending byte
+        self._position = 0
+        self.size = 0
+    
+    def write(self, data) -> int:
+        data = bytes(data)
+        start = self._position - self.drained
+        if start >= 0:
+            self.pending[start:start + len(data)] = data
+        elif start + len(data) > 0:
+            self.pending[:start + len(data)] = data[-start:]
+        self._position += len(data)
+        self.size = max(self.size, self._position)
+        return len(data)
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        origin = {0: 0, 1: self._position, 2: self.size}[whence]
+        self._position = origin + offset
+        return self._position
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def read(self, size: int = -1) -> bytes:
+        return b""
+    
+    def drain(self) -> bytes:
+        """Bytes written since the last drain"""
+        data = bytes(self.pending)
+        self.drained += len(data)
+        self.pending = bytearray()
+        return data
+
+class AudioEncoder:
+    """Incremental encoder of mono 16-bit PCM blocks
+    
+    Blocks are encoded as they are written, so the whole track never has to
+    exist as PCM. ``target`` is a path, a file object, or None to encode
+    into memory, from where ``drain`` returns the bytes produced so far.
+    ``quality`` runs from 0 (smallest) to 1 (best); None keeps the codec's
+    default. FLAC stays lossless and only trades speed for size. When the
+    track length is known up front, ``frames`` puts it in a drained FLAC
+    header, which would otherwise say the length is unknown.
+    """
+    
+    def __init__(self, target: Union[str, BinaryIO, None], sample_rate: int,
+                 format: str = "wav", quality: Optional[float] = None,
+                 frames: Optional[int] = None):
+        check_output(format, sample_rate, quality)
+        container, subtype, self.extension, self.media_type = FORMATS[format]
+        self.format = format
+        self.quality = quality
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.samples = 0
+        self.encode_seconds = 0.0
+        
+        self._path = target if isinstance(target, (str, os.PathLike)) else None
+        self._writer = _ChunkWriter() if target is None else None
+        start = time.perf_counter()
+        self._file = sf.SoundFile(
+            self._writer or target, "w", sample_rate, 1, subtype, format=container,
+            compression_level=None if quality is None else 1.0 - quality
+        )
+        self.encode_seconds += time.perf_counter() - start
+    
+    def write(self, block: np.ndarray) -> None:
+        """Encode a block of int16 samples"""
+        start = time.perf_counter()
+        self._file.write(block)
+        self.samples += len(block)
+        self.encode_seconds += time.perf_counter() - start
+    
+    def drain(self) -> bytes:
+        """Encoded bytes produced since the last drain (in-memory target only)"""
+        header = self._writer.pending
+        if self.format == "flac" and self.frames and not self._writer.drained and len(header) >= 26:
+            # STREAMINFO total samples: the low 4 bits of byte 21, then 22-25
+            header[21] = (header[21] & 0xF0) | ((self.frames >> 32) & 0x0F)
+            header[22:26] = (self.frames & 0xFFFFFFFF).to_bytes(4, "big")
+        return self._writer.drain()
+    
+    def close(self) -> Dict[str, Any]:
+        """Finish the stream and return its encoding details"""
+        if not self._file.closed:
+            start = time.perf_counter()
+            self._file.close()
+            self.encode_seconds += time.perf_counter() - start
+        return self.stats()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Format, quality, encoded size and time spent encoding"""
+        if self._writer is not None:
+            size = self._writer.size
+        elif self._path is not None and os.path.exists(self._path):
+            size = os.path.getsize(self._path)
+        else:
+            size = None
+        duration = self.samples / self.sample_rate
+        return {
+            "format": self.format,
+            "quality": self.quality,
+            "encoded_bytes": size,
+            "bitrate_kbps": round(size * 8 / duration / 1000, 1) if size and duration else None,
+            "encode_seconds": round(self.encode_seconds, 4)
+        }
+    
+    def __enter__(self) -> "AudioEncoder":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
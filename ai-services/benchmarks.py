@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+AI Services Benchmarks
+Timing comparisons between the reference and optimized rendering paths
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STRESSED_HISTORY = {"recentMoodHistory": [{"stress_level": 8, "anxiety_level": 8}]}
+
+def best_of(func, repeats):
+    """Best wall time of several runs, in seconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def render_reference_music(generator, request_data):
+    """Full-length reference pipeline: composition, effects, binaural beats"""
+    mood = request_data["mood"]
+    
+    async def run():
+        audio = await generator._create_base_composition(
+            mood, "ambient", request_data["duration"], "medium", request_data["instruments"],
+            np.random.default_rng(request_data.get("seed"))
+        )
+        audio = await generator._apply_therapeutic_effects(
+            audio, mood, request_data["personalPreferences"]["recentMoodHistory"]
+        )
+        if generator._should_add_binaural_beats(mood):
+            audio = await generator._add_binaural_beats(audio, mood)
+        return audio
+    
+    return asyncio.run(run())
+
+def bench_oscillators(args):
+    """np.sin per partial versus the phasor oscillator bank"""
+    from music_generator import TherapeuticMusicGenerator
+    
+    print(f"🎵 Oscillators: {args.duration}s tracks, best of {args.repeats}")
+    print(f"{'mood':<10} {'reference':>10} {'in-place':>10} {'phasor':>10} {'speedup':>8} {'max error':>10}")
+    
+    for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"]:
+        request_data = {
+            "mood": mood,
+            "duration": args.duration,
+            "instruments": ["strings", "piano"],
+            "personalPreferences": STRESSED_HISTORY,
+            "seed": 0
+        }
+        reference_gen = TherapeuticMusicGenerator()
+        sine_gen = TherapeuticMusicGenerator(inplace=True)
+        phasor_gen = TherapeuticMusicGenerator(oscillator="phasor")
+        
+        reference = render_reference_music(reference_gen, request_data)
+        sine_plan = sine_gen._plan_render(request_data)
+        phasor_plan = phasor_gen._plan_render(request_data)
+        phasor_audio = phasor_gen._render_track_inplace(
+            phasor_plan, phasor_gen._get_buffer_pool()
+        )[0]
+        error = float(np.max(np.abs(phasor_audio - reference)))
+        
+        reference_time = best_of(lambda: render_reference_music(reference_gen, request_data), args.repeats)
+        sine_time = best_of(
+            lambda: sine_gen._render_track_inplace(sine_plan, sine_gen._get_buffer_pool()), args.repeats
+        )
+        phasor_time = best_of(
+            lambda: phasor_gen._render_track_inplace(phasor_plan, phasor_gen._get_buffer_pool()), args.repeats
+        )
+        print(
+            f"{mood:<10} {reference_time:>9.3f}s {sine_time:>9.3f}s {phasor_time:>9.3f}s "
+            f"{reference_time / phasor_time:>7.1f}x {error:>10.1e}"
+        )
+
+def bench_sample_rates(args):
+    """Full-rate in-place rendering versus reduced-rate synthesis plus upsampling"""
+    from music_generator import TherapeuticMusicGenerator
+    
+    print(f"🎵 Render rates: {args.duration}s tracks, best of {args.repeats}")
+    print(f"{'mood':<10} {'rate':>6} {'full':>10} {'reduced':>10} {'speedup':>8} {'SNR':>8}")
+    
+    for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"]:
+        request_data = {
+            "mood": mood,
+            "duration": args.duration,
+            "instruments": ["strings", "piano"],
+            "personalPreferences": STRESSED_HISTORY,
+            "seed": 0
+        }
+        full_gen = TherapeuticMusicGenerator(inplace=True)
+        reduced_gen = TherapeuticMusicGenerator(reduced_rate=True)
+        
+        full_plan = full_gen._plan_render(request_data)
+        reduced_plan = reduced_gen._plan_render(request_data, reduce_rate=True)
+        full_audio = full_gen._render_track_inplace(full_plan, full_gen._get_buffer_pool())[0].copy()
+        reduced_audio = reduced_gen._render_track_inplace(
+            reduced_plan, reduced_gen._get_buffer_pool()
+        )[0]
+        error = reduced_audio - full_audio
+        snr_db = 10 * np.log10(np.sum(full_audio ** 2) / np.sum(error ** 2))
+        
+        full_time = best_of(
+            lambda: full_gen._render_track_inplace(full_plan, full_gen._get_buffer_pool()), args.repeats
+        )
+        reduced_time = best_of(
+            lambda: reduced_gen._render_track_inplace(reduced_plan, reduced_gen._get_buffer_pool()),
+            args.repeats
+        )
+        print(
+            f"{mood:<10} {reduced_plan['render_rate']:>6} {full_time:>9.3f}s {reduced_time:>9.3f}s "
+            f"{full_time / reduced_time:>7.1f}x {snr_db:>6.1f}dB"
+        )
+
+def bench_loop(args):
+    """Full in-place rendering versus a tiled loop of the stationary stages"""
+    from music_generator import TherapeuticMusicGenerator
+    
+    print(f"🎵 Loop: {args.duration}s tracks, best of {args.repeats}")
+    print(f"{'mood':<10} {'full':>10} {'loop':>10} {'speedup':>8} {'RMS dev':>8}")
+    
+    for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"]:
+        request_data = {
+            "mood": mood,
+            "duration": args.duration,
+            "instruments": ["strings", "piano"],
+            "personalPreferences": STRESSED_HISTORY,
+            "seed": 0
+        }
+        full_gen = TherapeuticMusicGenerator(inplace=True)
+        loop_gen = TherapeuticMusicGenerator(loop=True)
+        
+        full_plan = full_gen._plan_render(request_data)
+        loop_plan = loop_gen._plan_render(request_data)
+        full_audio = full_gen._render_track_inplace(full_plan, full_gen._get_buffer_pool())[0].copy()
+        loop_audio = loop_gen._render_track_inplace(loop_plan, loop_gen._get_buffer_pool())[0]
+        # Per-second loudness, since the snapped partials drift in phase
+        seconds = len(full_audio) // full_plan["sample_rate"]
+        full_rms, loop_rms = (
+            np.sqrt(np.mean(audio[:seconds * full_plan["sample_rate"]].reshape(seconds, -1) ** 2, axis=1))
+            for audio in (full_audio, loop_audio)
+        )
+        deviation = float(np.max(np.abs(loop_rms / full_rms - 1)))
+        
+        full_time = best_of(
+            lambda: full_gen._render_track_inplace(full_plan, full_gen._get_buffer_pool()), args.repeats
+        )
+        loop_time = best_of(
+            lambda: loop_gen._render_track_inplace(loop_plan, loop_gen._get_buffer_pool()), args.repeats
+        )
+        print(
+            f"{mood:<10} {full_time:>9.3f}s {loop_time:>9.3f}s "
+            f"{full_time / loop_time:>7.1f}x {deviation:>7.2%}"
+        )
+
+def bench_stems(args):
+    """Synthesized loops versus loops mixed from a memory-mapped stem library"""
+    import tempfile
+    from music_generator import TherapeuticMusicGenerator
+    from stems import build_stem_library
+    
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        library = build_stem_library(directory)
+        build_time = time.perf_counter() - start
+        stats = library.stats()
+        print(
+            f"🎵 Stems: {stats['stems']} stems, {stats['mapped_bytes'] / 2**20:.1f} MiB "
+            f"built in {build_time:.2f}s; {args.duration}s tracks, best of {args.repeats}"
+        )
+        print(f"{'mood':<10} {'full':>10} {'loop':>10} {'stems':>10} {'vs loop':>8}")
+        
+        full_gen = TherapeuticMusicGenerator(inplace=True)
+        loop_gen = TherapeuticMusicGenerator(loop=True)
+        stem_gen = TherapeuticMusicGenerator(stem_dir=directory)
+        for mood in TherapeuticMusicGenerator.MOODS:
+            request_data = {
+                "mood": mood,
+                "duration": args.duration,
+                "instruments": ["strings", "piano"],
+                "personalPreferences": STRESSED_HISTORY
+            }
+            # Planning included: that is where the loops are synthesized
+            full_time, loop_time, stem_time = (
+                best_of(
+                    lambda: generator._render_track_inplace(
+                        generator._plan_render(request_data), generator._get_buffer_pool()
+                    ),
+                    args.repeats
+                )
+                for generator in (full_gen, loop_gen, stem_gen)
+            )
+            print(
+                f"{mood:<10} {full_time:>9.3f}s {loop_time:>9.3f}s {stem_time:>9.3f}s "
+                f"{loop_time / stem_time:>7.1f}x"
+            )
+
+def bench_effect_curves(args):
+    """Per-operation effect chain versus cached compiled effect curves"""
+    from caching import LRUCache
+    from music_generator import TherapeuticMusicGenerator
+    
+    print(f"🎵 Effect curves: {args.duration}s tracks, best of {args.repeats}")
+    print(f"{'mood':<10} {'compile':>10} {'per-op':>10} {'cached':>10} {'speedup':>8} {'max error':>10}")
+    
+    for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"]:
+        request_data = {
+            "mood": mood,
+            "duration": args.duration,
+            "instruments": ["strings", "piano"],
+            "personalPreferences": STRESSED_HISTORY,
+            "seed": 0
+        }
+        ops_gen = TherapeuticMusicGenerator(inplace=True)
+        compiled_gen = TherapeuticMusicGenerator(compiled_effects=True, effect_cache=LRUCache())
+        
+        ops_plan = ops_gen._plan_render(request_data)
+        compiled_plan = compiled_gen._plan_render(request_data)
+        ops_audio = ops_gen._render_track_inplace(ops_plan, ops_gen._get_buffer_pool())[0].copy()
+        start = time.perf_counter()
+        compiled_audio = compiled_gen._render_track_inplace(
+            compiled_plan, compiled_gen._get_buffer_pool()
+        )[0]
+        compile_time = time.perf_counter() - start
+        error = float(np.max(np.abs(compiled_audio - ops_audio)))
+        
+        ops_time = best_of(
+            lambda: ops_gen._render_track_inplace(ops_plan, ops_gen._get_buffer_pool()), args.repeats
+        )
+        cached_time = best_of(
+            lambda: compiled_gen._render_track_inplace(compiled_plan, compiled_gen._get_buffer_pool()),
+            args.repeats
+        )
+        print(
+            f"{mood:<10} {compile_time:>9.3f}s {ops_time:>9.3f}s {cached_time:>9.3f}s "
+            f"{ops_time / cached_time:>7.1f}x {error:>10.1e}"
+        )
+
+def bench_render_pool(args):
+    """Concurrent requests on the event loop versus a process render pool"""
+    from music_generator import TherapeuticMusicGenerator
+    from workers import RenderPool
+    
+    requests = [
+        {"mood": mood, "duration": args.duration, "instruments": ["strings", "piano"], "fresh": True}
+        for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"] * 2
+    ]
+    
+    async def run_all(generator):
+        await asyncio.gather(*(generator.generate_music(request) for request in requests))
+    
+    pool = RenderPool()
+    print(f"🎵 Render pool: {len(requests)} concurrent {args.duration}s requests, "
+          f"{pool.max_workers} workers, best of {args.repeats}")
+    in_process = TherapeuticMusicGenerator()
+    pooled = TherapeuticMusicGenerator(render_pool=pool)
+    try:
+        asyncio.run(run_all(pooled))  # Start and warm the workers
+        loop_time = best_of(lambda: asyncio.run(run_all(in_process)), args.repeats)
+        pool_time = best_of(lambda: asyncio.run(run_all(pooled)), args.repeats)
+    finally:
+        pool.shutdown()
+    print(f"{'event loop':<12} {loop_time:>8.3f}s")
+    print(f"{'render pool':<12} {pool_time:>8.3f}s {loop_time / pool_time:>7.1f}x")
+
+def bench_batch(args):
+    """Sequential generate_music calls versus one vectorized batch"""
+    from caching import LRUCache
+    from music_generator import TherapeuticMusicGenerator
+    
+    requests = [
+        {"mood": mood, "duration": args.duration, "instruments": ["strings", "piano"]}
+        for mood in ["calm", "peaceful", "sad", "anxious", "happy", "energetic"] * 4
+    ]
+    
+    async def run_sequential(generator):
+        for request in requests:
+            await generator.generate_music(request)
+    
+    print(f"🎵 Batch: {len(requests)} {args.duration}s tracks, best of {args.repeats}")
+    sequential = TherapeuticMusicGenerator()
+    batched = TherapeuticMusicGenerator(effect_cache=LRUCache(max_entries=None))
+    sequential_time = best_of(lambda: asyncio.run(run_sequential(sequential)), args.repeats)
+    batch_time = best_of(lambda: asyncio.run(batched.generate_music_batch(requests)), args.repeats)
+    print(f"{'sequential':<12} {sequential_time:>8.3f}s {len(requests) / sequential_time:>8.1f} tracks/s")
+    print(f"{'batch':<12} {batch_time:>8.3f}s {len(requests) / batch_time:>8.1f} tracks/s "
+          f"{sequential_time / batch_time:>7.1f}x")
+
+def bench_art_layers(args):
+    """Full-canvas layer compositing versus bounding-box compositing"""
+    from art_generator import TherapeuticArtGenerator
+    
+    print(f"🎨 Art layers: 1024x1024 base compositions, best of {args.repeats}")
+    print(f"{'style':<12} {'full':>10} {'bounded':>10} {'speedup':>8}")
+    
+    full_gen = TherapeuticArtGenerator(bounded_layers=False)
+    bounded_gen = TherapeuticArtGenerator()
+    for style in ["abstract", "geometric", "watercolor", "minimalist", "digital"]:
+        def compose(generator):
+            asyncio.run(generator._create_base_composition(
+                "calm", style, "calm", "healing", 1.0, np.random.default_rng(0)
+            ))
+        
+        full_time = best_of(lambda: compose(full_gen), args.repeats)
+        bounded_time = best_of(lambda: compose(bounded_gen), args.repeats)
+        print(
+            f"{style:<12} {full_time:>9.3f}s {bounded_time:>9.3f}s "
+            f"{full_time / bounded_time:>7.1f}x"
+        )
+
+def bench_art_pipeline(args):
+    """PIL image per stage versus one pixel array rendered in place"""
+    from art_generator import TherapeuticArtGenerator
+    
+    print(f"🎨 Art pipeline: 1024x1024 renders with every effect, best of {args.repeats}")
+    print(f"{'style/mood':<20} {'pil':>10} {'array':>10} {'speedup':>8} {'copies':>7}")
+    
+    pil_gen = TherapeuticArtGenerator()
+    array_gen = TherapeuticArtGenerator(array_pipeline=True)
+    for style in ["abstract", "geometric", "nature", "watercolor", "minimalist", "digital"]:
+        for mood in ["sad", "anxious"]:
+            request_data = {"mood": mood, "artStyle": style, "personalPreferences": STRESSED_HISTORY,
+                            "seed": 0}
+            
+            def render(generator):
+                return asyncio.run(generator._render_image(request_data))
+            
+            pil_time = best_of(lambda: render(pil_gen), args.repeats)
+            array_time = best_of(lambda: render(array_gen), args.repeats)
+            copies = render(array_gen).copies
+            print(
+                f"{style + '/' + mood:<20} {pil_time:>9.3f}s {array_time:>9.3f}s "
+                f"{pil_time / array_time:>7.1f}x {copies:>7}"
+            )
+
+def bench_art_sdf(args):
+    """PIL drawing versus distance-field rasterization of each style's layers"""
+    from art_generator import TherapeuticArtGenerator
+    
+    print(f"🎨 Art rasterizers: 1024x1024 compositions, best of {args.repeats}")
+    print(f"{'style':<12} {'pil':>10} {'sdf':>10} {'speedup':>8} {'mean |diff|':>12}")
+    
+    styles = ["abstract", "geometric", "nature", "watercolor", "minimalist", "digital"]
+    pil_gen = TherapeuticArtGenerator(array_pipeline=True)
+    sdf_gen = TherapeuticArtGenerator(array_pipeline=True, sdf_styles=styles)
+    for style in styles:
+        def render(generator):
+            return asyncio.run(generator._create_base_composition(
+                "calm", style, "calm", "healing", 1.0, np.random.default_rng(0)
+            ))
+        
+        pil_time = best_of(lambda: render(pil_gen), args.repeats)
+        sdf_time = best_of(lambda: render(sdf_gen), args.repeats)
+        difference = np.abs(
+            render(pil_gen).rgb.astype(np.int16) - render(sdf_gen).rgb.astype(np.int16)
+        ).mean()
+        print(
+            f"{style:<12} {pil_time * 1000:>8.1f}ms {sdf_time * 1000:>8.1f}ms "
+            f"{pil_time / sdf_time:>7.1f}x {difference:>12.2f}"
+        )
+
+def bench_art_quality(args):
+    """Full renders versus drafts of the same composition"""
+    from art_generator import TherapeuticArtGenerator
+    
+    print(f"🎨 Art quality: full and draft renders with every effect, best of {args.repeats}")
+    print(f"{'style':<12} {'full':>10} {'draft':>10} {'of full':>8}")
+    
+    generator = TherapeuticArtGenerator(array_pipeline=True)
+    for style in ["abstract", "geometric", "nature", "watercolor", "minimalist", "digital"]:
+        def render(quality):
+            return asyncio.run(generator._render_image({
+                "mood": "anxious", "artStyle": style, "personalPreferences": STRESSED_HISTORY,
+                "quality": quality, "seed": 0
+            }))
+        
+        full_time = best_of(lambda: render("full"), args.repeats)
+        draft_time = best_of(lambda: render("draft"), args.repeats)
+        print(
+            f"{style:<12} {full_time * 1000:>8.1f}ms {draft_time * 1000:>8.1f}ms "
+            f"{draft_time / full_time:>7.1%}"
+        )
+
+def bench_art_tiles(args):
+    """Large canvases rendered in bands on one to all cores"""
+    from art_generator import TherapeuticArtGenerator
+    
+    cores = os.cpu_count() or 1
+    thread_counts = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    print(f"🎨 Art tiles: anxious abstract with every effect on {cores} cores, best of {args.repeats}")
+    print(f"{'size':<6} " + " ".join(f"{f'{n} thr':>9}" for n in thread_counts))
+    
+    generators = [TherapeuticArtGenerator(array_pipeline=True, tile_threads=n) for n in thread_counts]
+    for size in [1024, 2048, 4096]:
+        request_data = {"mood": "anxious", "artStyle": "abstract",
+                        "personalPreferences": STRESSED_HISTORY, "size": size, "seed": 0}
+        
+        def render(generator):
+            return asyncio.run(generator._render_image(request_data))
+        
+        timings = [best_of(lambda: render(generator), args.repeats) for generator in generators]
+        print(f"{size:<6} " + " ".join(f"{t:>8.2f}s" for t in timings))
+
+def bench_art_effects(args):
+    """Effect chains applied one by one versus fused into one blur and one table pass"""
+    from art_generator import TherapeuticArtGenerator
+    from compositing import PixelCanvas
+    
+    print(f"🎨 Art effects: 1024x1024 array pipeline, best of {args.repeats}")
+    print(f"{'mood/history':<22} {'chained':>10} {'fused':>10} {'speedup':>8} {'mean |diff|':>12}")
+    
+    chained = TherapeuticArtGenerator(array_pipeline=True)
+    fused = TherapeuticArtGenerator(array_pipeline=True, fused_effects=True)
+    base = asyncio.run(chained._create_base_composition(
+        "calm", "abstract", "calm", "healing", 1.0, np.random.default_rng(0)
+    ))
+    for mood in ["calm", "sad", "anxious", "energetic"]:
+        for name, stress, anxiety in [("none", 5, 5), ("stress", 8, 5), ("both", 8, 8)]:
+            history = [{"stress_level": stress, "anxiety_level": anxiety}]
+            
+            def apply(generator):
+                canvas = PixelCanvas.wrap(base.pixels.copy())
+                return asyncio.run(generator._apply_therapeutic_effects(canvas, mood, history))
+            
+            chained_time = best_of(lambda: apply(chained), args.repeats)
+            fused_time = best_of(lambda: apply(fused), args.repeats)
+            difference = np.abs(
+                apply(chained).rgb.astype(np.int16) - apply(fused).rgb.astype(np.int16)
+            ).mean()
+            print(
+                f"{mood + '/' + name:<22} {chained_time * 1000:>8.1f}ms {fused_time * 1000:>8.1f}ms "
+                f"{chained_time / fused_time:>7.1f}x {difference:>12.2f}"
+            )
+
+def bench_art_color(args):
+    """Color therapy lookup tables: build once, then one interpolated pass"""
+    from art_generator import TherapeuticArtGenerator
+    from caching import LRUCache
+    from compositing import PixelCanvas
+    from PIL import Image
+    
+    print(f"🎨 Art color therapy: best of {args.repeats}")
+    print(f"{'mood/palette':<18} {'build':>8} {'size':>10} {'PIL':>10} {'array':>10} {'ms/MP':>7}")
+    
+    generator = TherapeuticArtGenerator(effect_cache=LRUCache())
+    rng = np.random.default_rng(0)
+    for mood, palette in [("calm", "cool"), ("sad", "warm"), ("happy", "vibrant")]:
+        start = time.perf_counter()
+        generator._color_therapy_lut(mood, palette)
+        build_time = time.perf_counter() - start
+        for side in [1024, 2048]:
+            rgb = rng.integers(0, 256, (side, side, 3), dtype=np.uint8)
+            image = Image.fromarray(rgb)
+            canvas = PixelCanvas.wrap(np.dstack([rgb, np.full((side, side), 255, np.uint8)]))
+            pil_time = best_of(
+                lambda: asyncio.run(generator._apply_color_therapy(image, mood, palette)), args.repeats
+            )
+            array_time = best_of(
+                lambda: asyncio.run(generator._apply_color_therapy(canvas, mood, palette)), args.repeats
+            )
+            print(
+                f"{mood + '/' + palette:<18} {build_time * 1000:>6.1f}ms {f'{side}x{side}':>10} "
+                f"{pil_time * 1000:>8.1f}ms {array_time * 1000:>8.1f}ms "
+                f"{array_time * 1000 / (side * side / 1e6):>7.1f}"
+            )
+
+def bench_art_encode(args):
+    """Full image and thumbnails encoded per format, and how long the event
+    loop goes without a turn while an art request encodes"""
+    from art_generator import TherapeuticArtGenerator
+    from image_encoding import THUMBNAIL_WIDTHS, available_formats, encode_outputs
+    
+    print(f"🎨 Art encoding: 1024x1024 plus {', '.join(map(str, THUMBNAIL_WIDTHS))} thumbnails, best of {args.repeats}")
+    print(f"{'format':<8} {'time':>10} {'bytes':>10}")
+    
+    generator = TherapeuticArtGenerator()
+    image = asyncio.run(generator._render_image({"mood": "calm", "artStyle": "watercolor", "seed": 0}))
+    for output_format in available_formats():
+        encode_time = best_of(lambda: encode_outputs(image, [output_format], "art/bench"), args.repeats)
+        encoding = encode_outputs(image, [output_format], "art/bench")
+        print(
+            f"{output_format:<8} {encode_time * 1000:>8.1f}ms "
+            f"{encoding['formats'][output_format]['encoded_bytes']:>10}"
+        )
+    
+    async def longest_stall():
+        stalls = []
+        
+        async def ticker():
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                stalls.append(time.perf_counter() - start)
+        
+        ticking = asyncio.ensure_future(ticker())
+        await generator._save_image(image, {"formats": available_formats()})
+        ticking.cancel()
+        return max(stalls)
+    
+    print(f"longest event loop stall while encoding all formats: {asyncio.run(longest_stall()) * 1000:.1f}ms")
+
+BENCHMARKS = {
+    "oscillators": bench_oscillators,
+    "sample_rates": bench_sample_rates,
+    "loop": bench_loop,
+    "stems": bench_stems,
+    "effect_curves": bench_effect_curves,
+    "render_pool": bench_render_pool,
+    "batch": bench_batch,
+    "art_layers": bench_art_layers,
+    "art_pipeline": bench_art_pipeline,
+    "art_sdf": bench_art_sdf,
+    "art_quality": bench_art_quality,
+    "art_tiles": bench_art_tiles,
+    "art_effects": bench_art_effects,
+    "art_color": bench_art_color,
+    "art_encode": bench_art_encode
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--duration", type=int, default=120, help="track length in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per measurement")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    
+    for name in args.benchmarks or BENCHMARKS:
+        BENCHMARKS[name](args)
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+from typing import Dict, Optional
+import threading
+import numpy as np
+
+_local = threading.local()
+
+# Longest track buffer a pool keeps: one default-length track (120 s at
+# 22.05 kHz) plus resampling guards. Longer tracks get a buffer of their
+# own, so one long render does not pin its memory for the worker's life.
+MAX_TRACK_SAMPLES = 120 * 22050 + 64
+
+class AudioBufferPool:
+    """Preallocated work buffers reused across render stages and requests
+    
+    A pool belongs to a single worker (thread or process). Block buffers hold
+    ``block_size`` samples each; the track buffer grows to the longest track
+    seen so far, up to ``max_track_samples``, and is handed out as a view.
+    Longer tracks are allocated for the request and not kept. Every
+    allocation the pool makes is counted so callers can report the cost of
+    a request.
+    """
+    
+    def __init__(self, block_size: int = 8192, track_samples: int = 0,
+                 dtype: type = np.float64, max_track_samples: int = MAX_TRACK_SAMPLES):
+        self.dtype = np.dtype(dtype)
+        self.max_track_samples = max_track_samples
+        self.block_size = 0
+        self._blocks: Dict[str, np.ndarray] = {}
+        self._track = np.empty(0, dtype=self.dtype)
+        self.index = np.empty(0, dtype=self.dtype)
+        
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self._request_allocations = 0
+        self._request_bytes = 0
+        
+        self.resize(block_size, track_samples)
+    
+    def _allocate(self, length: int, dtype: np.dtype) -> np.ndarray:
+        """Allocate a buffer and record it in the counters"""
+        buffer = np.empty(length, dtype=dtype)
+        self.allocations += 1
+        self.bytes_allocated += buffer.nbytes
+        self._request_allocations += 1
+        self._request_bytes += buffer.nbytes
+        return buffer
+    
+    def resize(self, block_size: Optional[int] = None,
+               track_samples: Optional[int] = None) -> None:
+        """Change the block size and/or preallocate the track buffer"""
+        if block_size is not None and block_size != self.block_size:
+            self.block_size = block_size
+            self._blocks = {}
+            # Shared sample index 0..block_size-1; every block time axis is
+            # an affine transform of it
+            self.index = self._allocate(block_size, self.dtype)
+            self.index[:] = np.arange(block_size)
+        
+        if track_samples is not None and track_samples > len(self._track):
+            self._track = self._allocate(track_samples, self.dtype)
+    
+    def block(self, name: str, dtype: Optional[type] = None) -> np.ndarray:
+        """Named work buffer of ``block_size`` samples (pool dtype by default)"""
+        buffer = self._blocks.get(name)
+        if buffer is None:
+            buffer = self._allocate(self.block_size, np.dtype(dtype or self.dtype))
+            self._blocks[name] = buffer
+        return buffer
+    
+    def track(self, num_samples: int) -> np.ndarray:
+        """View of the track buffer, valid until the next request"""
+        if num_samples > self.max_track_samples:
+            return self._allocate(num_samples, self.dtype)
+        self.resize(track_samples=num_samples)
+        return self._track[:num_samples]
+    
+    def begin_request(self) -> None:
+        """Reset the per-request allocation counters"""
+        self._request_allocations = 0
+        self._request_bytes = 0
+    
+    def request_stats(self) -> Dict[str, int]:
+        """Allocations made since the last ``begin_request``"""
+        return {
+            "allocations": self._request_allocations,
+            "bytes_allocated": self._request_bytes,
+            "pool_bytes": self.capacity_bytes
+        }
+    
+    @property
+    def capacity_bytes(self) -> int:
+        """Bytes currently held by the pool"""
+        return (
+            self.index.nbytes
+            + self._track.nbytes
+            + sum(buffer.nbytes for buffer in self._blocks.values())
+        )
+
+def get_buffer_pool(block_size: int = 8192, dtype: type = np.float64) -> AudioBufferPool:
+    """Buffer pool of the given dtype owned by the calling worker thread"""
+    pools = getattr(_local, "pools", None)
+    if pools is None:
+        pools = _local.pools = {}
+    
+    key = np.dtype(dtype).name
+    if key not in pools:
+        pools[key] = AudioBufferPool(block_size, dtype=dtype)
+    return pools[key]
@@ -0,0 +1,277 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by entries and bytes
+    
+    ``sizeof`` reports the size of a value in bytes; without it only the
+    entry limit applies. A value larger than ``max_bytes`` on its own is
+    returned to the caller but never stored. Hits, misses and evictions are
+    counted for monitoring.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = 128, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda value: 0)
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Cached value for key (marking it most recently used), else default"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+    
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting least recently used entries"""
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            
+            self._entries[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+            while (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes)
+            ):
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Cached value for key, built with factory() and stored on a miss
+        
+        The factory runs outside the lock, so concurrent misses on the same
+        key may each build the value; the last one stored wins.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value)
+        return value
+    
+    def _discard(self, key: Hashable) -> None:
+        del self._entries[key]
+        self.bytes -= self._sizes.pop(key)
+    
+    def clear(self) -> None:
+        """Drop every entry; the counters are kept"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters and current occupancy"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.bytes
+            }
+
+def _json_default(value: Any) -> Any:
+    """JSON fallback for NumPy scalars and other plain values"""
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=_json_default)
+
+class DiskCache:
+    """JSON values stored as files in a directory, bounded by total size
+    
+    Entries are written atomically and may be shared by every worker
+    process using the directory. When the directory outgrows ``max_bytes``
+    the least recently used files (by modification time, refreshed on each
+    hit) are removed.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int = 1024 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        
+        self.bytes = sum(size for _, size, _ in self._scan())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+    
+    def _scan(self):
+        """(path, size, mtime) of every cache entry in the directory"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Stored value for key, else default"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as handle:
+                value = json.load(handle)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return default
+        
+        with self._lock:
+            self.hits += 1
+        return value
+    
+    def put(self, key: str, value: Any) -> None:
+        """Store value under key, evicting the oldest entries when over size"""
+        data = _canonical_json(value).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        
+        path = self._path(key)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as temp_file:
+            temp_file.write(data)
+        with self._lock:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self.bytes += len(data) - previous
+            if self.bytes > self.max_bytes:
+                self._evict(keep=path)
+    
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used files until the directory fits"""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        self.bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.bytes -= size
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Remove every entry; the counters are kept"""
+        with self._lock:
+            for path, _, _ in self._scan():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Counters and current occupancy"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self.bytes
+            }
+
+class ResultCache:
+    """Two-tier cache of generation results keyed by request content
+    
+    Results are JSON documents. Lookups try the in-memory LRU first, then
+    the optional on-disk store, promoting disk hits into memory. Every
+    lookup hands out its own copy, so callers may annotate results freely.
+    """
+    
+    def __init__(self, memory_entries: int = 256, directory: Optional[str] = None,
+                 disk_bytes: int = 1024 * 2**20):
+        self.memory = LRUCache(max_entries=memory_entries)
+        self.disk = DiskCache(directory, disk_bytes) if directory else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def key(namespace: str, params: Dict[str, Any]) -> str:
+        """Content address of a normalized request: SHA-256 of canonical JSON"""
+        document = _canonical_json({"namespace": namespace, "params": params})
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """(copy of the cached result, tier it came from), or (None, None)"""
+        missing = object()
+        value, tier = self.memory.get(key, missing), "memory"
+        if value is missing and self.disk is not None:
+            value, tier = self.disk.get(key, missing), "disk"
+            if value is not missing:
+                self.memory.put(key, value)
+        
+        with self._lock:
+            if value is missing:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+        return copy.deepcopy(value), tier
+    
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result in both tiers"""
+        # Round-trip through JSON so both tiers hold identical documents
+        document = json.loads(_canonical_json(value))
+        self.memory.put(key, document)
+        if self.disk is not None:
+            self.disk.put(key, document)
+    
+    def clear(self) -> None:
+        """Drop every entry in both tiers"""
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Overall hit/miss counters plus per-tier counters"""
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses}
+        stats["memory"] = self.memory.stats()
+        stats["disk"] = self.disk.stats() if self.disk is not None else None
+        return stats
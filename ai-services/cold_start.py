@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+AI Services Cold-Start Report
+Import time per module, time until /ready and first-hit latency per
+endpoint of a fresh server process, checked against a budget
+
+Run with AI_SERVICE_WARMUP=0 to measure first hits without the warm-up.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MARKER = "cold-start:"
+
+# Requests sent to a fresh server, in order; each is sent twice so the
+# first hit can be compared with a warm one
+ENDPOINTS = [
+    ("GET /health", "/health", None),
+    ("POST /music/generate", "/music/generate", {"mood": "calm", "duration": 5, "fresh": True}),
+    ("POST /music/stream", "/music/stream", {"mood": "sad", "duration": 5}),
+    ("POST /music/generate/batch", "/music/generate/batch", {
+        "requests": [{"mood": "happy", "duration": 5, "fresh": True}] * 2
+    }),
+    ("POST /art/generate", "/art/generate", {"mood": "calm", "fresh": True}),
+]
+
+# Milliseconds, deliberately loose so that only regressions trip them; CI
+# can pass a stricter file with --budget. "ready" bounds the startup
+# warm-up; "heavy" modules must not be
+# loaded by importing the server at all.
+DEFAULT_BUDGET = {
+    "import": {
+        "main": 2000,
+        "music_generator": 300,
+        "art_generator": 500
+    },
+    "ready": 60000,
+    "first_hit": {
+        "GET /health": 500,
+        "POST /music/generate": 10000,
+        "POST /music/stream": 5000,
+        "POST /music/generate/batch": 10000,
+        "POST /art/generate": 10000
+    },
+    "heavy": [
+        "scipy.signal", "librosa", "torch", "transformers", "diffusers",
+        "accelerate", "cv2", "matplotlib", "seaborn", "music21"
+    ]
+}
+
+def parse_import_times(lines):
+    """Cumulative import time in ms by module from ``-X importtime`` lines
+    
+    Lines that are not import-time records (including the header) are
+    skipped.
+    """
+    times = {}
+    for line in lines:
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+def split_segments(stderr):
+    """Import-time lines of the child's stderr, grouped by the phase they fell in"""
+    segments = {"import": []}
+    current = segments["import"]
+    for line in stderr.splitlines():
+        if line.startswith(MARKER):
+            current = segments.setdefault(line[len(MARKER):].strip(), [])
+        else:
+            current.append(line)
+    return segments
+
+def top_level(times):
+    """Cumulative times of top-level packages only"""
+    return {name: ms for name, ms in times.items() if "." not in name}
+
+def run_child(args):
+    """Import the server, wait until ready, hit every endpoint twice and print the timings"""
+    sys.path.insert(0, HERE)
+    start = time.perf_counter()
+    import main
+    import_ms = (time.perf_counter() - start) * 1000
+    from fastapi.testclient import TestClient
+    
+    headers = {"Authorization": f"Bearer {os.getenv('AI_SERVICE_API_KEY', 'your-ai-service-api-key')}"}
+    report = {"import_ms": round(import_ms, 1), "first_hit": {}, "warm_hit": {}, "status": {}}
+    with TestClient(main.app) as client:
+        start = time.perf_counter()
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.05)
+        report["ready_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        print(f"{MARKER} ready", file=sys.stderr, flush=True)
+        for name, path, body in ENDPOINTS:
+            for phase in ("first_hit", "warm_hit"):
+                marker = name if phase == "first_hit" else "warm"
+                print(f"{MARKER} {marker}", file=sys.stderr, flush=True)
+                start = time.perf_counter()
+                if body is None:
+                    response = client.get(path, headers=headers)
+                else:
+                    response = client.post(path, json=body, headers=headers)
+                report[phase][name] = round((time.perf_counter() - start) * 1000, 1)
+                report["status"][name] = response.status_code
+    print(json.dumps(report))
+    return 0
+
+def measure():
+    """Cold-start report of a fresh interpreter running the server"""
+    with tempfile.TemporaryDirectory() as directory:
+        # Run from an empty directory so nothing the server writes is left behind
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+            cwd=directory, capture_output=True, text=True
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Cold-start child failed:\n{completed.stderr[-4000:]}")
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    
+    segments = split_segments(completed.stderr)
+    import_times = parse_import_times(segments.pop("import"))
+    segments.pop("warm", None)
+    warmup_imports = parse_import_times(segments.pop("ready", []))
+    local_modules = {name[:-3] for name in os.listdir(HERE) if name.endswith(".py")}
+    report["modules"] = {
+        name: ms for name, ms in import_times.items() if name in local_modules
+    }
+    third_party = sorted(
+        ((name, ms) for name, ms in top_level(import_times).items() if name not in local_modules),
+        key=lambda item: -item[1]
+    )
+    report["packages"] = dict(third_party[:10])
+    report["loaded"] = sorted(import_times)
+    # Modules first imported during warm-up and while serving each endpoint
+    report["warmup_imports"] = {
+        module: ms for module, ms in top_level(warmup_imports).items() if ms >= 1.0
+    }
+    report["lazy_imports"] = {
+        name: {
+            module: ms for module, ms in top_level(parse_import_times(lines)).items()
+            if ms >= 1.0
+        }
+        for name, lines in segments.items()
+    }
+    return report
+
+def check_budget(report, budget):
+    """Budget violations of a report, as readable strings"""
+    violations = []
+    for module, limit in budget.get("import", {}).items():
+        ms = report["modules"].get(module)
+        if ms is not None and ms > limit:
+            violations.append(f"import {module}: {ms:.0f} ms > {limit} ms")
+    if "ready" in budget and report["ready_ms"] > budget["ready"]:
+        violations.append(f"ready: {report['ready_ms']:.0f} ms > {budget['ready']} ms")
+    for name, limit in budget.get("first_hit", {}).items():
+        ms = report["first_hit"].get(name)
+        if ms is not None and ms > limit:
+            violations.append(f"first hit {name}: {ms:.0f} ms > {limit} ms")
+    for name, status in report["status"].items():
+        if status >= 400:
+            violations.append(f"first hit {name}: HTTP {status}")
+    for module in budget.get("heavy", []):
+        if module in report["loaded"]:
+            violations.append(f"import main loads heavy module {module}")
+    return violations
+
+def print_report(report, violations):
+    print(
+        f"🚀 Cold start: import main {report['import_ms']:.0f} ms, "
+        f"ready after a further {report['ready_ms']:.0f} ms"
+    )
+    if report["warmup_imports"]:
+        print("   warm-up imports: " + ", ".join(
+            f"{module} {ms:.0f}ms" for module, ms in
+            sorted(report["warmup_imports"].items(), key=lambda item: -item[1])[:3]
+        ))
+    print(f"{'module':<28} {'import':>10}")
+    for name, ms in sorted(report["modules"].items(), key=lambda item: -item[1]):
+        print(f"{name:<28} {ms:>8.1f}ms")
+    print(f"{'heaviest packages':<28} {'import':>10}")
+    for name, ms in report["packages"].items():
+        print(f"{name:<28} {ms:>8.1f}ms")
+    print()
+    print(f"{'endpoint':<28} {'first':>10} {'warm':>10}  lazy imports")
+    for name in report["first_hit"]:
+        lazy = ", ".join(
+            f"{module} {ms:.0f}ms" for module, ms in
+            sorted(report["lazy_imports"].get(name, {}).items(), key=lambda item: -item[1])[:3]
+        )
+        print(
+            f"{name:<28} {report['first_hit'][name]:>8.1f}ms "
+            f"{report['warm_hit'][name]:>8.1f}ms  {lazy or '-'}"
+        )
+    print()
+    if violations:
+        print("❌ Budget exceeded:")
+        for violation in violations:
+            print(f"   {violation}")
+    else:
+        print("✅ Within budget")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", help="JSON budget file (default: the built-in budget)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_child(args)
+    
+    budget = DEFAULT_BUDGET
+    if args.budget:
+        with open(args.budget) as f:
+            budget = json.load(f)
+    report = measure()
+    violations = check_budget(report, budget)
+    if args.json:
+        print(json.dumps(dict(report, violations=violations), indent=2))
+    else:
+        print_report(report, violations)
+    return 1 if violations else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
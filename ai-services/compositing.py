@@ -0,0 +1,668 @@
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import math
+import threading
+
+from PIL import Image, ImageDraw, ImageFilter
+import numpy as np
+
+import sdf
+
+Color = Tuple[int, int, int]
+Box = Tuple[int, int, int, int]
+Bounds = Tuple[float, float, float, float]
+
+# Rows per block when an enhancement maps the canvas through a table; a
+# block and its index scratch stay in cache
+STRIP_ROWS = 64
+
+# Fewest rows in a band when a canvas is split into bands for threads
+MIN_BAND_ROWS = 128
+
+_local = threading.local()
+
+class PixelCanvas:
+    """Opaque canvas held as one pixel array for a whole art render
+    
+    The layout is fixed: a C-contiguous height x width x 4 uint8 array of
+    RGBA with alpha kept at 255. That is the byte layout PIL itself uses
+    for RGB and RGBA images, so view() wraps the array for PIL without
+    copying, and PIL operations that work in place (drawing, compositing,
+    pasting) write straight into it. Enhancements reproduce ImageEnhance
+    exactly, in place; only a blur has PIL allocate a new full-canvas
+    image, which is pasted back and counted in ``copies``.
+    
+    Given an executor and more than one band, the canvas is split into
+    that many horizontal bands of whole rows, each contiguous in memory,
+    and blurs, enhancements and layer compositing work on the bands on the
+    executor's threads; PIL and NumPy release the GIL in that work. A blur
+    filters each band with a halo of rows past its kernel's reach, read
+    from a snapshot of the canvas, so bands give the same pixels as one
+    pass over the whole canvas.
+    """
+    
+    def __init__(self, size: Tuple[int, int], color: Color = (255, 255, 255),
+                 executor: Optional[Executor] = None, bands: int = 1):
+        width, height = size
+        pixels = np.empty((height, width, 4), dtype=np.uint8)
+        # Whole pixels at a time: RGBA bytes as one native uint32
+        pixels.view(np.uint32).fill(np.frombuffer(bytes((*color, 255)), dtype=np.uint32)[0])
+        self._attach(pixels, executor, bands)
+    
+    @classmethod
+    def wrap(cls, pixels: np.ndarray) -> "PixelCanvas":
+        """Canvas over an existing C-contiguous height x width x 4 array"""
+        canvas = cls.__new__(cls)
+        canvas._attach(pixels, None, 1)
+        return canvas
+    
+    def _attach(self, pixels: np.ndarray, executor: Optional[Executor], bands: int) -> None:
+        self.pixels = pixels
+        self.copies = 0
+        self.executor = executor
+        height = pixels.shape[0]
+        count = max(1, min(bands, height // MIN_BAND_ROWS)) if executor is not None else 1
+        edges = [height * i // count for i in range(count + 1)]
+        self.bands: List[Tuple[int, int]] = list(zip(edges[:-1], edges[1:]))
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.pixels.shape[1], self.pixels.shape[0]
+    
+    @property
+    def rgb(self) -> np.ndarray:
+        """Height x width x 3 view of the color channels"""
+        return self.pixels[..., :3]
+    
+    def view(self) -> Image.Image:
+        """RGBA image sharing the array's memory
+        
+        PIL operations that work in place write into the array.
+        """
+        return _writable_view(self.pixels, "RGBA")
+    
+    def image(self) -> Image.Image:
+        """The canvas as an RGB image, the one copy handing it over for output"""
+        return Image.fromarray(self.rgb)
+    
+    def band(self, top: int, bottom: int) -> "PixelCanvas":
+        """Canvas sharing the rows from top to bottom"""
+        return PixelCanvas.wrap(self.pixels[top:bottom])
+    
+    def map_bands(self, func: Callable[[int, int], Any]) -> List[Any]:
+        """func(top, bottom) for every band, on the executor's threads when
+        there is more than one"""
+        if len(self.bands) == 1:
+            return [func(*self.bands[0])]
+        return list(self.executor.map(lambda band: func(*band), self.bands))
+    
+    def blur(self, radius: float, box: bool = False) -> None:
+        """Gaussian blur, as ImageFilter.GaussianBlur, or with ``box`` the
+        single pass of ImageFilter.BoxBlur"""
+        image_filter = ImageFilter.BoxBlur(radius) if box else ImageFilter.GaussianBlur(radius=radius)
+        if len(self.bands) == 1:
+            view = self.view()
+            view.paste(view.filter(image_filter))
+        else:
+            source = self.pixels.copy()
+            height = source.shape[0]
+            # Rows a Gaussian's three box passes, or one box pass, reach
+            halo = 3 * (math.ceil(2 * radius) + 1)
+            
+            def blur_band(top, bottom):
+                start, end = max(0, top - halo), min(height, bottom + halo)
+                blurred = _writable_view(source[start:end], "RGBA").filter(image_filter)
+                self.band(top, bottom).view().paste(blurred, (0, start - top))
+            
+            self.map_bands(blur_band)
+        self.copies += 1
+    
+    def enhance(self, kind: str, factor: float) -> None:
+        """ImageEnhance.Brightness, Contrast or Color, pixel for pixel
+        
+        Each blends the image with a degenerate version of it: black, its
+        mean gray or its own grayscale. The blend is tabulated once, as
+        Image.blend computes it, and the canvas is mapped through the table
+        strip by strip.
+        """
+        if kind not in ("brightness", "contrast", "color"):
+            raise ValueError(f"Unknown enhancement: {kind}")
+        if kind == "color":
+            # Indexed by gray * 256 + value
+            lut = blend_table(np.arange(256, dtype=np.float32)[:, None], factor).ravel()
+        elif kind == "contrast":
+            lut = blend_table(np.float32(self.gray_mean()), factor)
+        else:
+            lut = blend_table(np.float32(0), factor)
+        self.transform(lut)
+    
+    def gray_mean(self, lut: Optional[np.ndarray] = None) -> int:
+        """Mean luminance, rounded as ImageEnhance.Contrast rounds it
+        
+        With a 256-entry table, the mean the canvas would have mapped
+        through it, each channel on its own; the canvas is left as it is.
+        """
+        if lut is None:
+            gray = self._gray
+        else:
+            # The luminance weights folded into one table per channel
+            weighted = [np.asarray(lut, dtype=np.int32) * weight for weight in (19595, 38470, 7471)]
+            
+            def gray(strip):
+                total = np.take(weighted[0], strip[..., 0])
+                total += np.take(weighted[1], strip[..., 1])
+                total += np.take(weighted[2], strip[..., 2])
+                total += 0x8000
+                total >>= 16
+                return total
+        
+        total = sum(self.map_bands(lambda top, bottom: sum(
+            int(gray(self.pixels[start:min(start + STRIP_ROWS, bottom)]).sum(dtype=np.int64))
+            for start in range(top, bottom, STRIP_ROWS)
+        )))
+        return int(total / (self.size[0] * self.size[1]) + 0.5)
+    
+    def transform(self, lut: np.ndarray) -> None:
+        """Map every color value through a table, in place
+        
+        A table of 256 entries maps each channel on its own; one of 65536
+        is indexed by the pixel's luminance * 256 + value, for transforms
+        that depend on the whole pixel, like ImageEnhance.Color.
+        """
+        self.map_bands(lambda top, bottom: self._map_table(lut, top, bottom))
+    
+    def _map_table(self, lut: np.ndarray, top: int, bottom: int) -> None:
+        """Map rows from top to bottom through a table"""
+        for start in range(top, bottom, STRIP_ROWS):
+            strip = self.pixels[start:min(start + STRIP_ROWS, bottom)]
+            if lut.size == 65536:
+                # gray * 256 added to all four uint16 indices of a pixel at
+                # once; no lane can carry into the next
+                index = strip.astype(np.uint16)
+                offset = self._gray(strip).astype(np.uint64)
+                offset *= 256 * 0x0001000100010001
+                index.view(np.uint64)[..., 0] += offset
+            else:
+                index = strip
+            np.take(lut, index, out=strip, mode="clip")
+            strip[..., 3] = 255
+    
+    def color_lut(self, lut: ImageFilter.Color3DLUT) -> None:
+        """Map every pixel through a 3D color lookup table, in place
+        
+        PIL interpolates the table strip by strip; each strip's result is a
+        small image pasted straight back, so the canvas is never copied.
+        """
+        def map_band(top, bottom):
+            for start in range(top, bottom, STRIP_ROWS):
+                view = self.band(start, min(start + STRIP_ROWS, bottom)).view()
+                view.paste(view.filter(lut))
+        
+        self.map_bands(map_band)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"layout": "RGBA", "copies": self.copies}
+    
+    @staticmethod
+    def _gray(pixels: np.ndarray) -> np.ndarray:
+        """Luminance as PIL's RGB to L conversion computes it
+        
+        Works on whole RGBA pixels read as little-endian uint32s, rather
+        than on strided channels.
+        """
+        packed = pixels.view("<u4")[..., 0]
+        gray = packed & 0xFF
+        gray *= 19595
+        channel = packed >> 8
+        channel &= 0xFF
+        channel *= 38470
+        gray += channel
+        np.right_shift(packed, 16, out=channel)
+        channel &= 0xFF
+        channel *= 7471
+        gray += channel
+        gray += 0x8000
+        gray >>= 16
+        return gray
+
+def blend_table(degenerate: np.ndarray, factor: float) -> np.ndarray:
+    """Image.blend(degenerate, value, factor) for every uint8 value
+    
+    Blend.c computes in float32 and truncates, clipping when the factor
+    extrapolates.
+    """
+    values = np.arange(256, dtype=np.float32)
+    blended = degenerate + np.float32(factor) * (values - degenerate)
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+def _writable_view(pixels: np.ndarray, mode: str) -> Image.Image:
+    """Image sharing a C-contiguous array's memory
+    
+    frombuffer marks the image read-only so that PIL copies it before any
+    in-place change; the array is writable, so the view is made writable
+    instead.
+    """
+    height, width = pixels.shape[:2]
+    image = Image.frombuffer(mode, (width, height), pixels, "raw", mode, 0, 1)
+    image.readonly = 0
+    return image
+
+def _clip(bounds: Optional[Bounds], size: Tuple[int, int]) -> Optional[Box]:
+    """Whole-pixel box covering bounds, clipped to an image of size"""
+    if bounds is None:
+        return None
+    width, height = size
+    box = (
+        max(0, math.floor(bounds[0])), max(0, math.floor(bounds[1])),
+        min(width, math.ceil(bounds[2]) + 1), min(height, math.ceil(bounds[3]) + 1)
+    )
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+class Layer:
+    """Single-color translucent layer that shapes are drawn into
+    
+    Shapes take alpha values (0-255) where ImageDraw takes colors; like
+    ImageDraw on an RGBA image, a later shape replaces the alpha under it
+    rather than blending with it. The layer keeps the bounding box of
+    everything drawn.
+    """
+    
+    def __init__(self, draw: ImageDraw.ImageDraw, color: Color, rgba: bool = False):
+        self.color = color
+        self._draw = draw
+        self._rgba = rgba  # Drawing into an RGBA image rather than an alpha mask
+        self.bounds: Optional[Bounds] = None
+    
+    def polygon(self, points: Sequence[Tuple[float, float]], fill: int) -> None:
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self._extend(min(xs), min(ys), max(xs), max(ys), 1)
+        self._draw.polygon(points, fill=self._fill(fill))
+    
+    def ellipse(self, box: Sequence[float], fill: Optional[int] = None,
+                outline: Optional[int] = None, width: int = 1) -> None:
+        self._extend(*box, width)
+        self._draw.ellipse(box, fill=self._fill(fill), outline=self._fill(outline), width=width)
+    
+    def rectangle(self, box: Sequence[float], fill: int) -> None:
+        self._extend(*box, 1)
+        self._draw.rectangle(box, fill=self._fill(fill))
+    
+    def line(self, points: Sequence[Tuple[float, float]], fill: int, width: int = 1) -> None:
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self._extend(min(xs), min(ys), max(xs), max(ys), width)
+        self._draw.line(points, fill=self._fill(fill), width=width)
+    
+    def wash(self, center: Tuple[float, float], radius: int, fill: int, step: int = 10) -> None:
+        """Disc fading from ``fill`` at the center to clear at ``radius``,
+        drawn as concentric filled circles ``step`` apart"""
+        cx, cy = center
+        for r in range(radius, 0, -step):
+            self.ellipse([cx - r, cy - r, cx + r, cy + r], fill=int(fill * (radius - r) / radius))
+    
+    def _fill(self, alpha: Optional[int]):
+        if alpha is None:
+            return None
+        return (*self.color, alpha) if self._rgba else alpha
+    
+    def _extend(self, x0: float, y0: float, x1: float, y1: float, margin: int) -> None:
+        # Rasterization can reach a pixel past the coordinates, and
+        # outlines their width
+        box = (x0 - margin - 1, y0 - margin - 1, x1 + margin + 1, y1 + margin + 1)
+        if self.bounds is not None:
+            box = (
+                min(box[0], self.bounds[0]), min(box[1], self.bounds[1]),
+                max(box[2], self.bounds[2]), max(box[3], self.bounds[3])
+            )
+        self.bounds = box
+
+class FieldLayer(Layer):
+    """Layer rasterized from signed distance fields with NumPy
+    
+    Each shape is one vectorized expression over its bounding box: the
+    distance to its outline becomes coverage, with a one-pixel
+    anti-aliased edge, and the shape's alpha is blended into the mask by
+    that coverage, so a later shape still replaces what it fully covers. A
+    wash is a continuous radial falloff rather than stacked circles.
+    """
+    
+    def __init__(self, mask: np.ndarray, color: Color, top: int = 0, origin: int = 0):
+        super().__init__(None, color)
+        self._mask = mask
+        # Fields give the same coverage wherever they are evaluated, so
+        # shapes take canvas coordinates, rows above ``top``, never
+        # composited, are left alone, and the mask may start at any canvas
+        # row ``origin`` at or above it; bounds are kept in mask rows
+        self._top = top
+        self._origin = origin
+    
+    def polygon(self, points: Sequence[Tuple[float, float]], fill: int) -> None:
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self._paint(
+            (min(xs), min(ys), max(xs), max(ys)), 1, fill,
+            lambda gx, gy, out: sdf.coverage(sdf.polygon(gx, gy, points, out))
+        )
+    
+    def ellipse(self, box: Sequence[float], fill: Optional[int] = None,
+                outline: Optional[int] = None, width: int = 1) -> None:
+        # The box is inclusive: its edge pixels are inside
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        rx, ry = (box[2] - box[0] + 1) / 2, (box[3] - box[1] + 1) / 2
+        if fill is not None:
+            self._paint(
+                box, 1, fill,
+                lambda gx, gy, out: sdf.coverage(sdf.ellipse(gx, gy, cx, cy, rx, ry, out))
+            )
+        if outline is not None:
+            self._paint(
+                box, 1, outline,
+                lambda gx, gy, out: sdf.coverage(sdf.ring(gx, gy, cx, cy, rx, ry, width, out))
+            )
+    
+    def rectangle(self, box: Sequence[float], fill: int) -> None:
+        x0, y0, x1, y1 = box
+        self._paint(
+            box, 1, fill,
+            lambda gx, gy, out: sdf.coverage(
+                sdf.box(gx, gy, x0 - 0.5, y0 - 0.5, x1 + 0.5, y1 + 0.5, out)
+            )
+        )
+    
+    def line(self, points: Sequence[Tuple[float, float]], fill: int, width: int = 1) -> None:
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        
+        def field(gx, gy, out):
+            out[...] = sdf.segment(gx, gy, points[0], points[1])
+            for a, b in zip(points[1:], points[2:]):
+                np.minimum(out, sdf.segment(gx, gy, a, b), out=out)
+            out -= width / 2
+            return sdf.coverage(out)
+        
+        self._paint((min(xs), min(ys), max(xs), max(ys)), width, fill, field)
+    
+    def wash(self, center: Tuple[float, float], radius: int, fill: int, step: int = 10) -> None:
+        """Disc fading linearly from ``fill`` at the center to clear at ``radius``"""
+        cx, cy = center
+        
+        def field(gx, gy, out):
+            cover = sdf.circle(gx, gy, cx, cy, radius, out)
+            cover *= -1 / radius
+            return np.clip(cover, 0, 1, out=cover)
+        
+        self._paint((cx - radius, cy - radius, cx + radius, cy + radius), 1, fill, field)
+    
+    def _paint(self, bounds: Sequence[float], margin: int, fill: int,
+               field: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]) -> None:
+        """Blend fill into the mask by the coverage field computes over bounds"""
+        origin = self._origin
+        self._extend(bounds[0], bounds[1] - origin, bounds[2], bounds[3] - origin, margin)
+        height, width = self._mask.shape
+        box = _clip(
+            (bounds[0] - margin - 1, max(self._top, bounds[1] - margin - 1),
+             bounds[2] + margin + 1, bounds[3] + margin + 1),
+            (width, origin + height)
+        )
+        if box is None:
+            return
+        cover, blended = _scratch(box[3] - box[1], box[2] - box[0])
+        field(*sdf.grid(box), cover)
+        # fill + (mask - fill) * (1 - cover), rounded
+        region = self._mask[box[1] - origin:box[3] - origin, box[0]:box[2]]
+        np.subtract(1, cover, out=cover)
+        np.subtract(region, np.float32(fill), out=blended)
+        blended *= cover
+        blended += fill + 0.5
+        np.copyto(region, blended, casting="unsafe")
+
+def _scratch(rows: int, columns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Two float32 work planes of a shape, views of buffers owned by the
+    calling thread and grown to the largest shape seen
+    
+    Fresh buffers this size would be mapped, and page-faulted in, anew for
+    every shape.
+    """
+    size = rows * columns
+    planes = getattr(_local, "planes", None)
+    if planes is None or planes[0].size < size:
+        planes = _local.planes = (np.empty(size, dtype=np.float32), np.empty(size, dtype=np.float32))
+    return planes[0][:size].reshape(rows, columns), planes[1][:size].reshape(rows, columns)
+
+class ScaledLayer:
+    """Layer taking coordinates on a design canvas, drawn scaled by
+    ``scale`` into the actual one, and ``offset`` rows higher
+    
+    Widths and wash steps scale with the coordinates, to no less than a
+    pixel, so a resized canvas shows the same composition.
+    """
+    
+    def __init__(self, layer: Layer, scale: float, offset: int = 0):
+        self.layer = layer
+        self.scale = scale
+        self.offset = offset
+    
+    def polygon(self, points: Sequence[Tuple[float, float]], fill: int) -> None:
+        self.layer.polygon(self._points(points), fill)
+    
+    def ellipse(self, box: Sequence[float], fill: Optional[int] = None,
+                outline: Optional[int] = None, width: int = 1) -> None:
+        self.layer.ellipse(self._box(box), fill=fill, outline=outline, width=self._width(width))
+    
+    def rectangle(self, box: Sequence[float], fill: int) -> None:
+        self.layer.rectangle(self._box(box), fill)
+    
+    def line(self, points: Sequence[Tuple[float, float]], fill: int, width: int = 1) -> None:
+        self.layer.line(self._points(points), fill, width=self._width(width))
+    
+    def wash(self, center: Tuple[float, float], radius: int, fill: int, step: int = 10) -> None:
+        self.layer.wash(
+            self._points([center])[0], max(1, round(radius * self.scale)), fill, self._width(step)
+        )
+    
+    def _points(self, points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        return [(x * self.scale, y * self.scale - self.offset) for x, y in points]
+    
+    def _box(self, box: Sequence[float]) -> List[float]:
+        x0, y0, x1, y1 = box
+        return [x0 * self.scale, y0 * self.scale - self.offset, x1 * self.scale, y1 * self.scale - self.offset]
+    
+    def _width(self, width: int) -> int:
+        return width if self.scale == 1 else max(1, round(width * self.scale))
+
+class RecordedLayer:
+    """Stand-in layer that records its shapes, to draw them into other
+    layers later"""
+    
+    def __init__(self, color: Color):
+        self.color = color
+        self.shapes: List[Tuple[str, tuple, Dict[str, Any]]] = []
+    
+    def polygon(self, *args, **kwargs) -> None:
+        self.shapes.append(("polygon", args, kwargs))
+    
+    def ellipse(self, *args, **kwargs) -> None:
+        self.shapes.append(("ellipse", args, kwargs))
+    
+    def rectangle(self, *args, **kwargs) -> None:
+        self.shapes.append(("rectangle", args, kwargs))
+    
+    def line(self, *args, **kwargs) -> None:
+        self.shapes.append(("line", args, kwargs))
+    
+    def wash(self, *args, **kwargs) -> None:
+        self.shapes.append(("wash", args, kwargs))
+    
+    def replay(self, layer: Union[Layer, ScaledLayer],
+               shapes: Optional[Sequence[int]] = None) -> None:
+        """Draw the recorded shapes, or those at the indices given, in order"""
+        for i in range(len(self.shapes)) if shapes is None else shapes:
+            name, args, kwargs = self.shapes[i]
+            getattr(layer, name)(*args, **kwargs)
+    
+    def rows(self, scale: float = 1.0) -> List[Tuple[int, int]]:
+        """Canvas rows each recorded shape can reach, drawn ``scale`` times
+        larger, as (first, end) pairs"""
+        rows = []
+        for i in range(len(self.shapes)):
+            probe = Layer(_NullDraw(), self.color)
+            self.replay(probe if scale == 1 else ScaledLayer(probe, scale), [i])
+            if probe.bounds is None:
+                rows.append((0, 0))
+            else:
+                rows.append((math.floor(probe.bounds[1]), math.ceil(probe.bounds[3]) + 1))
+        return rows
+
+class _NullDraw:
+    """ImageDraw stand-in that draws nothing, so that a Layer only
+    measures its shapes"""
+    
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        return lambda *args, **kwargs: None
+
+class LayerCompositor:
+    """Alpha-composites translucent layers into one persistent RGBA canvas
+    
+    Each layer is rasterized at canvas coordinates into one shared alpha
+    mask, so its pixels match a full-canvas layer exactly; only the mask's
+    bounding box is colored, composited in place and cleared again. The
+    canvas is opaque and stays so, so the result matches compositing each
+    full-canvas layer over an RGB image converted to RGBA and back, pixel
+    for pixel. With ``bounded`` off every layer is a full-canvas RGBA
+    image, the reference path.
+    
+    Given a PixelCanvas, the canvas is a view of its array, so layers are
+    composited into the array in place and no conversion copies it. With
+    the "sdf" rasterizer shapes are FieldLayer distance fields rather than
+    ImageDraw shapes. Layers are always bounded in either case. With a
+    ``scale`` other than 1 layers take coordinates on a design canvas that
+    much larger, through ScaledLayer.
+    
+    A PixelCanvas split into bands is composited band by band on its
+    threads: layers are recorded as they are drawn, and when image() is
+    called every band replays, in order, the shapes that reach its rows.
+    A band's compositor is given the band's ``top`` row and the canvas
+    row ``origin`` its mask starts at; only the band's rows are
+    composited. Distance fields are the same wherever they are evaluated,
+    so their masks start at the band. ImageDraw rasterizes a shape that
+    crosses the mask's top edge differently from the same shape moved
+    down, so a PIL band's mask starts at the top of the highest shape
+    reaching into it, and shapes are drawn moved up by ``origin`` rows.
+    """
+    
+    def __init__(self, image: Union[Image.Image, PixelCanvas], bounded: bool = True,
+                 rasterizer: str = "pil", scale: float = 1.0, top: int = 0,
+                 origin: Optional[int] = None):
+        if rasterizer not in ("pil", "sdf"):
+            raise ValueError(f"Unknown rasterizer: {rasterizer}")
+        self._pixel_canvas = image if isinstance(image, PixelCanvas) else None
+        if self._pixel_canvas is not None:
+            self.canvas = image.view()
+            bounded = True
+        else:
+            self.canvas = image.convert("RGBA")
+        if rasterizer == "sdf":
+            bounded = True
+        self.bounded = bounded
+        self.rasterizer = rasterizer
+        self.scale = scale
+        self.top = top
+        self.origin = top if origin is None else origin
+        self.layers = 0
+        self.pixels = 0  # Canvas pixels composited
+        self._recorded: Optional[List[RecordedLayer]] = None
+        self._mask_pixels = None
+        self._mask = None
+        self._mask_draw = None
+        if self._pixel_canvas is not None and len(self._pixel_canvas.bands) > 1:
+            # Every band compositor has a mask of its own
+            self._recorded = []
+        elif bounded:
+            # The mask's memory is an array both rasterizers write into
+            self._mask_pixels = np.zeros(
+                (top - self.origin + image.size[1], image.size[0]), dtype=np.uint8
+            )
+            self._mask = _writable_view(self._mask_pixels, "L")
+            self._mask_draw = ImageDraw.Draw(self._mask)
+    
+    @contextmanager
+    def layer(self, color: Color) -> Iterator[Union[Layer, ScaledLayer]]:
+        """Layer to draw shapes into; composited when the block exits"""
+        if self._recorded is not None:
+            recorded = RecordedLayer(color)
+            yield recorded
+            self._recorded.append(recorded)
+            return
+        
+        if not self.bounded:
+            temp_image = Image.new("RGBA", self.canvas.size, (0, 0, 0, 0))
+            yield self._scaled(Layer(ImageDraw.Draw(temp_image), color, rgba=True))
+            self.canvas = Image.alpha_composite(self.canvas, temp_image)
+            self._count(self.canvas.size)
+            return
+        
+        if self.rasterizer == "sdf":
+            layer = FieldLayer(self._mask_pixels, color, self.top, self.origin)
+            yield self._scaled(layer)
+        else:
+            layer = Layer(self._mask_draw, color)
+            yield self._scaled(layer, self.origin)
+        box = _clip(layer.bounds, self._mask.size)
+        if box is None:
+            return
+        # Mask rows above the canvas are only cleared
+        first = self.top - self.origin
+        canvas_box = (box[0], max(box[1], first), box[2], box[3])
+        if canvas_box[1] < canvas_box[3]:
+            size = (canvas_box[2] - canvas_box[0], canvas_box[3] - canvas_box[1])
+            temp_image = Image.new("RGBA", size, (*color, 0))
+            temp_image.putalpha(self._mask.crop(canvas_box))
+            self.canvas.alpha_composite(temp_image, dest=(canvas_box[0], canvas_box[1] - first))
+            self._count(size)
+        self._mask.paste(0, box)
+    
+    def image(self) -> Union[Image.Image, PixelCanvas]:
+        """The composited canvas as RGB; a PixelCanvas is returned as is"""
+        if self._pixel_canvas is not None:
+            if self._recorded:
+                self._composite_bands()
+            return self._pixel_canvas
+        return self.canvas.convert("RGB")
+    
+    def _composite_bands(self) -> None:
+        """Replay the recorded layers into every band of the PixelCanvas,
+        each band drawing only the shapes that reach its rows"""
+        recorded, self._recorded = self._recorded, []
+        rows = [layer.rows(self.scale) for layer in recorded]
+        
+        def composite_band(top, bottom):
+            shapes = [
+                [i for i, (first, end) in enumerate(layer_rows) if first < bottom and end > top]
+                for layer_rows in rows
+            ]
+            origin = top
+            if self.rasterizer == "pil":
+                origin = min([top] + [
+                    layer_rows[i][0] for layer_rows, indices in zip(rows, shapes) for i in indices
+                ])
+            compositor = LayerCompositor(
+                self._pixel_canvas.band(top, bottom), True, self.rasterizer, self.scale, top,
+                max(0, origin)
+            )
+            for layer, indices in zip(recorded, shapes):
+                if indices:
+                    with compositor.layer(layer.color) as band_layer:
+                        layer.replay(band_layer, indices)
+            return compositor.pixels
+        
+        self.pixels += sum(self._pixel_canvas.map_bands(composite_band))
+        self.layers += len(recorded)
+    
+    def _scaled(self, layer: Layer, offset: int = 0) -> Union[Layer, ScaledLayer]:
+        return layer if self.scale == 1 and offset == 0 else ScaledLayer(layer, self.scale, offset)
+    
+    def _count(self, size: Tuple[int, int]) -> None:
+        self.layers += 1
+        self.pixels += size[0] * size[1]
@@ -0,0 +1,135 @@
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Union
+import io
+import os
+import time
+
+from PIL import Image, features
+
+# Output format: (PIL format, PIL feature it needs, file extension, media type)
+FORMATS = {
+    "png": ("PNG", "zlib", "png", "image/png"),
+    "webp": ("WEBP", "webp", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "jpg", "image/jpeg")
+}
+# Thumbnail widths the mobile app shows, largest first
+THUMBNAIL_WIDTHS = (512, 256, 128)
+# zlib level PIL writes PNGs with unless asked otherwise
+DEFAULT_COMPRESS_LEVEL = 6
+DEFAULT_QUALITY = 85
+
+def available_formats() -> List[str]:
+    """Output formats the local Pillow build can encode"""
+    return [name for name, (_, feature, _, _) in FORMATS.items() if features.check(feature)]
+
+def check_output(formats: Sequence[str], compress_level: Optional[int] = None,
+                 quality: Optional[int] = None,
+                 thumbnails: Optional[Sequence[int]] = None) -> None:
+    """Raise ValueError unless the formats and settings can be encoded"""
+    if not formats:
+        raise ValueError("At least one image format is needed")
+    for format in formats:
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {format}")
+        if format not in available_formats():
+            raise ValueError(f"Image format not supported by the local Pillow: {format}")
+    if compress_level is not None and compress_level not in range(10):
+        raise ValueError(f"PNG compression level must be between 0 and 9: {compress_level}")
+    if quality is not None and quality not in range(1, 101):
+        raise ValueError(f"Image quality must be between 1 and 100: {quality}")
+    for width in thumbnails or ():
+        if not isinstance(width, int) or width < 1:
+            raise ValueError(f"Unsupported thumbnail width: {width}")
+
+def thumbnail_images(image: Image.Image, widths: Sequence[int]) -> List[Image.Image]:
+    """Downscaled copies of an image, keeping its aspect, one per width
+    narrower than it, in the order given
+    
+    Each is resized from the smallest one already made that is at least
+    twice as wide, rather than from the full image every time, so the
+    full image is only read once.
+    """
+    made: List[Image.Image] = []
+    for width in sorted(set(w for w in widths if w < image.size[0]), reverse=True):
+        source = next((thumb for thumb in reversed(made) if thumb.size[0] >= 2 * width), image)
+        height = max(1, round(image.size[1] * width / image.size[0]))
+        made.append(source.resize((width, height), Image.LANCZOS, reducing_gap=2.0))
+    by_width = {thumb.size[0]: thumb for thumb in made}
+    return [by_width[width] for width in widths if width in by_width]
+
+def encode_image(image: Image.Image, format: str, target: Union[str, BinaryIO, None] = None,
+                 compress_level: Optional[int] = None,
+                 quality: Optional[int] = None) -> Dict[str, Any]:
+    """Encode an image into a new file at ``target``, into a file object, or
+    into memory, measured and discarded, when that is None; returns the
+    encoding details
+    
+    PNG takes ``compress_level`` (0 fastest to 9 smallest, lossless either
+    way); WebP and JPEG take ``quality`` (1 to 100). JPEGs are progressive,
+    so a mobile client can show them while they download. An existing file
+    is never overwritten.
+    """
+    pil_format = FORMATS[format][0]
+    if format == "png":
+        options = {"compress_level": DEFAULT_COMPRESS_LEVEL if compress_level is None else compress_level}
+    else:
+        options = {"quality": DEFAULT_QUALITY if quality is None else quality}
+        if format == "jpeg":
+            options["progressive"] = True
+    
+    start = time.perf_counter()
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, "xb") as file:
+            image.save(file, pil_format, **options)
+            size = file.tell()
+    else:
+        file = io.BytesIO() if target is None else target
+        offset = file.tell()
+        image.save(file, pil_format, **options)
+        size = file.tell() - offset
+    return {
+        "format": format,
+        "width": image.size[0],
+        "height": image.size[1],
+        "encoded_bytes": size,
+        "encode_seconds": round(time.perf_counter() - start, 4),
+        **options
+    }
+
+def encode_outputs(image: Image.Image, formats: Sequence[str], stem: str,
+                   output_dir: Optional[str] = None, thumbnails: Sequence[int] = THUMBNAIL_WIDTHS,
+                   compress_level: Optional[int] = None,
+                   quality: Optional[int] = None) -> Dict[str, Any]:
+    """The full image and its thumbnails, each in every format, in one pass
+    
+    Files are named ``stem`` plus ``_<width>`` for thumbnails and the
+    format's extension, below ``output_dir``; without one they are encoded
+    in memory, measured and discarded. Returns the details of every output,
+    the full image in the first format first, and the time spent on
+    thumbnails and on each format.
+    """
+    start = time.perf_counter()
+    sized = [("full", image)] + [
+        (thumb.size[0], thumb) for thumb in thumbnail_images(image, thumbnails)
+    ]
+    resize_seconds = time.perf_counter() - start
+    if output_dir is not None:
+        os.makedirs(os.path.dirname(os.path.join(output_dir, stem)), exist_ok=True)
+    
+    outputs = []
+    by_format = {format: {"encoded_bytes": 0, "encode_seconds": 0.0} for format in formats}
+    for size, sized_image in sized:
+        for format in formats:
+            suffix = "" if size == "full" else f"_{size}"
+            file_path = f"{stem}{suffix}.{FORMATS[format][2]}"
+            target = os.path.join(output_dir, file_path) if output_dir is not None else None
+            details = encode_image(sized_image, format, target, compress_level, quality)
+            outputs.append({"file_path": file_path, "size": size, **details})
+            by_format[format]["encoded_bytes"] += details["encoded_bytes"]
+            by_format[format]["encode_seconds"] += details["encode_seconds"]
+    for totals in by_format.values():
+        totals["encode_seconds"] = round(totals["encode_seconds"], 4)
+    return {
+        "outputs": outputs,
+        "formats": by_format,
+        "thumbnail_seconds": round(resize_seconds, 4)
+    }
@@ -0,0 +1,134 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+
+# Progress callback handed to the generators: (stage, fraction of the stage done)
+ProgressCallback = Callable[[str, float], None]
+
+class Job:
+    """One submitted generation and the progress reported for it"""
+
+    def __init__(self, kind: str, stages: Sequence[str]):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"
+        self.stages = {stage: 0.0 for stage in stages}
+        self.stage: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now().isoformat()
+        self.finished_at: Optional[float] = None
+        self._subscribers: List[asyncio.Queue] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    @property
+    def progress(self) -> float:
+        """Overall progress: the mean of the stage fractions"""
+        return sum(self.stages.values()) / len(self.stages) if self.stages else 0.0
+
+    def report(self, stage: str, fraction: float) -> None:
+        """Progress callback for the generators; must run on the event loop"""
+        if self.done:
+            return
+        self.status = "processing"
+        self.stage = stage
+        self.stages[stage] = max(self.stages.get(stage, 0.0), min(float(fraction), 1.0))
+        self._publish("progress")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-ready status of the job"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 4),
+            "stages": dict(self.stages),
+            "created_at": self.created_at,
+            "result": self.result,
+            "error": self.error
+        }
+
+    def _publish(self, event: str) -> None:
+        message = (event, self.snapshot())
+        for queue in self._subscribers:
+            queue.put_nowait(message)
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.monotonic()
+        self._publish(status)
+
+    async def events(self) -> AsyncIterator[str]:
+        """Server-sent events: the current state, then every update until done"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            event = self.status if self.done else "progress"
+            yield _format_event(event, self.snapshot())
+            while event not in ("completed", "failed"):
+                event, data = await queue.get()
+                yield _format_event(event, data)
+        finally:
+            self._subscribers.remove(queue)
+
+def _format_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class JobManager:
+    """In-memory registry of generation jobs running on the event loop
+
+    A job holds no connection while it runs, so one worker can keep many
+    generations in flight; the CPU-bound work itself is bounded by the
+    generators' render pool. Finished jobs are kept for ``retention``
+    seconds, and at most ``max_jobs`` are tracked.
+    """
+
+    def __init__(self, max_jobs: int = 1000, retention: float = 3600.0):
+        self.max_jobs = max_jobs
+        self.retention = retention
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(
+        self, kind: str, stages: Sequence[str],
+        run: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+    ) -> Job:
+        """Start run(progress) as a background task and return its job"""
+        self._expire()
+        if len(self._jobs) >= self.max_jobs:
+            raise RuntimeError("Too many generation jobs in flight")
+
+        job = Job(kind, stages)
+        self._jobs[job.id] = job
+        job._task = asyncio.get_running_loop().create_task(self._run(job, run))
+        return job
+
+    async def _run(
+        self, job: Job, run: Callable[[ProgressCallback], Awaitable[Dict[str, Any]]]
+    ) -> None:
+        try:
+            job.result = await run(job.report)
+        except Exception as e:
+            job.error = str(e)
+            job._finish("failed")
+        else:
+            for stage in job.stages:
+                job.stages[stage] = 1.0
+            job._finish("completed")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _expire(self) -> None:
+        """Forget finished jobs older than the retention period"""
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished_at > self.retention:
+                del self._jobs[job_id]
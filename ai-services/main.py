@@ -1,263 +1,560 @@
-from fastapi import FastAPI, HTTPException, Depends, Security
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-import asyncio
-import aiofiles
-import os
-import json
-import uuid
-from datetime import datetime
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize FastAPI app
-app = FastAPI(
-    title="SerenityAI Services",
-    description="AI-powered therapeutic music and art generation services",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Security
-security = HTTPBearer()
-
-def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
-    """Verify API token"""
-    token = credentials.credentials
-    expected_token = os.getenv("AI_SERVICE_API_KEY", "your-ai-service-api-key")
-    if token != expected_token:
-        raise HTTPException(status_code=401, detail="Invalid API key")
-    return token
-
-# Pydantic models
-class MusicGenerationRequest(BaseModel):
-    mood: str
-    genre: Optional[str] = None
-    duration: int = 120
-    tempo: Optional[str] = None
-    instruments: Optional[List[str]] = None
-    personalPreferences: Optional[Dict[str, Any]] = None
-
-class ArtGenerationRequest(BaseModel):
-    mood: str
-    artStyle: Optional[str] = None
-    colorPalette: Optional[str] = None
-    theme: Optional[str] = None
-    prompt: Optional[str] = None
-    personalPreferences: Optional[Dict[str, Any]] = None
-
-class GenerationResponse(BaseModel):
-    model_used: str
-    file_path: str
-    audio_url: Optional[str] = None
-    image_url: Optional[str] = None
-    metadata: Dict[str, Any]
-
-# Music Generation Service
-@app.post("/music/generate", response_model=GenerationResponse)
-async def generate_music(
-    request: MusicGenerationRequest,
-    token: str = Depends(verify_token)
-):
-    """Generate therapeutic music based on user preferences and mood"""
-    try:
-        logger.info(f"Generating music for mood: {request.mood}")
-        
-        # Simulate AI music generation process
-        # In a real implementation, this would call actual AI models like:
-        # - MusicGen for music generation
-        # - Magenta for melody creation
-        # - Custom therapeutic music models
-        
-        generation_id = str(uuid.uuid4())
-        file_name = f"music_{generation_id}.wav"
-        file_path = f"/generated/music/{file_name}"
-        
-        # Mock music generation metadata
-        metadata = {
-            "generation_id": generation_id,
-            "mood": request.mood,
-            "genre": request.genre or "ambient",
-            "duration": request.duration,
-            "tempo": request.tempo or "medium",
-            "instruments": request.instruments or ["piano", "strings"],
-            "bpm": get_bpm_for_mood(request.mood),
-            "key": get_key_for_mood(request.mood),
-            "generated_at": datetime.now().isoformat(),
-            "model_parameters": {
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "guidance_scale": 7.5
-            }
-        }
-        
-        # Simulate processing time
-        await asyncio.sleep(2)
-        
-        # In production, save the actual generated audio file
-        audio_url = f"https://api.serenity-ai.com/files/music/{file_name}"
-        
-        logger.info(f"Music generation completed: {generation_id}")
-        
-        return GenerationResponse(
-            model_used="SerenityAI-MusicGen-v1",
-            file_path=file_path,
-            audio_url=audio_url,
-            metadata=metadata
-        )
-        
-    except Exception as e:
-        logger.error(f"Music generation error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Music generation failed: {str(e)}")
-
-# Art Generation Service
-@app.post("/art/generate", response_model=GenerationResponse)
-async def generate_art(
-    request: ArtGenerationRequest,
-    token: str = Depends(verify_token)
-):
-    """Generate therapeutic art based on user preferences and mood"""
-    try:
-        logger.info(f"Generating art for mood: {request.mood}")
-        
-        # Simulate AI art generation process
-        # In a real implementation, this would call actual AI models like:
-        # - Stable Diffusion for image generation
-        # - DALL-E for creative art
-        # - Custom therapeutic art models
-        
-        generation_id = str(uuid.uuid4())
-        file_name = f"art_{generation_id}.png"
-        file_path = f"/generated/art/{file_name}"
-        
-        # Create therapeutic art prompt
-        art_prompt = create_art_prompt(request)
-        
-        # Mock art generation metadata
-        metadata = {
-            "generation_id": generation_id,
-            "mood": request.mood,
-            "art_style": request.artStyle or "abstract",
-            "color_palette": request.colorPalette or "calm",
-            "theme": request.theme or "healing",
-            "prompt": art_prompt,
-            "generated_at": datetime.now().isoformat(),
-            "model_parameters": {
-                "steps": 50,
-                "guidance_scale": 7.5,
-                "seed": generation_id[:8]
-            }
-        }
-        
-        # Simulate processing time
-        await asyncio.sleep(3)
-        
-        # In production, save the actual generated image file
-        image_url = f"https://api.serenity-ai.com/files/art/{file_name}"
-        
-        logger.info(f"Art generation completed: {generation_id}")
-        
-        return GenerationResponse(
-            model_used="SerenityAI-ArtGen-v1",
-            file_path=file_path,
-            image_url=image_url,
-            metadata=metadata
-        )
-        
-    except Exception as e:
-        logger.error(f"Art generation error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Art generation failed: {str(e)}")
-
-# Helper functions
-def get_bpm_for_mood(mood: str) -> int:
-    """Get appropriate BPM for mood"""
-    mood_bpm_map = {
-        "calm": 60,
-        "peaceful": 65,
-        "sad": 70,
-        "anxious": 80,
-        "happy": 120,
-        "energetic": 140
-    }
-    return mood_bpm_map.get(mood, 90)
-
-def get_key_for_mood(mood: str) -> str:
-    """Get appropriate musical key for mood"""
-    mood_key_map = {
-        "calm": "C major",
-        "peaceful": "F major",
-        "sad": "D minor",
-        "anxious": "A minor",
-        "happy": "G major",
-        "energetic": "E major"
-    }
-    return mood_key_map.get(mood, "C major")
-
-def create_art_prompt(request: ArtGenerationRequest) -> str:
-    """Create therapeutic art prompt based on request"""
-    base_prompt = f"A therapeutic {request.artStyle or 'abstract'} artwork"
-    
-    if request.theme:
-        base_prompt += f" representing {request.theme}"
-    
-    if request.colorPalette:
-        base_prompt += f" with {request.colorPalette} colors"
-    
-    if request.mood:
-        mood_descriptors = {
-            "calm": "serene, peaceful, flowing",
-            "peaceful": "tranquil, gentle, harmonious",
-            "sad": "melancholic, soft, comforting",
-            "anxious": "balanced, grounding, stable",
-            "happy": "bright, uplifting, joyful",
-            "energetic": "dynamic, vibrant, motivating"
-        }
-        base_prompt += f" that evokes {mood_descriptors.get(request.mood, 'balance')}"
-    
-    base_prompt += ", therapeutic, healing, digital art, high quality"
-    
-    if request.prompt:
-        base_prompt += f", {request.prompt}"
-    
-    return base_prompt
-
-# Health check endpoint
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "service": "serenity-ai-services"
-    }
-
-# Root endpoint
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "SerenityAI Services",
-        "version": "1.0.0",
-        "endpoints": {
-            "music_generation": "/music/generate",
-            "art_generation": "/art/generate",
-            "health": "/health"
-        }
-    }
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+from fastapi import FastAPI, HTTPException, Depends, Security
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
+import asyncio
+import aiofiles
+import os
+import json
+import uuid
+from datetime import datetime
+import logging
+
+from art_generator import TherapeuticArtGenerator
+from audio_encoding import FORMATS
+from caching import ResultCache
+from jobs import JobManager
+from music_generator import TherapeuticMusicGenerator
+from warmup import Warmup
+from workers import RenderPool
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="SerenityAI Services",
+    description="AI-powered therapeutic music and art generation services",
+    version="1.0.0"
+)
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Configure for production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Security
+security = HTTPBearer()
+
+# Generation results shared by identical requests; the disk tier is enabled
+# by pointing AI_SERVICE_CACHE_DIR at a directory
+result_cache = ResultCache(
+    memory_entries=int(os.getenv("AI_SERVICE_CACHE_ENTRIES", "256")),
+    directory=os.getenv("AI_SERVICE_CACHE_DIR") or None,
+    disk_bytes=int(os.getenv("AI_SERVICE_CACHE_MAX_BYTES", str(1024 * 2**20)))
+)
+# CPU-bound rendering runs in worker processes so the event loop stays
+# responsive; AI_SERVICE_RENDER_WORKERS defaults to the core count
+render_pool = RenderPool(int(os.getenv("AI_SERVICE_RENDER_WORKERS", "0")) or None)
+# Encoded tracks are written below AI_SERVICE_OUTPUT_DIR when it is set;
+# AI_SERVICE_STEM_DIR points at a library built with stems.py, which every
+# server and render worker process maps read-only at startup
+music_generator = TherapeuticMusicGenerator(
+    result_cache=result_cache, render_pool=render_pool,
+    output_dir=os.getenv("AI_SERVICE_OUTPUT_DIR") or None,
+    stem_dir=os.getenv("AI_SERVICE_STEM_DIR") or None
+)
+# AI_SERVICE_ART_PIPELINE=array renders art into one pixel array end to end
+# instead of a PIL image per stage, in bands on AI_SERVICE_ART_THREADS
+# threads; AI_SERVICE_SDF_STYLES lists the art styles, comma-separated,
+# rasterized from distance fields instead of PIL; AI_SERVICE_FUSED_EFFECTS=1
+# applies each mood's visual effects as one blur and one table pass. Images
+# and thumbnails are written below AI_SERVICE_OUTPUT_DIR too
+art_generator = TherapeuticArtGenerator(
+    result_cache=result_cache, render_pool=render_pool,
+    output_dir=os.getenv("AI_SERVICE_OUTPUT_DIR") or None,
+    array_pipeline=os.getenv("AI_SERVICE_ART_PIPELINE", "pil") == "array",
+    sdf_styles=[s.strip() for s in os.getenv("AI_SERVICE_SDF_STYLES", "").split(",") if s.strip()],
+    tile_threads=int(os.getenv("AI_SERVICE_ART_THREADS", "1")),
+    fused_effects=os.getenv("AI_SERVICE_FUSED_EFFECTS", "0") == "1"
+)
+# Submitted generations polled through /jobs instead of held connections
+job_manager = JobManager(
+    max_jobs=int(os.getenv("AI_SERVICE_MAX_JOBS", "1000")),
+    retention=float(os.getenv("AI_SERVICE_JOB_RETENTION", "3600"))
+)
+
+MUSIC_STAGES = ("composition", "effects", "binaural", "encode")
+ART_STAGES = ("composition", "effects", "color", "encode")
+
+# Startup warm-up: short generations of AI_SERVICE_WARMUP_SECONDS for every
+# mood and art style, unless AI_SERVICE_WARMUP is 0; they keep nothing, so
+# neither the result cache nor the output directory fills with them
+WARMUP_HISTORY = {"recentMoodHistory": [{"stress_level": 8, "anxiety_level": 8}]}
+
+def warmup_tasks(duration: int):
+    """Representative generations that exercise every mood, style and music path"""
+    moods = TherapeuticMusicGenerator.MOODS
+    
+    def music(mood):
+        # Every instrument and a stressed history, so all effect stages run
+        return lambda: music_generator.generate_music({
+            "mood": mood, "duration": duration, "instruments": ["piano", "strings", "flute"],
+            "personalPreferences": WARMUP_HISTORY, "store": "memory"
+        })
+    
+    def art(style, mood):
+        return lambda: art_generator.generate_art({
+            "mood": mood, "artStyle": style, "personalPreferences": WARMUP_HISTORY,
+            "store": "memory"
+        })
+    
+    async def stream():
+        async for _ in music_generator.stream_audio({"mood": "calm", "duration": duration}):
+            pass
+    
+    async def batch():
+        await music_generator.generate_music_batch([
+            {"mood": mood, "duration": duration, "store": "memory"} for mood in moods
+        ])
+    
+    tasks = [(f"music:{mood}", music(mood)) for mood in moods]
+    tasks += [
+        (f"art:{style}", art(style, moods[i % len(moods)]))
+        for i, style in enumerate(art_generator.models)
+    ]
+    tasks += [("music:stream", stream), ("music:batch", batch)]
+    return tasks
+
+warmup = Warmup(
+    warmup_tasks(int(os.getenv("AI_SERVICE_WARMUP_SECONDS", "5")))
+    if os.getenv("AI_SERVICE_WARMUP", "1") != "0" else [],
+    concurrency=render_pool.max_workers
+)
+
+@app.on_event("startup")
+async def start_warmup():
+    """Warm the generators in the background; /ready reports when it is done"""
+    app.state.warmup_task = asyncio.create_task(warmup.run())
+
+@app.on_event("shutdown")
+async def stop_warmup():
+    """Abandon a warm-up still running at shutdown"""
+    task = getattr(app.state, "warmup_task", None)
+    if task is not None and not task.done():
+        task.cancel()
+
+@app.on_event("shutdown")
+def shutdown_render_pool():
+    """Stop the render worker processes with the server"""
+    render_pool.shutdown()
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
+    """Verify API token"""
+    token = credentials.credentials
+    expected_token = os.getenv("AI_SERVICE_API_KEY", "your-ai-service-api-key")
+    if token != expected_token:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    return token
+
+# Pydantic models
+class MusicGenerationRequest(BaseModel):
+    mood: str
+    genre: Optional[str] = None
+    duration: int = 120
+    tempo: Optional[str] = None
+    instruments: Optional[List[str]] = None
+    sampleRate: Optional[int] = None
+    format: Optional[str] = None  # wav, flac, ogg or opus
+    quality: Optional[float] = None  # 0 (smallest) to 1 (best)
+    seed: Optional[int] = None  # Reproduces a track
+    store: Optional[str] = None  # file (default), seed (only the seed and parameters) or memory (nothing)
+    personalPreferences: Optional[Dict[str, Any]] = None
+    fresh: bool = False  # Skip the result cache
+
+class MusicBatchRequest(BaseModel):
+    requests: List[MusicGenerationRequest] = Field(
+        min_length=1, max_length=TherapeuticMusicGenerator.MAX_BATCH_SIZE
+    )
+
+class ArtGenerationRequest(BaseModel):
+    mood: str
+    artStyle: Optional[str] = None
+    colorPalette: Optional[str] = None
+    theme: Optional[str] = None
+    prompt: Optional[str] = None
+    size: Optional[int] = None  # Output width in pixels, 1024 by default, up to 4096
+    quality: Optional[str] = None  # full or draft, a quick reduced preview
+    seed: Optional[int] = None  # Reproduces a render, e.g. a draft in full
+    formats: Optional[List[str]] = None  # png (default), webp and/or jpeg (progressive)
+    compressLevel: Optional[int] = None  # PNG zlib level, 0 (fastest) to 9 (smallest)
+    imageQuality: Optional[int] = None  # WebP and JPEG quality, 1 to 100
+    thumbnails: Optional[List[int]] = None  # Thumbnail widths, 512, 256 and 128 by default
+    store: Optional[str] = None  # file (default), seed (only the seed and parameters) or memory (nothing)
+    personalPreferences: Optional[Dict[str, Any]] = None
+    fresh: bool = False  # Skip the result cache
+
+class GenerationResponse(BaseModel):
+    model_used: str
+    file_path: str
+    audio_url: Optional[str] = None
+    image_url: Optional[str] = None
+    metadata: Dict[str, Any]
+
+class BatchGenerationResponse(BaseModel):
+    results: List[GenerationResponse]
+
+# Music Generation Service
+@app.post("/music/generate", response_model=GenerationResponse)
+async def generate_music(
+    request: MusicGenerationRequest,
+    token: str = Depends(verify_token)
+):
+    """Generate therapeutic music based on user preferences and mood"""
+    try:
+        logger.info(f"Generating music for mood: {request.mood}")
+        return await run_music_generation(request)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Music generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Music generation failed: {str(e)}")
+
+@app.post("/music/stream")
+async def stream_music(
+    request: MusicGenerationRequest,
+    format: Optional[str] = None,
+    token: str = Depends(verify_token)
+):
+    """Stream therapeutic music while it renders
+    
+    The format query parameter (else the request's format, else wav) also
+    accepts pcm for raw 16-bit samples.
+    """
+    container = format or request.format or "wav"
+    request_data = music_generator.with_seed(request.model_dump(exclude_none=True))
+    try:
+        logger.info(f"Streaming music for mood: {request.mood}")
+        chunks = music_generator.stream_audio(request_data, container, quality=request.quality)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    sample_rate = request.sampleRate or music_generator.sample_rate
+    if container == "pcm":
+        media_type = f"audio/L16; rate={sample_rate}; channels=1"
+    else:
+        media_type = FORMATS[container][3]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Sample-Rate": str(sample_rate),
+            "X-Mood": request.mood,
+            "X-Seed": str(request_data["seed"])
+        }
+    )
+
+@app.post("/music/render")
+async def render_music(
+    request: MusicGenerationRequest,
+    token: str = Depends(verify_token)
+):
+    """Render a stored track again from its seed and parameters
+    
+    The body is the artifact parameters from a generation's metadata.
+    """
+    try:
+        logger.info(f"Regenerating music for mood: {request.mood}")
+        content, media_type = await music_generator.regenerate_music(
+            request.model_dump(exclude_none=True)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content, media_type=media_type, headers={"X-Seed": str(request.seed)})
+
+@app.post("/music/generate/batch", response_model=BatchGenerationResponse)
+async def generate_music_batch(
+    request: MusicBatchRequest,
+    token: str = Depends(verify_token)
+):
+    """Generate several therapeutic tracks in one vectorized render"""
+    try:
+        logger.info(f"Generating music batch of {len(request.requests)} tracks")
+        results = await music_generator.generate_music_batch(
+            [item.model_dump(exclude_none=True) for item in request.requests]
+        )
+        return BatchGenerationResponse(results=[
+            music_response(item, result) for item, result in zip(request.requests, results)
+        ])
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch music generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch music generation failed: {str(e)}")
+
+@app.post("/music/jobs", status_code=202)
+async def submit_music_job(
+    request: MusicGenerationRequest,
+    token: str = Depends(verify_token)
+):
+    """Start a music generation and return its job id at once"""
+    logger.info(f"Submitting music job for mood: {request.mood}")
+    return submit_job(
+        "music", MUSIC_STAGES,
+        lambda progress: run_music_generation(request, progress)
+    )
+
+# Art Generation Service
+@app.post("/art/generate", response_model=GenerationResponse)
+async def generate_art(
+    request: ArtGenerationRequest,
+    token: str = Depends(verify_token)
+):
+    """Generate therapeutic art based on user preferences and mood"""
+    try:
+        logger.info(f"Generating art for mood: {request.mood}")
+        return await run_art_generation(request)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Art generation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Art generation failed: {str(e)}")
+
+@app.post("/art/jobs", status_code=202)
+async def submit_art_job(
+    request: ArtGenerationRequest,
+    token: str = Depends(verify_token)
+):
+    """Start an art generation and return its job id at once"""
+    logger.info(f"Submitting art job for mood: {request.mood}")
+    try:
+        art_generator.check_request(request.model_dump(exclude_none=True))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return submit_job(
+        "art", ART_STAGES,
+        lambda progress: run_art_generation(request, progress)
+    )
+
+@app.post("/art/render")
+async def render_art(
+    request: ArtGenerationRequest,
+    output_format: Optional[str] = None,
+    width: Optional[int] = None,
+    token: str = Depends(verify_token)
+):
+    """Render stored art again from its seed and parameters
+    
+    The body is the artifact parameters from a generation's metadata; the
+    output_format and width query parameters pick one of its outputs,
+    the full image in its first format by default.
+    """
+    try:
+        logger.info(f"Regenerating art for mood: {request.mood}")
+        content, media_type = await art_generator.regenerate_art(
+            request.model_dump(exclude_none=True), output_format, width
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content, media_type=media_type, headers={"X-Seed": str(request.seed)})
+
+# Generation jobs
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, token: str = Depends(verify_token)):
+    """Status, per-stage progress and, once completed, the result of a job"""
+    return find_job(job_id).snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, token: str = Depends(verify_token)):
+    """Server-sent progress events of a job, ending with completed or failed"""
+    return StreamingResponse(
+        find_job(job_id).events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+async def run_music_generation(
+    request: MusicGenerationRequest, progress=None
+) -> GenerationResponse:
+    """Generate music for a request and wrap it in the API response"""
+    result = await music_generator.generate_music(
+        request.model_dump(exclude_none=True), progress
+    )
+    return music_response(request, result)
+
+def music_response(
+    request: MusicGenerationRequest, result: Dict[str, Any]
+) -> GenerationResponse:
+    """API response for a generated track"""
+    generation_id = str(uuid.uuid4())
+    metadata = result["metadata"]
+    metadata.update({
+        "generation_id": generation_id,
+        "bpm": get_bpm_for_mood(request.mood),
+        "key": get_key_for_mood(request.mood)
+    })
+    
+    logger.info(
+        f"Music generation completed: {generation_id} "
+        f"(cache {'hit' if metadata['cache']['hit'] else 'miss'})"
+    )
+    
+    return GenerationResponse(
+        model_used=result["model_used"],
+        file_path=result["file_path"],
+        audio_url=result["audio_url"],
+        metadata=metadata
+    )
+
+async def run_art_generation(
+    request: ArtGenerationRequest, progress=None
+) -> GenerationResponse:
+    """Generate art for a request and wrap it in the API response"""
+    generation_id = str(uuid.uuid4())
+    result = await art_generator.generate_art(
+        request.model_dump(exclude_none=True), progress
+    )
+    
+    metadata = result["metadata"]
+    metadata["generation_id"] = generation_id
+    
+    logger.info(
+        f"Art generation completed: {generation_id} "
+        f"(cache {'hit' if metadata['cache']['hit'] else 'miss'})"
+    )
+    
+    return GenerationResponse(
+        model_used=result["model_used"],
+        file_path=result["file_path"],
+        image_url=result["image_url"],
+        metadata=metadata
+    )
+
+def submit_job(kind: str, stages, generate) -> Dict[str, Any]:
+    """Register a background generation and describe where to follow it"""
+    async def run(progress) -> Dict[str, Any]:
+        response = await generate(progress)
+        return response.model_dump()
+    
+    try:
+        job = job_manager.submit(kind, stages, run)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }
+
+def find_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Helper functions
+def get_bpm_for_mood(mood: str) -> int:
+    """Get appropriate BPM for mood"""
+    mood_bpm_map = {
+        "calm": 60,
+        "peaceful": 65,
+        "sad": 70,
+        "anxious": 80,
+        "happy": 120,
+        "energetic": 140
+    }
+    return mood_bpm_map.get(mood, 90)
+
+def get_key_for_mood(mood: str) -> str:
+    """Get appropriate musical key for mood"""
+    mood_key_map = {
+        "calm": "C major",
+        "peaceful": "F major",
+        "sad": "D minor",
+        "anxious": "A minor",
+        "happy": "G major",
+        "energetic": "E major"
+    }
+    return mood_key_map.get(mood, "C major")
+
+def create_art_prompt(request: ArtGenerationRequest) -> str:
+    """Create therapeutic art prompt based on request"""
+    base_prompt = f"A therapeutic {request.artStyle or 'abstract'} artwork"
+    
+    if request.theme:
+        base_prompt += f" representing {request.theme}"
+    
+    if request.colorPalette:
+        base_prompt += f" with {request.colorPalette} colors"
+    
+    if request.mood:
+        mood_descriptors = {
+            "calm": "serene, peaceful, flowing",
+            "peaceful": "tranquil, gentle, harmonious",
+            "sad": "melancholic, soft, comforting",
+            "anxious": "balanced, grounding, stable",
+            "happy": "bright, uplifting, joyful",
+            "energetic": "dynamic, vibrant, motivating"
+        }
+        base_prompt += f" that evokes {mood_descriptors.get(request.mood, 'balance')}"
+    
+    base_prompt += ", therapeutic, healing, digital art, high quality"
+    
+    if request.prompt:
+        base_prompt += f", {request.prompt}"
+    
+    return base_prompt
+
+# Health check endpoint
+@app.get("/health")
+async def health_check():
+    """Liveness: the process is up, whether or not it has warmed up (see /ready)"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "service": "serenity-ai-services"
+    }
+
+# Readiness probe for the load balancer
+@app.get("/ready")
+async def readiness_check():
+    """Warm-up progress; 200 once the instance is warm, 503 until then"""
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+# Result cache counters
+@app.get("/cache/stats")
+async def cache_stats(token: str = Depends(verify_token)):
+    """Hit, miss and eviction counters of the generation result cache"""
+    return result_cache.stats()
+
+# Root endpoint
+@app.get("/")
+async def root():
+    """Root endpoint"""
+    return {
+        "message": "SerenityAI Services",
+        "version": "1.0.0",
+        "endpoints": {
+            "music_generation": "/music/generate",
+            "art_generation": "/art/generate",
+            "music_batch": "/music/generate/batch",
+            "music_stream": "/music/stream",
+            "music_render": "/music/render",
+            "art_render": "/art/render",
+            "music_jobs": "/music/jobs",
+            "art_jobs": "/art/jobs",
+            "job_status": "/jobs/{job_id}",
+            "job_events": "/jobs/{job_id}/events",
+            "cache_stats": "/cache/stats",
+            "health": "/health",
+            "ready": "/ready"
+        }
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,328 +1,1894 @@
-from typing import List, Dict, Any, Optional
-import numpy as np
-import librosa
-import soundfile as sf
-from datetime import datetime
-import os
-import asyncio
-import logging
-
-logger = logging.getLogger(__name__)
-
-class TherapeuticMusicGenerator:
-    """Advanced therapeutic music generation using AI models"""
-    
-    def __init__(self):
-        self.sample_rate = 22050
-        self.duration = 120  # Default 2 minutes
-        self.models = {
-            "ambient": "musicgen-ambient",
-            "classical": "musicgen-classical", 
-            "nature": "musicgen-nature",
-            "binaural": "musicgen-binaural",
-            "meditation": "musicgen-meditation"
-        }
-    
-    async def generate_music(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate therapeutic music based on user preferences"""
-        try:
-            mood = request_data.get("mood", "calm")
-            genre = request_data.get("genre", "ambient")
-            duration = request_data.get("duration", 120)
-            tempo = request_data.get("tempo", "medium")
-            instruments = request_data.get("instruments", ["piano"])
-            
-            # Get user's mood history for personalization
-            personal_prefs = request_data.get("personalPreferences", {})
-            mood_history = personal_prefs.get("recentMoodHistory", [])
-            
-            # Generate base therapeutic composition
-            composition = await self._create_base_composition(
-                mood, genre, duration, tempo, instruments
-            )
-            
-            # Apply therapeutic transformations
-            therapeutic_audio = await self._apply_therapeutic_effects(
-                composition, mood, mood_history
-            )
-            
-            # Add binaural beats if beneficial
-            if self._should_add_binaural_beats(mood):
-                therapeutic_audio = await self._add_binaural_beats(
-                    therapeutic_audio, mood
-                )
-            
-            # Generate file and metadata
-            file_path = await self._save_audio(therapeutic_audio, duration)
-            metadata = self._create_metadata(
-                mood, genre, duration, tempo, instruments, composition
-            )
-            
-            return {
-                "model_used": f"SerenityAI-MusicGen-{genre}",
-                "file_path": file_path,
-                "audio_url": f"https://api.serenity-ai.com/files/{file_path}",
-                "metadata": metadata
-            }
-            
-        except Exception as e:
-            logger.error(f"Music generation error: {str(e)}")
-            raise
-    
-    async def _create_base_composition(
-        self, mood: str, genre: str, duration: int, tempo: str, instruments: List[str]
-    ) -> np.ndarray:
-        """Create base musical composition"""
-        
-        # Mood-based parameters
-        mood_params = self._get_mood_parameters(mood)
-        
-        # Generate base frequency components
-        base_freq = mood_params["base_frequency"]
-        harmonics = mood_params["harmonics"]
-        
-        # Create time array
-        t = np.linspace(0, duration, int(self.sample_rate * duration), False)
-        
-        # Generate base composition
-        composition = np.zeros_like(t)
-        
-        # Add harmonic layers based on mood
-        for i, harmonic in enumerate(harmonics):
-            amplitude = mood_params["amplitudes"][i]
-            frequency = base_freq * harmonic
-            
-            # Add some variation and organic feel
-            freq_variation = np.sin(2 * np.pi * 0.1 * t) * 0.1
-            phase = np.random.random() * 2 * np.pi
-            
-            wave = amplitude * np.sin(2 * np.pi * frequency * t + freq_variation + phase)
-            
-            # Apply envelope
-            envelope = self._create_envelope(len(t), mood)
-            composition += wave * envelope
-        
-        # Add instrument-specific characteristics
-        for instrument in instruments:
-            composition = self._apply_instrument_characteristics(composition, instrument)
-        
-        return composition
-    
-    async def _apply_therapeutic_effects(
-        self, composition: np.ndarray, mood: str, mood_history: List[Dict]
-    ) -> np.ndarray:
-        """Apply therapeutic effects based on mood and history"""
-        
-        # Analyze mood patterns
-        if mood_history:
-            avg_stress = np.mean([entry.get("stress_level", 5) for entry in mood_history])
-            avg_anxiety = np.mean([entry.get("anxiety_level", 5) for entry in mood_history])
-        else:
-            avg_stress = 5
-            avg_anxiety = 5
-        
-        # Apply stress-reduction effects
-        if avg_stress > 6:
-            composition = self._apply_stress_reduction(composition)
-        
-        # Apply anxiety-relief effects
-        if avg_anxiety > 6:
-            composition = self._apply_anxiety_relief(composition)
-        
-        # Apply mood-specific therapeutic effects
-        if mood == "sad":
-            composition = self._apply_mood_lifting(composition)
-        elif mood == "anxious":
-            composition = self._apply_calming_effects(composition)
-        elif mood == "energetic":
-            composition = self._apply_grounding_effects(composition)
-        
-        return composition
-    
-    def _get_mood_parameters(self, mood: str) -> Dict[str, Any]:
-        """Get audio parameters for specific mood"""
-        mood_params = {
-            "calm": {
-                "base_frequency": 220.0,  # A3
-                "harmonics": [1, 1.5, 2, 3],
-                "amplitudes": [0.8, 0.4, 0.2, 0.1],
-                "envelope_type": "slow_rise"
-            },
-            "peaceful": {
-                "base_frequency": 174.0,  # Healing frequency
-                "harmonics": [1, 1.618, 2, 2.618],  # Golden ratio harmonics
-                "amplitudes": [0.7, 0.5, 0.3, 0.2],
-                "envelope_type": "gentle"
-            },
-            "sad": {
-                "base_frequency": 256.0,  # C4
-                "harmonics": [1, 1.2, 1.8, 2.4],
-                "amplitudes": [0.9, 0.3, 0.2, 0.1],
-                "envelope_type": "gradual_lift"
-            },
-            "anxious": {
-                "base_frequency": 432.0,  # A4 (healing frequency)
-                "harmonics": [1, 1.5, 2, 2.5],
-                "amplitudes": [0.6, 0.4, 0.3, 0.2],
-                "envelope_type": "stabilizing"
-            },
-            "happy": {
-                "base_frequency": 528.0,  # Love frequency
-                "harmonics": [1, 1.25, 1.5, 2],
-                "amplitudes": [0.7, 0.5, 0.4, 0.3],
-                "envelope_type": "uplifting"
-            },
-            "energetic": {
-                "base_frequency": 396.0,  # Liberation frequency
-                "harmonics": [1, 1.33, 1.66, 2],
-                "amplitudes": [0.8, 0.6, 0.4, 0.2],
-                "envelope_type": "dynamic"
-            }
-        }
-        
-        return mood_params.get(mood, mood_params["calm"])
-    
-    def _create_envelope(self, length: int, mood: str) -> np.ndarray:
-        """Create amplitude envelope for therapeutic effect"""
-        t = np.linspace(0, 1, length)
-        
-        envelope_types = {
-            "slow_rise": np.sqrt(t),
-            "gentle": np.sin(np.pi * t / 2),
-            "gradual_lift": np.power(t, 0.3),
-            "stabilizing": 0.5 + 0.5 * np.sin(2 * np.pi * t),
-            "uplifting": np.power(t, 0.8),
-            "dynamic": 0.7 + 0.3 * np.sin(4 * np.pi * t)
-        }
-        
-        mood_params = self._get_mood_parameters(mood)
-        envelope_type = mood_params.get("envelope_type", "gentle")
-        
-        return envelope_types.get(envelope_type, envelope_types["gentle"])
-    
-    def _apply_instrument_characteristics(self, composition: np.ndarray, instrument: str) -> np.ndarray:
-        """Apply instrument-specific audio characteristics"""
-        if instrument == "piano":
-            # Add piano-like attack and decay
-            composition = self._add_piano_characteristics(composition)
-        elif instrument == "strings":
-            # Add string-like sustain and vibrato
-            composition = self._add_string_characteristics(composition)
-        elif instrument == "flute":
-            # Add flute-like breath and harmonics
-            composition = self._add_flute_characteristics(composition)
-        
-        return composition
-    
-    def _add_piano_characteristics(self, composition: np.ndarray) -> np.ndarray:
-        """Add piano-like characteristics"""
-        # Simple piano-like envelope
-        envelope = np.exp(-np.linspace(0, 5, len(composition)))
-        return composition * envelope
-    
-    def _add_string_characteristics(self, composition: np.ndarray) -> np.ndarray:
-        """Add string-like characteristics"""
-        # Add slight vibrato
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        vibrato = 1 + 0.02 * np.sin(2 * np.pi * 5 * t)  # 5Hz vibrato
-        return composition * vibrato
-    
-    def _add_flute_characteristics(self, composition: np.ndarray) -> np.ndarray:
-        """Add flute-like characteristics"""
-        # Add breath noise simulation
-        noise = np.random.normal(0, 0.01, len(composition))
-        return composition + noise
-    
-    def _apply_stress_reduction(self, composition: np.ndarray) -> np.ndarray:
-        """Apply stress-reduction audio effects"""
-        # Add low-frequency components for grounding
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        grounding_freq = np.sin(2 * np.pi * 40 * t) * 0.1  # 40Hz grounding
-        return composition + grounding_freq
-    
-    def _apply_anxiety_relief(self, composition: np.ndarray) -> np.ndarray:
-        """Apply anxiety-relief audio effects"""
-        # Add alpha wave frequencies (8-12 Hz)
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        alpha_waves = np.sin(2 * np.pi * 10 * t) * 0.05  # 10Hz alpha
-        return composition + alpha_waves
-    
-    def _apply_mood_lifting(self, composition: np.ndarray) -> np.ndarray:
-        """Apply mood-lifting effects"""
-        # Gradually increase brightness
-        t = np.linspace(0, 1, len(composition))
-        brightness = 1 + 0.3 * t
-        return composition * brightness
-    
-    def _apply_calming_effects(self, composition: np.ndarray) -> np.ndarray:
-        """Apply calming effects"""
-        # Add theta wave frequencies (4-8 Hz)
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        theta_waves = np.sin(2 * np.pi * 6 * t) * 0.03  # 6Hz theta
-        return composition + theta_waves
-    
-    def _apply_grounding_effects(self, composition: np.ndarray) -> np.ndarray:
-        """Apply grounding effects for high energy"""
-        # Add deeper bass frequencies
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        bass = np.sin(2 * np.pi * 60 * t) * 0.2  # 60Hz bass
-        return composition + bass
-    
-    def _should_add_binaural_beats(self, mood: str) -> bool:
-        """Determine if binaural beats would be beneficial"""
-        return mood in ["anxious", "stressed", "sad", "energetic"]
-    
-    async def _add_binaural_beats(self, composition: np.ndarray, mood: str) -> np.ndarray:
-        """Add binaural beats for therapeutic effect"""
-        # Binaural beat frequencies for different moods
-        beat_frequencies = {
-            "anxious": 8,   # Alpha waves
-            "stressed": 6,  # Theta waves
-            "sad": 10,      # Alpha waves
-            "energetic": 4  # Theta waves for grounding
-        }
-        
-        beat_freq = beat_frequencies.get(mood, 8)
-        
-        # Create binaural beats (simplified - normally would be stereo)
-        t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
-        binaural = np.sin(2 * np.pi * beat_freq * t) * 0.1
-        
-        return composition + binaural
-    
-    async def _save_audio(self, audio: np.ndarray, duration: int) -> str:
-        """Save generated audio to file"""
-        # Normalize audio
-        audio = audio / np.max(np.abs(audio))
-        
-        # Create filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"therapeutic_music_{timestamp}.wav"
-        
-        # In production, save to cloud storage
-        # For now, return a mock path
-        return f"music/{filename}"
-    
-    def _create_metadata(self, mood: str, genre: str, duration: int, tempo: str, 
-                        instruments: List[str], composition: np.ndarray) -> Dict[str, Any]:
-        """Create metadata for generated music"""
-        return {
-            "mood": mood,
-            "genre": genre,
-            "duration": duration,
-            "tempo": tempo,
-            "instruments": instruments,
-            "therapeutic_elements": {
-                "binaural_beats": self._should_add_binaural_beats(mood),
-                "healing_frequencies": True,
-                "stress_reduction": True,
-                "anxiety_relief": True
-            },
-            "audio_properties": {
-                "sample_rate": self.sample_rate,
-                "channels": 1,
-                "bit_depth": 16,
-                "dynamic_range": float(np.max(composition) - np.min(composition))
-            },
-            "generated_at": datetime.now().isoformat()
-        }
+from typing import List, Dict, Any, AsyncIterator, BinaryIO, Callable, Iterator, Optional, Tuple, Union
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from fractions import Fraction
+import io
+import os
+import struct
+import threading
+import uuid
+import asyncio
+import logging
+
+from audio_encoding import FORMATS, AudioEncoder, check_output
+from buffer_pool import AudioBufferPool, get_buffer_pool
+from caching import LRUCache, ResultCache
+from oscillators import PhasorBank, phase_modulated_sum
+from stems import StemLibrary, harmonics_stem, open_stem_library, sine_stem
+from workers import RenderPool, SharedArray, export_array, worker_generator
+
+logger = logging.getLogger(__name__)
+
+# Optional progress callback: (stage, fraction of the stage done)
+Progress = Optional[Callable[[str, float], None]]
+
+def _curve_bytes(curves: Dict[str, Any]) -> int:
+    """Memory held by a compiled effect-curve set"""
+    arrays = [curves["instrument_gain"], curves["gain"], curves["additive"]]
+    return sum(array.nbytes for array in arrays + curves["noise_gains"] if array is not None)
+
+# Compiled effect curves are read-only, so one cache serves every worker thread
+_effect_curve_cache = LRUCache(max_entries=32, max_bytes=256 * 2**20, sizeof=_curve_bytes)
+
+class TherapeuticMusicGenerator:
+    """Advanced therapeutic music generation using AI models"""
+    
+    # Samples per oscillator phase ramp in the in-place renderer
+    PHASE_SPAN = 1024
+    
+    # In-place envelope shapes: ("power", exponent) or ("sine", scale, depth, offset)
+    ENVELOPE_SHAPES = {
+        "slow_rise": ("power", 0.5),
+        "gentle": ("sine", np.pi / 2, 1.0, 0.0),
+        "gradual_lift": ("power", 0.3),
+        "stabilizing": ("sine", 2 * np.pi, 0.5, 0.5),
+        "uplifting": ("power", 0.8),
+        "dynamic": ("sine", 4 * np.pi, 0.3, 0.7)
+    }
+    
+    # Delivery rates accepted through the request's sampleRate
+    MIN_SAMPLE_RATE = 8000
+    MAX_SAMPLE_RATE = 96000
+    # Longest track a request may ask for, in seconds; the reference
+    # renderer holds several full-length float64 arrays
+    MAX_DURATION = 600
+    # Reduced-rate synthesis runs at no less than this multiple of the
+    # highest partial, which keeps the upsampling filter's transition band
+    # clear of the signal
+    RENDER_RATE_HEADROOM = 4
+    RESAMPLE_WINDOW = ("kaiser", 10.0)
+    RESAMPLE_GUARD = 32  # Extra render samples on each side of the track
+    # The power envelopes are not band-limited at u = 0, so the first
+    # samples of a reduced-rate track are re-rendered at the delivery rate
+    RESAMPLE_ONSET = 256
+    # Effect operations that scale the signal; the rest add to it
+    GAIN_OPS = ("decay", "vibrato", "vibrato_bank", "vibrato_loop", "lift")
+    # Batch renders take at most this many requests and hold at most this
+    # many samples of unquantized audio at once
+    MAX_BATCH_SIZE = 64
+    BATCH_SAMPLES = 2**24
+    # Loop rendering repeats a segment of this many seconds, a whole period
+    # of the 0.1 Hz phase variation
+    LOOP_SECONDS = 10
+    # Moods with their own synthesis parameters (all pre-rendered into a
+    # stem library), and the instruments whose stationary treatment is
+    # folded into each harmonic stem
+    MOODS = ("calm", "peaceful", "sad", "anxious", "happy", "energetic")
+    STEM_TREATMENTS = {"plain": [], "strings": ["strings"]}
+    
+    def __init__(self, inplace: bool = False, buffer_pool: Optional[AudioBufferPool] = None,
+                 precision: str = "float64", oscillator: str = "sine",
+                 reduced_rate: bool = False, compiled_effects: bool = False,
+                 effect_cache: Optional[LRUCache] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 render_pool: Optional[RenderPool] = None, loop: bool = False,
+                 output_dir: Optional[str] = None, stem_dir: Optional[str] = None):
+        if precision not in ("float64", "float32"):
+            raise ValueError(f"Unsupported precision: {precision}")
+        if oscillator not in ("sine", "phasor"):
+            raise ValueError(f"Unsupported oscillator: {oscillator}")
+        
+        self.sample_rate = 22050
+        self.duration = 120  # Default 2 minutes
+        self.block_size = 8192  # Samples per streamed block
+        # Render into reusable per-worker buffers instead of fresh arrays;
+        # float32, phasor-bank, reduced-rate, compiled-effect and loop
+        # rendering always go through the in-place path
+        self.precision = precision
+        self.oscillator = oscillator
+        self.reduced_rate = reduced_rate
+        self.compiled_effects = compiled_effects
+        # Tile one rendered loop of the stationary stages over long tracks
+        self.loop = loop
+        # Mix the stationary stages from a pre-rendered stem library (see
+        # stems.py) instead of synthesizing them; mapped once per process
+        self.stem_dir = stem_dir
+        self.stems = open_stem_library(stem_dir) if stem_dir else None
+        self.effect_cache = effect_cache if effect_cache is not None else _effect_curve_cache
+        self.inplace = (
+            inplace or precision == "float32" or oscillator == "phasor"
+            or reduced_rate or compiled_effects or loop or self.stems is not None
+        )
+        # Identical requests are answered from here unless they ask for
+        # fresh output
+        self.result_cache = result_cache
+        # CPU-bound rendering runs in these worker processes when set
+        self.render_pool = render_pool
+        # Encoded tracks are written below this directory; without one they
+        # are encoded in memory, measured and discarded
+        self.output_dir = output_dir
+        self.buffer_pool = buffer_pool
+        # In-place streams render into pools of their own, at their block
+        # size, taken from here and put back when the stream ends
+        self._stream_pools: List[AudioBufferPool] = []
+        self._stream_pools_lock = threading.Lock()
+        self.models = {
+            "ambient": "musicgen-ambient",
+            "classical": "musicgen-classical", 
+            "nature": "musicgen-nature",
+            "binaural": "musicgen-binaural",
+            "meditation": "musicgen-meditation"
+        }
+    
+    async def generate_music(
+        self, request_data: Dict[str, Any], progress: Progress = None
+    ) -> Dict[str, Any]:
+        """Generate therapeutic music based on user preferences
+        
+        ``progress`` is called with each stage (composition, effects,
+        binaural, encode) and the fraction of it completed. The request's
+        ``seed``, drawn when not given, is reported in the metadata; with
+        ``store`` set to "seed" the track is only encoded in memory and
+        measured, and the metadata's artifact carries the parameters
+        regenerate_music renders the same bytes from; set to "memory" the
+        track is not cached either, so nothing of it is kept.
+        """
+        try:
+            self._output_format(request_data)
+            
+            cache_key = None
+            if self.result_cache is not None and request_data.get("store") != "memory":
+                cache_key = self.result_cache.key("music", self._cache_params(request_data))
+                if not request_data.get("fresh"):
+                    cached, tier = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        cached["metadata"]["cache"] = {"hit": True, "tier": tier, "key": cache_key}
+                        return cached
+            
+            request_data = self.with_seed(request_data)
+            file_path, destination = self._output_file(request_data)
+            if self.render_pool is not None:
+                # Render and encode in a worker process; the event loop
+                # stays free meanwhile
+                render_info = await self.render_pool.run(
+                    _encode_music_job, self._worker_config(), request_data,
+                    destination, progress=progress
+                )
+            else:
+                render_info = await self._render_encoded(request_data, destination, progress)
+            if progress:
+                progress("encode", 1.0)
+            
+            result = self._music_result(request_data, file_path, render_info)
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+                result["metadata"]["cache"] = {"hit": False, "tier": None, "key": cache_key}
+            
+            return result
+        
+        except Exception as e:
+            logger.error(f"Music generation error: {str(e)}")
+            raise
+    
+    async def generate_music_batch(
+        self, requests: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Generate several tracks in one call, in the order requested
+        
+        Requests answered by the result cache are returned from it; the rest
+        are rendered together as rows of 2-D arrays (see _render_batch_pcm).
+        """
+        try:
+            if len(requests) > self.MAX_BATCH_SIZE:
+                raise ValueError(f"Batch exceeds {self.MAX_BATCH_SIZE} tracks")
+            for request_data in requests:
+                self._output_format(request_data)
+            
+            results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+            cache_keys: List[Optional[str]] = [None] * len(requests)
+            if self.result_cache is not None:
+                for i, request_data in enumerate(requests):
+                    if request_data.get("store") == "memory":
+                        continue
+                    cache_keys[i] = self.result_cache.key("music", self._cache_params(request_data))
+                    if not request_data.get("fresh"):
+                        cached, tier = self.result_cache.get(cache_keys[i])
+                        if cached is not None:
+                            cached["metadata"]["cache"] = {"hit": True, "tier": tier, "key": cache_keys[i]}
+                            results[i] = cached
+            
+            pending = [i for i, result in enumerate(results) if result is None]
+            pending_requests = [self.with_seed(requests[i]) for i in pending]
+            if not pending:
+                return results
+            
+            if self.render_pool is not None:
+                rendered = await self.render_pool.run(
+                    _render_music_batch_job, self._worker_config(), pending_requests
+                )
+                file_paths = []
+                for (handle, render_info), request_data in zip(rendered, pending_requests):
+                    with SharedArray(handle) as pcm:
+                        file_path, render_info["encoding"] = await self._save_audio(pcm, request_data)
+                    file_paths.append(file_path)
+            else:
+                rendered = await self._render_batch_pcm(pending_requests)
+                file_paths = []
+                for (pcm, render_info), request_data in zip(rendered, pending_requests):
+                    file_path, render_info["encoding"] = await self._save_audio(pcm, request_data)
+                    file_paths.append(file_path)
+            render_infos = [render_info for _, render_info in rendered]
+            
+            for i, request_data, file_path, render_info in zip(
+                pending, pending_requests, file_paths, render_infos
+            ):
+                result = self._music_result(request_data, file_path, render_info)
+                if cache_keys[i] is not None:
+                    self.result_cache.put(cache_keys[i], result)
+                    result["metadata"]["cache"] = {"hit": False, "tier": None, "key": cache_keys[i]}
+                results[i] = result
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Batch music generation error: {str(e)}")
+            raise
+    
+    async def regenerate_music(self, params: Dict[str, Any]) -> Tuple[bytes, str]:
+        """Render a track again from the parameters in its metadata
+        
+        Returns the encoded bytes, identical to those generate_music wrote
+        for WAV and FLAC (Ogg streams get a new random serial number), and
+        their media type.
+        """
+        if params.get("seed") is None:
+            raise ValueError("Regenerating music needs the seed it was rendered from")
+        self._output_format(params)
+        if self.render_pool is not None:
+            data = await self.render_pool.run(_encoded_music_job, self._worker_config(), params)
+        else:
+            data = await self._encoded_bytes(params)
+        return data, FORMATS[params.get("format") or "wav"][3]
+    
+    def with_seed(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Request data with its seed, drawn when not given
+        
+        Phases, noise and dither all come from Generators derived from the
+        seed, so a worker process renders the same track as this one.
+        """
+        if request_data.get("seed") is not None:
+            return request_data
+        return dict(request_data, seed=int(np.random.default_rng().integers(0, 2**31)))
+    
+    async def _encoded_bytes(self, request_data: Dict[str, Any]) -> bytes:
+        """Render and encode a seeded request into memory"""
+        buffer = io.BytesIO()
+        await self._render_encoded(request_data, buffer)
+        return buffer.getvalue()
+    
+    def _music_result(
+        self, request_data: Dict[str, Any], file_path: str, render_info: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Result payload of a rendered request"""
+        genre = request_data.get("genre", "ambient")
+        metadata = self._create_metadata(
+            request_data.get("mood", "calm"), genre, request_data.get("duration", 120),
+            request_data.get("tempo", "medium"), request_data.get("instruments", ["piano"]),
+            render_info["dynamic_range"], self._delivery_rate(request_data),
+            render_info["render_sample_rate"]
+        )
+        for stats in ("buffer_pool", "effect_cache", "batch", "loop", "stems", "encoding"):
+            if stats in render_info:
+                metadata[stats] = render_info[stats]
+        metadata["seed"] = request_data["seed"]
+        metadata["artifact"] = {
+            "stored": request_data.get("store", "file"),
+            "params": {
+                key: value for key, value in request_data.items() if key not in ("fresh", "store")
+            }
+        }
+        
+        return {
+            "model_used": f"SerenityAI-MusicGen-{genre}",
+            "file_path": file_path,
+            "audio_url": f"https://api.serenity-ai.com/files/{file_path}",
+            "metadata": metadata
+        }
+    
+    async def _render_encoded(
+        self, request_data: Dict[str, Any], destination: Union[str, BinaryIO, None],
+        progress: Progress = None
+    ) -> Dict[str, Any]:
+        """Render a request and encode it block by block as it is quantized
+        
+        This is the CPU-bound part of generate_music, run either in process
+        or in a render pool worker. The track is written to destination, a
+        path or a file object, or encoded in memory, measured and discarded,
+        when that is None. Returns the render details
+        reported in the metadata, including the encoding.
+        """
+        output_format, quality = self._output_format(request_data)
+        with AudioEncoder(
+            destination, self._delivery_rate(request_data), output_format, quality
+        ) as encoder:
+            _, render_info = await self._render_pcm(request_data, progress, encoder.write)
+        render_info["encoding"] = encoder.close()
+        return render_info
+    
+    async def _render_pcm(
+        self, request_data: Dict[str, Any], progress: Progress = None,
+        on_block: Optional[Callable[[np.ndarray], None]] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Render a request to normalized 16-bit PCM at its delivery rate
+        
+        Returns the PCM and the render details reported in the metadata.
+        ``on_block`` receives the PCM block by block as it is quantized.
+        Quantization counts as the first half of the encode stage.
+        """
+        rng = np.random.default_rng(request_data.get("seed"))
+        mood = request_data.get("mood", "calm")
+        genre = request_data.get("genre", "ambient")
+        duration = self._duration(request_data)
+        tempo = request_data.get("tempo", "medium")
+        instruments = request_data.get("instruments", ["piano"])
+        sample_rate = self._delivery_rate(request_data)
+        personal_prefs = request_data.get("personalPreferences", {})
+        mood_history = personal_prefs.get("recentMoodHistory", [])
+        
+        if self.inplace:
+            # Render all stages into the worker's preallocated buffers
+            pool = self._get_buffer_pool()
+            pool.begin_request()
+            plan = self._plan_render(request_data, reduce_rate=self.reduced_rate)
+            return self._render_plan_pcm(plan, pool, progress, on_block)
+        
+        # Generate base therapeutic composition
+        composition = await self._create_base_composition(
+            mood, genre, duration, tempo, instruments, rng
+        )
+        dynamic_range = float(np.max(composition) - np.min(composition))
+        if progress:
+            progress("composition", 1.0)
+        
+        # Apply therapeutic transformations
+        therapeutic_audio = await self._apply_therapeutic_effects(
+            composition, mood, mood_history
+        )
+        if progress:
+            progress("effects", 1.0)
+        
+        # Add binaural beats if beneficial
+        if self._should_add_binaural_beats(mood):
+            therapeutic_audio = await self._add_binaural_beats(
+                therapeutic_audio, mood
+            )
+        if progress:
+            progress("binaural", 1.0)
+        
+        # Other delivery rates are resampled from the native render
+        if sample_rate != self.sample_rate:
+            therapeutic_audio = self._resample(
+                therapeutic_audio, self.sample_rate, sample_rate
+            )
+        
+        # Normalization is folded into the 16-bit quantization
+        peak = float(np.max(np.abs(therapeutic_audio)))
+        pcm = self._quantize_pcm16(therapeutic_audio, peak, on_block, rng)
+        if progress:
+            progress("encode", 0.5)
+        return pcm, {"dynamic_range": dynamic_range, "render_sample_rate": self.sample_rate}
+    
+    def _render_plan_pcm(
+        self, plan: Dict[str, Any], pool: AudioBufferPool, progress: Progress = None,
+        on_block: Optional[Callable[[np.ndarray], None]] = None
+    ) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Render a plan in place to normalized 16-bit PCM and its render details"""
+        therapeutic_audio, dynamic_range, peak = self._render_track_inplace(plan, pool, progress)
+        pcm = self._quantize_pcm16(therapeutic_audio, peak, on_block, plan["rng"])
+        if progress:
+            progress("encode", 0.5)
+        render_info = {
+            "dynamic_range": dynamic_range,
+            "render_sample_rate": plan["render_rate"],
+            "buffer_pool": pool.request_stats()
+        }
+        if self.compiled_effects:
+            render_info["effect_cache"] = self.effect_cache.stats()
+        if "loop" in plan:
+            render_info["loop"] = {"seconds": self.LOOP_SECONDS, "samples": len(plan["loop"])}
+        if "stem_treatment" in plan:
+            render_info["stems"] = {
+                "version": self.stems.version,
+                "treatment": plan["stem_treatment"],
+                "offset_seconds": round(plan["loop_offset"] / plan["render_rate"], 3)
+            }
+        return pcm, render_info
+    
+    async def _render_batch_pcm(
+        self, requests: List[Dict[str, Any]]
+    ) -> List[Tuple[np.ndarray, Dict[str, Any]]]:
+        """Render several requests to normalized 16-bit PCM, in request order
+        
+        Tracks on the same time grid (delivery rate and duration) are
+        rendered together as rows of one array, ordered by mood and effect
+        chain (see _render_batch_rows). Batches always render at the
+        delivery rate, and the rows of a grid are split into chunks of at
+        most BATCH_SAMPLES samples. Plans the kernel would render
+        differently (see _batchable) are rendered one by one through the
+        single-track renderer, so a batched track is the one generate_music
+        and regenerate_music render for the same request.
+        """
+        plans = [
+            self._plan_render(request_data, reduce_rate=self.reduced_rate)
+            for request_data in requests
+        ]
+        pool = self._get_buffer_pool()
+        pool.begin_request()
+        
+        rendered: List[Optional[Tuple[np.ndarray, Dict[str, Any]]]] = [None] * len(plans)
+        grids: Dict[Tuple[int, int, float], List[int]] = {}
+        for i, plan in enumerate(plans):
+            if not self._batchable(plan):
+                if self.inplace:
+                    rendered[i] = self._render_plan_pcm(plan, pool)
+                else:
+                    rendered[i] = await self._render_pcm(requests[i])
+                rendered[i][1]["batch"] = {"size": len(plans), "rows": 1}
+                continue
+            grid = (plan["sample_rate"], plan["num_samples"], plan["duration"])
+            grids.setdefault(grid, []).append(i)
+        
+        for (sample_rate, num_samples, _), members in grids.items():
+            members.sort(key=lambda i: self._chain_key(plans[i]))
+            chunk = max(self.BATCH_SAMPLES // max(num_samples, 1), 1)
+            for first in range(0, len(members), chunk):
+                rows = members[first:first + chunk]
+                tracks, dynamic_ranges, peaks = self._render_batch_rows(
+                    [plans[i] for i in rows], pool
+                )
+                for row, i in enumerate(rows):
+                    pcm = self._quantize_pcm16(tracks[row], float(peaks[row]), rng=plans[i]["rng"])
+                    rendered[i] = (pcm, {
+                        "dynamic_range": float(dynamic_ranges[row]),
+                        "render_sample_rate": sample_rate,
+                        "batch": {"size": len(plans), "rows": len(rows)}
+                    })
+        
+        effect_cache = self.effect_cache.stats()
+        for _, render_info in rendered:
+            render_info["effect_cache"] = effect_cache
+        return rendered
+    
+    def _batchable(self, plan: Dict[str, Any]) -> bool:
+        """Whether the batch kernel renders a plan to the same PCM as the
+        single-track renderer
+        
+        The kernel synthesizes the mood's partials directly, at the delivery
+        rate, as float64 matrix products, and draws breath noise as the
+        in-place renderer does. Plans tiling a loop (synthesized or mixed
+        from stems) or synthesized at a reduced rate are not batched, nor are
+        float32 renders, whose rounding differs by a step of the dither, or,
+        on the reference renderer, plans with breath noise or resampled to
+        their delivery rate.
+        """
+        if "loop" in plan or plan["rate_factor"] != 1 or self.precision != "float64":
+            return False
+        return self.inplace or (
+            "noise_rng" not in plan and plan["sample_rate"] == self.sample_rate
+        )
+    
+    def _render_batch_rows(
+        self, plans: List[Dict[str, Any]], pool: AudioBufferPool
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Render plans that share a time grid as the rows of one array
+        
+        Plans must be ordered so that each mood and each effect chain forms a
+        run of consecutive rows. Per block, a mood's partials are evaluated
+        once as a sin/cos basis, since sin(x + phase) = sin(x) cos(phase) +
+        cos(x) sin(phase); every row of the mood is then one matrix product
+        of its phase weights with that basis. Each chain's compiled effect
+        curves are broadcast across its rows. Returns the unnormalized
+        tracks, each row's dynamic range before the therapeutic effects and
+        each row's peak amplitude.
+        """
+        dtype = np.dtype(self.precision)
+        num_samples, duration = plans[0]["num_samples"], plans[0]["duration"]
+        tracks = np.empty((len(plans), num_samples), dtype=dtype)
+        low = np.full(len(plans), np.inf)
+        high = np.full(len(plans), -np.inf)
+        peak = np.zeros(len(plans))
+        
+        moods = []
+        for span in self._row_spans(plans, lambda plan: plan["mood"]):
+            mood_params = plans[span.start]["mood_params"]
+            amplitudes = np.asarray(mood_params["amplitudes"], dtype=np.float64)
+            phases = np.asarray([plan["phases"] for plan in plans[span]])
+            weights = np.empty((len(phases), 2 * len(amplitudes)), dtype=dtype)
+            weights[:, 0::2] = amplitudes * np.cos(phases)
+            weights[:, 1::2] = amplitudes * np.sin(phases)
+            frequencies = mood_params["base_frequency"] * np.asarray(mood_params["harmonics"])
+            moods.append((span, 2 * np.pi * frequencies, weights))
+        chains = [
+            (span, self._effect_curves(plans[span.start], pool, 0, num_samples))
+            for span in self._row_spans(plans, self._chain_key)
+        ]
+        
+        partials = max(len(omegas) for _, omegas, _ in moods)
+        basis = np.empty((2 * partials, pool.block_size), dtype=dtype)
+        noise = pool.block("noise")
+        t = pool.block("t", np.float64)
+        variation = pool.block("variation", np.float64)
+        phase = pool.block("phase", np.float64)
+        for start in range(0, num_samples, pool.block_size):
+            length = min(pool.block_size, num_samples - start)
+            cols = slice(start, start + length)
+            
+            # Synthesis time and organic phase variation shared by every row
+            np.add(pool.index[:length], start, out=t[:length], dtype=np.float64)
+            t[:length] *= duration / num_samples
+            np.multiply(t[:length], 2 * np.pi * 0.1, out=variation[:length])
+            np.sin(variation[:length], out=variation[:length])
+            variation[:length] *= 0.1
+            
+            for span, omegas, weights in moods:
+                for k, omega in enumerate(omegas):
+                    np.multiply(t[:length], omega, out=phase[:length])
+                    phase[:length] += variation[:length]
+                    np.sin(phase[:length], out=basis[2 * k, :length])
+                    np.cos(phase[:length], out=basis[2 * k + 1, :length])
+                np.matmul(weights, basis[:2 * len(omegas), :length], out=tracks[span, cols])
+            
+            for span, curves in chains:
+                rows = tracks[span, cols]
+                rows *= curves["instrument_gain"][cols]
+                for row in range(span.start, span.stop):
+                    for noise_gain in curves["noise_gains"]:
+                        # Same draws, in the same order, as a single-track render
+                        plans[row]["noise_rng"].standard_normal(dtype=dtype, out=noise[:length])
+                        noise[:length] *= noise_gain[cols]
+                        tracks[row, cols] += noise[:length]
+                np.minimum(low[span], rows.min(axis=1), out=low[span])
+                np.maximum(high[span], rows.max(axis=1), out=high[span])
+                
+                if curves["gain"] is not None:
+                    rows *= curves["gain"][cols]
+                rows += curves["additive"][cols]
+                np.maximum(peak[span], np.maximum(rows.max(axis=1), -rows.min(axis=1)), out=peak[span])
+        
+        return tracks, high - low, peak
+    
+    @staticmethod
+    def _row_spans(plans: List[Dict[str, Any]], key: Callable[[Dict[str, Any]], Any]) -> List[slice]:
+        """Slices of consecutive plans with equal key(plan)"""
+        spans, first = [], 0
+        for i in range(1, len(plans) + 1):
+            if i == len(plans) or key(plans[i]) != key(plans[first]):
+                spans.append(slice(first, i))
+                first = i
+        return spans
+    
+    def _worker_config(self) -> Dict[str, Any]:
+        """Constructor arguments that reproduce this generator in a worker"""
+        return {
+            "inplace": self.inplace,
+            "precision": self.precision,
+            "oscillator": self.oscillator,
+            "reduced_rate": self.reduced_rate,
+            "compiled_effects": self.compiled_effects,
+            "loop": self.loop,
+            "stem_dir": self.stem_dir
+        }
+    
+    def stream_music(
+        self, request_data: Dict[str, Any], block_size: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        """Render therapeutic music as a generator of phase-continuous blocks
+        
+        Envelopes, effects and binaural beats are evaluated per block from the
+        absolute sample position, so the concatenated blocks match the
+        full-length render while peak memory stays bounded by the block size.
+        Blocks are not normalized. In in-place mode the blocks are views of
+        the worker's buffer pool and are only valid until the next block.
+        """
+        return self._stream_plan(self._plan_render(request_data), block_size)
+    
+    def _stream_plan(
+        self, plan: Dict[str, Any], block_size: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        """Blocks of a planned track, as yielded by stream_music"""
+        num_samples = plan["num_samples"]
+        
+        if self.inplace:
+            pool = self._stream_pool(block_size or self.block_size)
+            try:
+                block = pool.block("stream")
+                for start in range(0, num_samples, pool.block_size):
+                    view = block[:min(pool.block_size, num_samples - start)]
+                    self._render_block_into(plan, start, view, pool)
+                    yield view
+            finally:
+                with self._stream_pools_lock:
+                    self._stream_pools.append(pool)
+            return
+        
+        block_size = block_size or self.block_size
+        for start in range(0, num_samples, block_size):
+            yield self._render_block(plan, start, min(block_size, num_samples - start))
+    
+    def stream_audio(
+        self, request_data: Dict[str, Any], container: str = "wav",
+        block_size: Optional[int] = None, quality: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream a track as encoded bytes while it is being rendered
+        
+        ``container`` is "wav" (a header with the exact sizes comes first),
+        "pcm" for raw little-endian 16-bit samples, or "flac", "ogg" or
+        "opus", encoded block by block at ``quality``. Streamed FLAC carries
+        the known length but leaves the frame sizes and checksum unset,
+        since those are only final after the last block. The request is
+        validated and planned before this returns. The true peak is only
+        known once the whole track exists, so blocks are normalized to an
+        upper bound of the track's amplitude (see _peak_bound) and stream
+        slightly quieter than the buffered render.
+        """
+        if container != "pcm":
+            check_output(container, self._delivery_rate(request_data), quality)
+        plan = self._plan_render(request_data)
+        return self._stream_audio(plan, container, block_size, quality)
+    
+    async def _stream_audio(
+        self, plan: Dict[str, Any], container: str, block_size: Optional[int],
+        quality: Optional[float] = None
+    ) -> AsyncIterator[bytes]:
+        """Render blocks on a thread of their own, one block ahead of the reader
+        
+        In-place blocks go into the stream's own buffer pool (see
+        _stream_pool), whichever thread renders them. Closing the iterator
+        early (the client went away) stops rendering after the block in
+        flight and releases the thread.
+        """
+        if container == "wav":
+            yield self._wav_header(plan["num_samples"], plan["sample_rate"])
+        
+        peak = self._peak_bound(plan)
+        if container in ("wav", "pcm"):
+            chunks = (
+                self._quantize_pcm16(block, peak, rng=plan["rng"]).tobytes()
+                for block in self._stream_plan(plan, block_size)
+            )
+        else:
+            chunks = self._encoded_chunks(plan, peak, block_size, container, quality)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-stream")
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(executor, next, chunks, None)
+        try:
+            while True:
+                chunk = await pending
+                if chunk is None:
+                    break
+                pending = loop.run_in_executor(executor, next, chunks, None)
+                yield chunk
+        finally:
+            # The executor runs these after the block in flight, if any
+            executor.submit(chunks.close)
+            executor.shutdown(wait=False)
+    
+    def _encoded_chunks(
+        self, plan: Dict[str, Any], peak: float, block_size: Optional[int],
+        container: str, quality: Optional[float]
+    ) -> Iterator[bytes]:
+        """Encoded bytes of a planned track as each block is compressed"""
+        encoder = AudioEncoder(
+            None, plan["sample_rate"], container, quality, frames=plan["num_samples"]
+        )
+        try:
+            for block in self._stream_plan(plan, block_size):
+                encoder.write(self._quantize_pcm16(block, peak, rng=plan["rng"]))
+                chunk = encoder.drain()
+                if chunk:
+                    yield chunk
+            encoder.close()
+            chunk = encoder.drain()
+            if chunk:
+                yield chunk
+        finally:
+            encoder.close()
+    
+    def _peak_bound(self, plan: Dict[str, Any]) -> float:
+        """Upper bound of a planned track's amplitude, from its operations
+        
+        Envelopes and the piano decay never exceed 1; vibrato and lift
+        scale the running bound and tones and breath noise add to it (noise
+        at five standard deviations; rarer draws are clipped).
+        """
+        bound = float(np.sum(np.abs(plan["mood_params"]["amplitudes"])))
+        instrument_ops, effect_ops = self._effect_ops(plan)
+        for op in instrument_ops + effect_ops:
+            if op[0] == "vibrato":
+                bound *= 1.0 + op[2]
+            elif op[0] == "lift":
+                bound *= 1.0 + op[1]
+            elif op[0] == "tone":
+                bound += op[2]
+            elif op[0] == "noise":
+                bound += 5.0 * op[1]
+        return bound
+    
+    @staticmethod
+    def _wav_header(num_samples: int, sample_rate: int) -> bytes:
+        """RIFF header of a mono 16-bit PCM WAV file with num_samples samples"""
+        data_bytes = 2 * num_samples
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + data_bytes, b"WAVE",
+            b"fmt ", 16, 1, 1, sample_rate, 2 * sample_rate, 2, 16,
+            b"data", data_bytes
+        )
+    
+    def _cache_params(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalized request parameters that determine the generated result
+        
+        Defaults are filled in and the mood history is reduced to the two
+        thresholds the effect chain uses, so equivalent requests share a key.
+        A seed is only part of the key when the request fixes one.
+        """
+        personal_prefs = request_data.get("personalPreferences") or {}
+        avg_stress, avg_anxiety = self._analyze_mood_history(
+            personal_prefs.get("recentMoodHistory", [])
+        )
+        
+        return {
+            "mood": request_data.get("mood", "calm"),
+            "genre": request_data.get("genre", "ambient"),
+            "duration": request_data.get("duration", 120),
+            "tempo": request_data.get("tempo", "medium"),
+            "instruments": list(request_data.get("instruments", ["piano"])),
+            "sampleRate": self._delivery_rate(request_data),
+            "format": request_data.get("format") or "wav",
+            "quality": request_data.get("quality"),
+            "stress_relief": bool(avg_stress > 6),
+            "anxiety_relief": bool(avg_anxiety > 6),
+            "seed": request_data.get("seed"),
+            "store": request_data.get("store", "file"),
+            "engine": {
+                "precision": self.precision,
+                "oscillator": self.oscillator,
+                "reduced_rate": self.reduced_rate,
+                "loop": self.loop,
+                "stems": self.stems.version if self.stems is not None else None
+            }
+        }
+    
+    def _delivery_rate(self, request_data: Dict[str, Any]) -> int:
+        """Output sample rate requested through sampleRate, else the default"""
+        sample_rate = request_data.get("sampleRate") or self.sample_rate
+        if (
+            int(sample_rate) != sample_rate
+            or not self.MIN_SAMPLE_RATE <= sample_rate <= self.MAX_SAMPLE_RATE
+        ):
+            raise ValueError(f"Unsupported sample rate: {sample_rate}")
+        return int(sample_rate)
+    
+    def _duration(self, request_data: Dict[str, Any]) -> float:
+        """Track length in seconds requested through duration, else the default"""
+        duration = request_data.get("duration", 120)
+        if not 0 < duration <= self.MAX_DURATION:
+            raise ValueError(f"Unsupported duration: {duration}")
+        return duration
+    
+    def _plan_render(
+        self, request_data: Dict[str, Any], reduce_rate: bool = False
+    ) -> Dict[str, Any]:
+        """Resolve request parameters and random phases for block rendering
+        
+        With reduce_rate the plan synthesizes at the lowest integer fraction
+        of the delivery rate that still carries the mood's partials; the
+        in-place renderer then upsamples the track once. Random choices come
+        from a Generator seeded with the request's seed (fresh without one),
+        kept in the plan for the dither.
+        """
+        rng = np.random.default_rng(request_data.get("seed"))
+        mood = request_data.get("mood", "calm")
+        duration = self._duration(request_data)
+        sample_rate = self._delivery_rate(request_data)
+        mood_params = self._get_mood_parameters(mood)
+        
+        personal_prefs = request_data.get("personalPreferences") or {}
+        avg_stress, avg_anxiety = self._analyze_mood_history(
+            personal_prefs.get("recentMoodHistory", [])
+        )
+        
+        plan = {
+            "mood": mood,
+            "duration": duration,
+            "sample_rate": sample_rate,
+            "num_samples": int(sample_rate * duration),
+            "instruments": request_data.get("instruments", ["piano"]),
+            "mood_params": mood_params,
+            "phases": [rng.random() * 2 * np.pi for _ in mood_params["harmonics"]],
+            "avg_stress": avg_stress,
+            "avg_anxiety": avg_anxiety,
+            "rng": rng
+        }
+        plan["instrument_ops"], plan["effect_ops"] = self._effect_ops(plan)
+        has_noise = any(op[0] == "noise" for op in plan["instrument_ops"])
+        if has_noise:
+            plan["noise_rng"] = np.random.default_rng(rng.integers(0, 2**31))
+        
+        # Breath noise is broadband, so it is always rendered at full rate
+        factor = 1
+        if reduce_rate and not has_noise:
+            factor = sample_rate // self._render_rate(mood_params, sample_rate)
+        plan["rate_factor"] = factor
+        plan["render_rate"] = sample_rate // factor
+        plan["render_samples"] = -(-plan["num_samples"] // factor)
+        if factor > 1:
+            plan["onset_plan"] = dict(
+                plan, rate_factor=1, render_rate=sample_rate, render_samples=plan["num_samples"]
+            )
+        stems = self._plan_stems(plan)
+        if stems is not None or (self.loop and plan["duration"] > self.LOOP_SECONDS):
+            # Stem phases are fixed, so tracks start at a random point of
+            # the loop instead
+            offset = 0
+            if stems is not None:
+                offset = int(rng.integers(0, self.LOOP_SECONDS * plan["render_rate"]))
+            self._build_loop(plan, stems, offset)
+            if factor > 1:
+                self._build_loop(plan["onset_plan"], stems, offset * factor)
+        elif self.oscillator == "phasor":
+            self._build_phasor_banks(plan)
+            if factor > 1:
+                self._build_phasor_banks(plan["onset_plan"])
+        
+        return plan
+    
+    def _render_rate(self, mood_params: Dict[str, Any], sample_rate: int) -> int:
+        """Lowest rate dividing sample_rate that carries the mood's partials
+        
+        The highest partial is widened by the 5 Hz vibrato sideband; the
+        remaining effect tones all sit far below it.
+        """
+        highest = mood_params["base_frequency"] * max(mood_params["harmonics"]) + 5.0
+        minimum = self.RENDER_RATE_HEADROOM * highest
+        factor = max(
+            (k for k in range(1, int(sample_rate // minimum) + 1) if sample_rate % k == 0),
+            default=1
+        )
+        return sample_rate // factor
+    
+    def _clock_steps(self, plan: Dict[str, Any]) -> Tuple[float, float, float]:
+        """Per render sample steps of the synthesis time, effect time and position
+        
+        Render sample i sits on delivery sample i * rate_factor, so reduced-
+        rate plans advance every clock by the rate factor.
+        """
+        num_samples = plan["num_samples"]
+        factor = plan["rate_factor"]
+        last = max(num_samples - 1, 1)
+        return (
+            plan["duration"] / num_samples * factor,
+            num_samples / plan["sample_rate"] / last * factor,
+            factor / last
+        )
+    
+    def _build_phasor_banks(self, plan: Dict[str, Any]) -> None:
+        """Replace per-sample sine evaluation with phasor banks
+        
+        All harmonic layers of the mood share one bank; vibrato and each run
+        of consecutive additive tones become banks on the effect clock.
+        """
+        dtype = np.dtype(self.precision)
+        t_step, effect_step, _ = self._clock_steps(plan)
+        mood_params = plan["mood_params"]
+        
+        def bank(frequencies, amplitudes, step, phases=None):
+            return PhasorBank(frequencies, amplitudes, step, phases, self.PHASE_SPAN, dtype)
+        
+        plan["banks"] = {
+            "modulation": bank([0.1], [0.1], t_step),
+            "harmonics": bank(
+                [mood_params["base_frequency"] * harmonic for harmonic in mood_params["harmonics"]],
+                mood_params["amplitudes"], t_step, plan["phases"]
+            )
+        }
+        
+        plan["instrument_ops"] = [
+            ("vibrato_bank", bank([op[1]], [op[2]], effect_step)) if op[0] == "vibrato" else op
+            for op in plan["instrument_ops"]
+        ]
+        
+        effect_ops = []
+        for op in plan["effect_ops"]:
+            if op[0] != "tone":
+                effect_ops.append(op)
+            elif effect_ops and effect_ops[-1][0] == "tones":
+                effect_ops[-1][1].append(op[1:])
+            else:
+                effect_ops.append(("tones", [op[1:]]))
+        plan["effect_ops"] = [
+            ("tones_bank", bank(*zip(*op[1]), effect_step)) if op[0] == "tones" else op
+            for op in effect_ops
+        ]
+    
+    def _build_loop(
+        self, plan: Dict[str, Any], stems: Optional[StemLibrary] = None, offset: int = 0
+    ) -> None:
+        """Replace the stationary stages of a plan with one rendered loop
+        
+        Each partial is moved to the nearest multiple of 1 / LOOP_SECONDS Hz
+        (at most 0.05 Hz away) and vibrato and tones run on the synthesis
+        clock, so harmonics, vibrato and tones all repeat every loop. They
+        are rendered once over LOOP_SECONDS and tiled; only the envelope,
+        decay, lift and breath noise are evaluated along the whole track.
+        With a stem library the loops are taken from its mapped stems
+        instead: the harmonic stack is tiled straight from the stem, with
+        its gain, starting offset samples into it.
+        """
+        dtype = np.dtype(self.precision)
+        t = self._loop_axis(self._clock_steps(plan)[0])
+        rate = plan["render_rate"]
+        
+        def wave(frequency, amplitude):
+            if stems is None:
+                return self._loop_wave(t, frequency, amplitude)
+            samples, gain = stems.get(sine_stem(self._loop_frequency(frequency), rate))
+            return np.multiply(samples, gain * amplitude, dtype=np.float64)
+        
+        instrument_ops = plan["instrument_ops"]
+        if stems is None:
+            plan["loop"] = self._harmonic_loop(plan["mood_params"], plan["phases"], t).astype(dtype)
+        else:
+            treatment, instrument_ops = self._stem_treatment(instrument_ops)
+            plan["loop"], plan["loop_gain"] = stems.get(harmonics_stem(plan["mood"], treatment, rate))
+            plan["loop_offset"] = offset
+            plan["stem_treatment"] = treatment
+        
+        plan["instrument_ops"] = [
+            ("vibrato_loop", (1.0 + wave(op[1], op[2])).astype(dtype)) if op[0] == "vibrato" else op
+            for op in instrument_ops
+        ]
+        
+        # Consecutive tones are summed into one loop
+        effect_ops = []
+        for op in plan["effect_ops"]:
+            if op[0] != "tone":
+                effect_ops.append(op)
+            elif effect_ops and effect_ops[-1][0] == "tones_loop":
+                tones = effect_ops[-1][1]
+                tones += wave(op[1], op[2])
+            else:
+                effect_ops.append(("tones_loop", wave(op[1], op[2])))
+        plan["effect_ops"] = [
+            ("tones_loop", op[1].astype(dtype)) if op[0] == "tones_loop" else op
+            for op in effect_ops
+        ]
+    
+    def _loop_axis(self, t_step: float) -> np.ndarray:
+        """Synthesis times of one loop sampled every t_step seconds"""
+        return np.arange(int(round(self.LOOP_SECONDS / t_step))) * t_step
+    
+    def _loop_frequency(self, frequency: float) -> float:
+        """Nearest frequency that repeats every loop"""
+        return float(np.round(frequency * self.LOOP_SECONDS) / self.LOOP_SECONDS)
+    
+    def _loop_wave(
+        self, t: np.ndarray, frequency: float, amplitude: float,
+        phase: float = 0.0, modulation: Any = 0.0
+    ) -> np.ndarray:
+        """Sine at the loop frequency nearest to frequency"""
+        return amplitude * np.sin(2 * np.pi * self._loop_frequency(frequency) * t + phase + modulation)
+    
+    def _harmonic_loop(
+        self, mood_params: Dict[str, Any], phases: List[float], t: np.ndarray
+    ) -> np.ndarray:
+        """One loop of a mood's harmonic layers under the shared phase variation"""
+        variation = self._loop_wave(t, 0.1, 0.1)
+        loop = np.zeros(len(t))
+        for harmonic, amplitude, phase in zip(
+            mood_params["harmonics"], mood_params["amplitudes"], phases
+        ):
+            loop += self._loop_wave(t, mood_params["base_frequency"] * harmonic, amplitude, phase, variation)
+        return loop
+    
+    def _stem_plan(
+        self, mood: str, instruments: List[str], avg_stress: float = 0, avg_anxiety: float = 0
+    ) -> Dict[str, Any]:
+        """Minimal plan whose effect operations a stem is built from"""
+        return {
+            "mood": mood, "instruments": instruments,
+            "avg_stress": avg_stress, "avg_anxiety": avg_anxiety
+        }
+    
+    def _stem_frequencies(self) -> List[float]:
+        """Loop frequencies of every vibrato and tone the effect chains use"""
+        frequencies = set()
+        for mood in self.MOODS:
+            for avg_stress in (0, 10):
+                for avg_anxiety in (0, 10):
+                    plan = self._stem_plan(mood, ["strings"], avg_stress, avg_anxiety)
+                    instrument_ops, effect_ops = self._effect_ops(plan)
+                    frequencies.update(
+                        self._loop_frequency(op[1]) for op in instrument_ops + effect_ops
+                        if op[0] in ("vibrato", "tone")
+                    )
+        return sorted(frequencies)
+    
+    def _stem_treatment(self, instrument_ops: List[tuple]) -> Tuple[str, List[tuple]]:
+        """Treatment whose stem carries a plan's vibrato, and the ops left to render
+        
+        Vibrato and decay both scale the signal, so a single vibrato can be
+        taken from the stem in any order; breath noise added before it would
+        be scaled too, so plans with noise keep their vibrato.
+        """
+        vibratos = [op for op in instrument_ops if op[0] == "vibrato"]
+        if any(op[0] == "noise" for op in instrument_ops):
+            return "plain", instrument_ops
+        for treatment, instruments in self.STEM_TREATMENTS.items():
+            folded = self._effect_ops(self._stem_plan("calm", instruments))[0]
+            if folded == vibratos:
+                return treatment, [op for op in instrument_ops if op[0] != "vibrato"]
+        return "plain", instrument_ops
+    
+    def _plan_stems(self, plan: Dict[str, Any]) -> Optional[StemLibrary]:
+        """The stem library if it holds every loop a plan renders, else None"""
+        stems = self.stems
+        if stems is None or stems.loop_seconds != self.LOOP_SECONDS:
+            return None
+        rates = {plan["render_rate"], plan["sample_rate"]} if plan["rate_factor"] > 1 else {plan["render_rate"]}
+        treatment, _ = self._stem_treatment(plan["instrument_ops"])
+        names = [harmonics_stem(plan["mood"], treatment, rate) for rate in rates]
+        names += [
+            sine_stem(self._loop_frequency(op[1]), rate)
+            for op in plan["instrument_ops"] + plan["effect_ops"] if op[0] in ("vibrato", "tone")
+            for rate in rates
+        ]
+        return stems if all(name in stems for name in names) else None
+    
+    @staticmethod
+    def _tile_into(loop: np.ndarray, start: int, out: np.ndarray, gain: float = 1.0) -> None:
+        """Copy samples [start, start + len(out)) of the repeated loop into out, scaled by gain"""
+        position = start % len(loop)
+        filled = 0
+        while filled < len(out):
+            count = min(len(loop) - position, len(out) - filled)
+            if gain == 1.0:
+                out[filled:filled + count] = loop[position:position + count]
+            else:
+                np.multiply(loop[position:position + count], gain, out=out[filled:filled + count])
+            filled += count
+            position = 0
+    
+    def _effect_ops(self, plan: Dict[str, Any]) -> Tuple[List[tuple], List[tuple]]:
+        """Instrument and therapeutic stages of a plan as (kind, *params) operations
+        
+        Mirrors _apply_instrument_characteristics, _apply_effect_chain and
+        _apply_binaural_beats for the in-place renderer.
+        """
+        instrument_ops = []
+        for instrument in plan["instruments"]:
+            if instrument == "piano":
+                instrument_ops.append(("decay", 5.0))
+            elif instrument == "strings":
+                instrument_ops.append(("vibrato", 5.0, 0.02))
+            elif instrument == "flute":
+                instrument_ops.append(("noise", 0.01))
+        
+        mood = plan["mood"]
+        effect_ops = []
+        if plan["avg_stress"] > 6:
+            effect_ops.append(("tone", 40.0, 0.1))
+        if plan["avg_anxiety"] > 6:
+            effect_ops.append(("tone", 10.0, 0.05))
+        if mood == "sad":
+            effect_ops.append(("lift", 0.3))
+        elif mood == "anxious":
+            effect_ops.append(("tone", 6.0, 0.03))
+        elif mood == "energetic":
+            effect_ops.append(("tone", 60.0, 0.2))
+        if self._should_add_binaural_beats(mood):
+            effect_ops.append(("tone", float(self._binaural_frequency(mood)), 0.1))
+        
+        return instrument_ops, effect_ops
+    
+    def _get_buffer_pool(self) -> AudioBufferPool:
+        """Buffer pool configured on the generator, else the worker's own"""
+        return self.buffer_pool or get_buffer_pool(self.block_size, np.dtype(self.precision))
+    
+    def _stream_pool(self, block_size: int) -> AudioBufferPool:
+        """Buffer pool of block_size a stream renders into alone
+        
+        Pools of finished streams are reused, so consecutive streams
+        allocate nothing; pools shared with buffered renders are never
+        resized to a stream's block size.
+        """
+        with self._stream_pools_lock:
+            pool = self._stream_pools.pop() if self._stream_pools else None
+        if pool is None:
+            return AudioBufferPool(block_size, dtype=np.dtype(self.precision))
+        pool.resize(block_size)
+        return pool
+    
+    def _render_track_inplace(
+        self, plan: Dict[str, Any], pool: AudioBufferPool, progress: Progress = None
+    ) -> Tuple[np.ndarray, float, float]:
+        """Render a whole track into the pool's track buffer
+        
+        Returns the (unnormalized) track view, the dynamic range of the
+        composition before therapeutic effects, and the peak amplitude.
+        Reduced-rate plans are rendered with guard samples on both ends and
+        upsampled once to the delivery rate; that track is a new array.
+        Composition, effects and binaural beats are fused per block, so
+        progress reports advance the three stages together.
+        """
+        factor = plan["rate_factor"]
+        guard = self.RESAMPLE_GUARD if factor > 1 else 0
+        first = -guard
+        audio = pool.track(plan["render_samples"] + 2 * guard)
+        if self.compiled_effects:
+            plan["curves"] = self._effect_curves(plan, pool, first, len(audio))
+        scratch = pool.block("abs")
+        low, high, peak = np.inf, -np.inf, 0.0
+        
+        report_every = max(len(audio) // 10, 1)
+        for offset in range(0, len(audio), pool.block_size):
+            block = audio[offset:offset + pool.block_size]
+            block_low, block_high = self._render_block_into(plan, first + offset, block, pool)
+            low, high = min(low, block_low), max(high, block_high)
+            magnitude = np.abs(block, out=scratch[:len(block)])
+            peak = max(peak, float(magnitude.max()))
+            
+            end = offset + len(block)
+            if progress and (end // report_every > offset // report_every or end == len(audio)):
+                for stage in ("composition", "effects", "binaural"):
+                    progress(stage, end / len(audio))
+        
+        if factor > 1:
+            # The guards absorb the resampling filter's edge transients
+            upsampled = self._resample(audio, plan["render_rate"], plan["sample_rate"])
+            audio = upsampled[guard * factor:guard * factor + plan["num_samples"]]
+            onset = audio[:min(self.RESAMPLE_ONSET, pool.block_size)]
+            self._render_block_into(plan["onset_plan"], 0, onset, pool)
+            peak = float(max(audio.max(), -audio.min()))
+        
+        return audio, float(high - low), peak
+    
+    def _render_block_into(
+        self, plan: Dict[str, Any], start: int, out: np.ndarray, pool: AudioBufferPool
+    ) -> Tuple[float, float]:
+        """Render samples [start, start + len(out)) into out using pool buffers
+        
+        Every stage works in place on the pool's block buffers, so no arrays
+        are allocated per block. Returns the block's minimum and maximum
+        before the therapeutic effects are applied.
+        """
+        length = len(out)
+        u = pool.block("u")[:length]
+        shape = pool.block("shape")[:length]
+        work = pool.block("work")[:length]
+        clock = self._block_clock(plan, start, u, pool)
+        
+        if "loop" in plan:
+            self._tile_into(
+                plan["loop"], start + plan.get("loop_offset", 0), out, plan.get("loop_gain", 1.0)
+            )
+        elif "banks" in plan:
+            # All harmonic layers at once from the phasor tables
+            banks = plan["banks"]
+            banks["modulation"].render(start, length, shape)
+            phase_modulated_sum(
+                banks["harmonics"], start, shape, out,
+                pool.block("quadrature"), pool.block("squared"), work
+            )
+        else:
+            # Harmonic layers share one organic phase variation
+            mood_params = plan["mood_params"]
+            self._sine_into(shape, clock["t"], 0.1, pool)
+            shape *= 0.1
+            
+            out.fill(0.0)
+            for harmonic, amplitude, phase in zip(
+                mood_params["harmonics"], mood_params["amplitudes"], plan["phases"]
+            ):
+                frequency = mood_params["base_frequency"] * harmonic
+                self._sine_into(work, clock["t"], frequency, pool, phase, shape)
+                work *= amplitude
+                out += work
+        
+        if "curves" in plan:
+            return self._apply_curves_into(plan, start, out, work)
+        
+        self._envelope_into(plan["mood"], u, work)
+        out *= work
+        
+        for op in plan["instrument_ops"]:
+            self._apply_op_inplace(op, out, clock, u, work, plan, pool)
+        block_low, block_high = float(out.min()), float(out.max())
+        
+        for op in plan["effect_ops"]:
+            self._apply_op_inplace(op, out, clock, u, work, plan, pool)
+        
+        return block_low, block_high
+    
+    def _block_clock(
+        self, plan: Dict[str, Any], start: int, u: np.ndarray, pool: AudioBufferPool
+    ) -> Dict[str, Any]:
+        """Clocks of a block starting at start; fills u with the positions"""
+        # Each clock is (seconds per sample, time of the block's first sample)
+        t_step, effect_step, u_step = self._clock_steps(plan)
+        
+        np.add(pool.index[:len(u)], start, out=u)
+        u *= u_step
+        if start < 0:
+            # Guard samples before the track hold the envelope's start value
+            np.maximum(u, 0.0, out=u)
+        
+        return {
+            "start": start,
+            "t": (t_step, start * t_step),
+            "effect_t": (effect_step, start * effect_step)
+        }
+    
+    def _effect_curves(
+        self, plan: Dict[str, Any], pool: AudioBufferPool, first: int, length: int
+    ) -> Dict[str, Any]:
+        """Compiled effect curves for a plan, from the cache when possible
+        
+        The chain depends only on the mood, the instruments, the duration
+        and whether stress and anxiety exceed 6, plus the sample grid it is
+        rendered on, whether its tones are looped and which instrument
+        treatment a stem already carries.
+        """
+        key = self._chain_key(plan) + (
+            plan["duration"], plan["sample_rate"], plan["rate_factor"], first, length,
+            self.precision, self.oscillator, "loop" in plan, plan.get("stem_treatment")
+        )
+        return self.effect_cache.get_or_create(
+            key, lambda: self._compile_effect_curves(plan, pool, first, length)
+        )
+    
+    def _chain_key(self, plan: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Request parameters that select a plan's effect chain"""
+        return (
+            plan["mood"], tuple(plan["instruments"]),
+            bool(plan["avg_stress"] > 6), bool(plan["avg_anxiety"] > 6)
+        )
+    
+    def _compile_effect_curves(
+        self, plan: Dict[str, Any], pool: AudioBufferPool, first: int, length: int
+    ) -> Dict[str, Any]:
+        """Fold the envelope, instrument and effect operations into curves
+        
+        The chain is affine in the composition, so it reduces to
+        composition * instrument_gain (+ noise * noise_gain per breath-noise
+        stage) before the therapeutic effects, then * gain + additive. The
+        effect gain is None when no effect scales the signal. Curves cover
+        samples [first, first + length) of the render grid.
+        """
+        dtype = np.dtype(self.precision)
+        instrument_gain = np.empty(length, dtype=dtype)
+        additive = np.zeros(length, dtype=dtype)
+        noise_ops = [op for op in plan["instrument_ops"] if op[0] == "noise"]
+        noise_gains = [np.empty(length, dtype=dtype) for _ in noise_ops]
+        scales = any(op[0] in self.GAIN_OPS for op in plan["effect_ops"])
+        gain = np.ones(length, dtype=dtype) if scales else None
+        
+        u = pool.block("u")
+        work = pool.block("work")
+        for offset in range(0, length, pool.block_size):
+            span = slice(offset, offset + pool.block_size)
+            block_u = u[:len(instrument_gain[span])]
+            block_work = work[:len(block_u)]
+            clock = self._block_clock(plan, first + offset, block_u, pool)
+            
+            self._envelope_into(plan["mood"], block_u, instrument_gain[span])
+            noise_count = 0
+            for op in plan["instrument_ops"]:
+                if op[0] == "noise":
+                    noise_gains[noise_count][span] = op[1]
+                    noise_count += 1
+                    continue
+                # Later instrument stages also scale earlier breath noise
+                for curve in [instrument_gain] + noise_gains[:noise_count]:
+                    self._apply_op_inplace(op, curve[span], clock, block_u, block_work, plan, pool)
+            
+            for op in plan["effect_ops"]:
+                if op[0] in self.GAIN_OPS:
+                    self._apply_op_inplace(op, gain[span], clock, block_u, block_work, plan, pool)
+                self._apply_op_inplace(op, additive[span], clock, block_u, block_work, plan, pool)
+        
+        return {
+            "start": first,
+            "instrument_gain": instrument_gain,
+            "noise_gains": noise_gains,
+            "gain": gain,
+            "additive": additive
+        }
+    
+    def _apply_curves_into(
+        self, plan: Dict[str, Any], start: int, out: np.ndarray, work: np.ndarray
+    ) -> Tuple[float, float]:
+        """Apply compiled effect curves to a synthesized block in place
+        
+        Returns the block's minimum and maximum before the therapeutic
+        effects, like _render_block_into.
+        """
+        curves = plan["curves"]
+        offset = start - curves["start"]
+        span = slice(offset, offset + len(out))
+        
+        out *= curves["instrument_gain"][span]
+        for noise_gain in curves["noise_gains"]:
+            # Same draws, in the same order, as the per-operation path
+            plan["noise_rng"].standard_normal(dtype=work.dtype, out=work)
+            work *= noise_gain[span]
+            out += work
+        block_low, block_high = float(out.min()), float(out.max())
+        
+        if curves["gain"] is not None:
+            out *= curves["gain"][span]
+        out += curves["additive"][span]
+        
+        return block_low, block_high
+    
+    def _sine_into(
+        self, out: np.ndarray, clock: Tuple[float, float], frequency: float,
+        pool: AudioBufferPool, phase: float = 0.0, modulation: Optional[np.ndarray] = None
+    ) -> None:
+        """out = sin(2 pi f t + phase + modulation) without allocating
+        
+        The block is viewed as rows of PHASE_SPAN samples. One phase ramp is
+        shared by every row and each row gets its absolute phase, wrapped to
+        one cycle in float64. Phase arguments therefore stay small, which
+        keeps float32 rendering within one 16-bit LSB on long tracks.
+        """
+        step, origin = clock
+        length = len(out)
+        span = self.PHASE_SPAN if pool.block_size % self.PHASE_SPAN == 0 else pool.block_size
+        rows, tail = divmod(length, span)
+        omega = 2 * np.pi * frequency
+        
+        ramp = pool.block("ramp")[:span]
+        np.multiply(pool.index[:span], omega * step, out=ramp)
+        row_phase = pool.block("row_phase", np.float64)[:rows + 1]
+        np.multiply(pool.index[:rows + 1], omega * step * span, out=row_phase, dtype=np.float64)
+        row_phase += omega * origin + phase
+        np.remainder(row_phase, 2 * np.pi, out=row_phase)
+        
+        np.add(ramp, row_phase[:rows, None], out=out[:rows * span].reshape(rows, span))
+        if tail:
+            np.add(ramp[:tail], row_phase[rows], out=out[rows * span:])
+        if modulation is not None:
+            out += modulation
+        np.sin(out, out=out)
+    
+    def _envelope_into(self, mood: str, u: np.ndarray, out: np.ndarray) -> None:
+        """Evaluate the mood envelope at positions u into out"""
+        envelope_type = self._get_mood_parameters(mood).get("envelope_type", "gentle")
+        shape = self.ENVELOPE_SHAPES.get(envelope_type, self.ENVELOPE_SHAPES["gentle"])
+        
+        if shape[0] == "power":
+            np.power(u, shape[1], out=out)
+        else:
+            _, scale, depth, offset = shape
+            np.multiply(u, scale, out=out)
+            np.sin(out, out=out)
+            out *= depth
+            out += offset
+    
+    def _apply_op_inplace(
+        self, op: tuple, out: np.ndarray, clock: Dict[str, Any],
+        u: np.ndarray, work: np.ndarray, plan: Dict[str, Any], pool: AudioBufferPool
+    ) -> None:
+        """Apply one instrument or effect operation to out in place"""
+        kind = op[0]
+        if kind == "decay":
+            np.multiply(u, -op[1], out=work)
+            np.exp(work, out=work)
+            out *= work
+        elif kind == "vibrato":
+            self._sine_into(work, clock["effect_t"], op[1], pool)
+            work *= op[2]
+            work += 1.0
+            out *= work
+        elif kind == "noise":
+            plan["noise_rng"].standard_normal(dtype=work.dtype, out=work)
+            work *= op[1]
+            out += work
+        elif kind == "lift":
+            np.multiply(u, op[1], out=work)
+            work += 1.0
+            out *= work
+        elif kind == "tone":
+            self._sine_into(work, clock["effect_t"], op[1], pool)
+            work *= op[2]
+            out += work
+        elif kind == "vibrato_bank":
+            op[1].render(clock["start"], len(out), work)
+            work += 1.0
+            out *= work
+        elif kind == "tones_bank":
+            op[1].render(clock["start"], len(out), work)
+            out += work
+        elif kind == "vibrato_loop":
+            self._tile_into(op[1], clock["start"], work)
+            out *= work
+        elif kind == "tones_loop":
+            self._tile_into(op[1], clock["start"], work)
+            out += work
+    
+    def _render_block(self, plan: Dict[str, Any], start: int, length: int) -> np.ndarray:
+        """Render samples [start, start + length) of a planned track"""
+        mood = plan["mood"]
+        t, effect_t, u = self._block_time_axes(plan, start, length)
+        
+        envelope = self._create_envelope(length, mood, u)
+        block = self._synthesize_harmonics(plan["mood_params"], plan["phases"], t, envelope)
+        
+        for instrument in plan["instruments"]:
+            block = self._apply_instrument_characteristics(
+                block, instrument, effect_t, u, plan.get("noise_rng")
+            )
+        
+        block = self._apply_effect_chain(
+            block, mood, plan["avg_stress"], plan["avg_anxiety"], effect_t, u
+        )
+        
+        if self._should_add_binaural_beats(mood):
+            block = self._apply_binaural_beats(block, mood, effect_t)
+        
+        return block
+    
+    def _block_time_axes(
+        self, plan: Dict[str, Any], start: int, length: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Time axes for a block, matching the full-length linspace grids
+        
+        Returns the synthesis time (linspace(0, duration, n, False)), the
+        effect time (linspace(0, n / sample_rate, n)) and the normalized
+        position (linspace(0, 1, n)) for samples [start, start + length).
+        """
+        num_samples = plan["num_samples"]
+        last = max(num_samples - 1, 1)
+        index = np.arange(start, start + length, dtype=np.float64)
+        
+        t = index * (plan["duration"] / num_samples)
+        effect_t = index * (num_samples / plan["sample_rate"] / last)
+        u = index / last
+        
+        return t, effect_t, u
+    
+    def _synthesize_harmonics(
+        self, mood_params: Dict[str, Any], phases: List[float], t: np.ndarray,
+        envelope: np.ndarray
+    ) -> np.ndarray:
+        """Sum the mood's harmonic layers over time axis t and apply the envelope"""
+        base_freq = mood_params["base_frequency"]
+        
+        # Add some variation and organic feel
+        freq_variation = np.sin(2 * np.pi * 0.1 * t) * 0.1
+        
+        composition = np.zeros_like(t)
+        for harmonic, amplitude, phase in zip(
+            mood_params["harmonics"], mood_params["amplitudes"], phases
+        ):
+            frequency = base_freq * harmonic
+            composition += amplitude * np.sin(2 * np.pi * frequency * t + freq_variation + phase)
+        
+        return composition * envelope
+    
+    async def _create_base_composition(
+        self, mood: str, genre: str, duration: int, tempo: str, instruments: List[str],
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Create base musical composition, drawing from ``rng`` (a freshly
+        seeded Generator by default)"""
+        if rng is None:
+            rng = np.random.default_rng()
+        
+        # Mood-based parameters
+        mood_params = self._get_mood_parameters(mood)
+        
+        # Create time array
+        t = np.linspace(0, duration, int(self.sample_rate * duration), False)
+        
+        # Random starting phase per harmonic layer
+        phases = [rng.random() * 2 * np.pi for _ in mood_params["harmonics"]]
+        
+        # Generate base composition
+        envelope = self._create_envelope(len(t), mood)
+        composition = self._synthesize_harmonics(mood_params, phases, t, envelope)
+        
+        # Add instrument-specific characteristics
+        for instrument in instruments:
+            composition = self._apply_instrument_characteristics(composition, instrument, rng=rng)
+        
+        return composition
+    
+    async def _apply_therapeutic_effects(
+        self, composition: np.ndarray, mood: str, mood_history: List[Dict]
+    ) -> np.ndarray:
+        """Apply therapeutic effects based on mood and history"""
+        
+        # Analyze mood patterns
+        avg_stress, avg_anxiety = self._analyze_mood_history(mood_history)
+        
+        return self._apply_effect_chain(composition, mood, avg_stress, avg_anxiety)
+    
+    def _analyze_mood_history(self, mood_history: List[Dict]) -> Tuple[float, float]:
+        """Average stress and anxiety levels over the recent mood history"""
+        if mood_history:
+            avg_stress = np.mean([entry.get("stress_level", 5) for entry in mood_history])
+            avg_anxiety = np.mean([entry.get("anxiety_level", 5) for entry in mood_history])
+        else:
+            avg_stress = 5
+            avg_anxiety = 5
+        
+        return avg_stress, avg_anxiety
+    
+    def _apply_effect_chain(
+        self, composition: np.ndarray, mood: str, avg_stress: float, avg_anxiety: float,
+        t: Optional[np.ndarray] = None, u: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply the stress, anxiety and mood-specific effects in order"""
+        
+        # Apply stress-reduction effects
+        if avg_stress > 6:
+            composition = self._apply_stress_reduction(composition, t)
+        
+        # Apply anxiety-relief effects
+        if avg_anxiety > 6:
+            composition = self._apply_anxiety_relief(composition, t)
+        
+        # Apply mood-specific therapeutic effects
+        if mood == "sad":
+            composition = self._apply_mood_lifting(composition, u)
+        elif mood == "anxious":
+            composition = self._apply_calming_effects(composition, t)
+        elif mood == "energetic":
+            composition = self._apply_grounding_effects(composition, t)
+        
+        return composition
+    
+    def _get_mood_parameters(self, mood: str) -> Dict[str, Any]:
+        """Get audio parameters for specific mood"""
+        mood_params = {
+            "calm": {
+                "base_frequency": 220.0,  # A3
+                "harmonics": [1, 1.5, 2, 3],
+                "amplitudes": [0.8, 0.4, 0.2, 0.1],
+                "envelope_type": "slow_rise"
+            },
+            "peaceful": {
+                "base_frequency": 174.0,  # Healing frequency
+                "harmonics": [1, 1.618, 2, 2.618],  # Golden ratio harmonics
+                "amplitudes": [0.7, 0.5, 0.3, 0.2],
+                "envelope_type": "gentle"
+            },
+            "sad": {
+                "base_frequency": 256.0,  # C4
+                "harmonics": [1, 1.2, 1.8, 2.4],
+                "amplitudes": [0.9, 0.3, 0.2, 0.1],
+                "envelope_type": "gradual_lift"
+            },
+            "anxious": {
+                "base_frequency": 432.0,  # A4 (healing frequency)
+                "harmonics": [1, 1.5, 2, 2.5],
+                "amplitudes": [0.6, 0.4, 0.3, 0.2],
+                "envelope_type": "stabilizing"
+            },
+            "happy": {
+                "base_frequency": 528.0,  # Love frequency
+                "harmonics": [1, 1.25, 1.5, 2],
+                "amplitudes": [0.7, 0.5, 0.4, 0.3],
+                "envelope_type": "uplifting"
+            },
+            "energetic": {
+                "base_frequency": 396.0,  # Liberation frequency
+                "harmonics": [1, 1.33, 1.66, 2],
+                "amplitudes": [0.8, 0.6, 0.4, 0.2],
+                "envelope_type": "dynamic"
+            }
+        }
+        
+        return mood_params.get(mood, mood_params["calm"])
+    
+    def _create_envelope(
+        self, length: int, mood: str, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Create amplitude envelope for therapeutic effect"""
+        if t is None:
+            t = np.linspace(0, 1, length)
+        
+        # Only the selected envelope is evaluated
+        envelope_types = {
+            "slow_rise": lambda: np.sqrt(t),
+            "gentle": lambda: np.sin(np.pi * t / 2),
+            "gradual_lift": lambda: np.power(t, 0.3),
+            "stabilizing": lambda: 0.5 + 0.5 * np.sin(2 * np.pi * t),
+            "uplifting": lambda: np.power(t, 0.8),
+            "dynamic": lambda: 0.7 + 0.3 * np.sin(4 * np.pi * t)
+        }
+        
+        mood_params = self._get_mood_parameters(mood)
+        envelope_type = mood_params.get("envelope_type", "gentle")
+        
+        return envelope_types.get(envelope_type, envelope_types["gentle"])()
+    
+    def _effect_time(self, composition: np.ndarray, t: Optional[np.ndarray]) -> np.ndarray:
+        """Time axis used by the additive effects, unless one is supplied"""
+        if t is None:
+            t = np.linspace(0, len(composition) / self.sample_rate, len(composition))
+        return t
+    
+    def _apply_instrument_characteristics(
+        self, composition: np.ndarray, instrument: str,
+        t: Optional[np.ndarray] = None, u: Optional[np.ndarray] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Apply instrument-specific audio characteristics"""
+        if instrument == "piano":
+            # Add piano-like attack and decay
+            composition = self._add_piano_characteristics(composition, u)
+        elif instrument == "strings":
+            # Add string-like sustain and vibrato
+            composition = self._add_string_characteristics(composition, t)
+        elif instrument == "flute":
+            # Add flute-like breath and harmonics
+            composition = self._add_flute_characteristics(composition, rng)
+        
+        return composition
+    
+    def _add_piano_characteristics(
+        self, composition: np.ndarray, u: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Add piano-like characteristics"""
+        # Simple piano-like envelope
+        if u is None:
+            envelope = np.exp(-np.linspace(0, 5, len(composition)))
+        else:
+            envelope = np.exp(-5 * u)
+        return composition * envelope
+    
+    def _add_string_characteristics(
+        self, composition: np.ndarray, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Add string-like characteristics"""
+        # Add slight vibrato
+        t = self._effect_time(composition, t)
+        vibrato = 1 + 0.02 * np.sin(2 * np.pi * 5 * t)  # 5Hz vibrato
+        return composition * vibrato
+    
+    def _add_flute_characteristics(
+        self, composition: np.ndarray, rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Add flute-like characteristics"""
+        if rng is None:
+            rng = np.random.default_rng()
+        # Add breath noise simulation
+        noise = rng.normal(0, 0.01, len(composition))
+        return composition + noise
+    
+    def _apply_stress_reduction(
+        self, composition: np.ndarray, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply stress-reduction audio effects"""
+        # Add low-frequency components for grounding
+        t = self._effect_time(composition, t)
+        grounding_freq = np.sin(2 * np.pi * 40 * t) * 0.1  # 40Hz grounding
+        return composition + grounding_freq
+    
+    def _apply_anxiety_relief(
+        self, composition: np.ndarray, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply anxiety-relief audio effects"""
+        # Add alpha wave frequencies (8-12 Hz)
+        t = self._effect_time(composition, t)
+        alpha_waves = np.sin(2 * np.pi * 10 * t) * 0.05  # 10Hz alpha
+        return composition + alpha_waves
+    
+    def _apply_mood_lifting(
+        self, composition: np.ndarray, u: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply mood-lifting effects"""
+        # Gradually increase brightness
+        if u is None:
+            u = np.linspace(0, 1, len(composition))
+        brightness = 1 + 0.3 * u
+        return composition * brightness
+    
+    def _apply_calming_effects(
+        self, composition: np.ndarray, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply calming effects"""
+        # Add theta wave frequencies (4-8 Hz)
+        t = self._effect_time(composition, t)
+        theta_waves = np.sin(2 * np.pi * 6 * t) * 0.03  # 6Hz theta
+        return composition + theta_waves
+    
+    def _apply_grounding_effects(
+        self, composition: np.ndarray, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply grounding effects for high energy"""
+        # Add deeper bass frequencies
+        t = self._effect_time(composition, t)
+        bass = np.sin(2 * np.pi * 60 * t) * 0.2  # 60Hz bass
+        return composition + bass
+    
+    def _should_add_binaural_beats(self, mood: str) -> bool:
+        """Determine if binaural beats would be beneficial"""
+        return mood in ["anxious", "stressed", "sad", "energetic"]
+    
+    async def _add_binaural_beats(self, composition: np.ndarray, mood: str) -> np.ndarray:
+        """Add binaural beats for therapeutic effect"""
+        return self._apply_binaural_beats(composition, mood)
+    
+    def _binaural_frequency(self, mood: str) -> int:
+        """Binaural beat frequency (Hz) for a mood"""
+        # Binaural beat frequencies for different moods
+        beat_frequencies = {
+            "anxious": 8,   # Alpha waves
+            "stressed": 6,  # Theta waves
+            "sad": 10,      # Alpha waves
+            "energetic": 4  # Theta waves for grounding
+        }
+        
+        return beat_frequencies.get(mood, 8)
+    
+    def _apply_binaural_beats(
+        self, composition: np.ndarray, mood: str, t: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Mix the mood's binaural beat into the composition"""
+        beat_freq = self._binaural_frequency(mood)
+        
+        # Create binaural beats (simplified - normally would be stereo)
+        t = self._effect_time(composition, t)
+        binaural = np.sin(2 * np.pi * beat_freq * t) * 0.1
+        
+        return composition + binaural
+    
+    async def _save_audio(
+        self, pcm: np.ndarray, request_data: Dict[str, Any]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Encode rendered 16-bit PCM in the requested format
+        
+        Returns the file path and the encoding details.
+        """
+        output_format, quality = self._output_format(request_data)
+        file_path, destination = self._output_file(request_data)
+        with AudioEncoder(
+            destination, self._delivery_rate(request_data), output_format, quality
+        ) as encoder:
+            for start in range(0, len(pcm), self.block_size):
+                encoder.write(pcm[start:start + self.block_size])
+        return file_path, encoder.close()
+    
+    def _output_format(self, request_data: Dict[str, Any]) -> Tuple[str, Optional[float]]:
+        """Validated output format and quality requested for a track"""
+        output_format = request_data.get("format") or "wav"
+        quality = request_data.get("quality")
+        check_output(output_format, self._delivery_rate(request_data), quality)
+        self._duration(request_data)
+        if request_data.get("store", "file") not in ("file", "seed", "memory"):
+            raise ValueError(f"Unsupported store: {request_data['store']}")
+        return output_format, quality
+    
+    def _output_file(self, request_data: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        """File path of a new track, and where to write it (None: in memory)"""
+        extension = FORMATS[request_data.get("format") or "wav"][2]
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        file_path = f"music/therapeutic_music_{timestamp}_{uuid.uuid4().hex[:8]}.{extension}"
+        
+        # Only measured when the seed is stored instead, or nothing kept
+        if self.output_dir is None or request_data.get("store", "file") != "file":
+            return file_path, None
+        destination = os.path.join(self.output_dir, file_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        return file_path, destination
+    
+    def _resample(self, audio: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+        """Polyphase resampling of a whole track between sample rates"""
+        # scipy.signal alone takes about a second to import, so only the
+        # reduced-rate and batch resampling paths pay for it
+        from scipy.signal import resample_poly
+        
+        ratio = Fraction(int(target_rate), int(source_rate))
+        return resample_poly(
+            audio, ratio.numerator, ratio.denominator, window=self.RESAMPLE_WINDOW
+        )
+    
+    def _quantize_pcm16(
+        self, audio: np.ndarray, peak: float,
+        on_block: Optional[Callable[[np.ndarray], None]] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> np.ndarray:
+        """Normalize to full scale and quantize to int16 with TPDF dither
+        
+        Works block by block in the audio's own dtype, so float32 renders are
+        never widened to float64. Each finished block is passed to on_block.
+        The dither is seeded from ``rng``, the render's own Generator, and
+        from fresh entropy without one.
+        """
+        pcm = np.empty(len(audio), dtype=np.int16)
+        if not len(audio):
+            return pcm
+        
+        scale = 32766.0 / peak if peak > 0 else 0.0  # Leave room for the dither
+        dither_rng = np.random.default_rng(None if rng is None else rng.integers(0, 2**31))
+        block_size = min(self.block_size, len(audio))
+        scaled = np.empty(block_size, dtype=audio.dtype)
+        dither = np.empty(block_size, dtype=audio.dtype)
+        
+        for start in range(0, len(audio), block_size):
+            chunk = audio[start:start + block_size]
+            out, noise = scaled[:len(chunk)], dither[:len(chunk)]
+            np.multiply(chunk, scale, out=out)
+            # Triangular dither: difference of two uniforms, +/- 1 LSB
+            dither_rng.random(dtype=audio.dtype, out=noise)
+            out += noise
+            dither_rng.random(dtype=audio.dtype, out=noise)
+            out -= noise
+            np.rint(out, out=out)
+            np.clip(out, -32768, 32767, out=out)
+            pcm[start:start + len(chunk)] = out
+            if on_block is not None:
+                on_block(pcm[start:start + len(chunk)])
+        
+        return pcm
+    
+    def _create_metadata(self, mood: str, genre: str, duration: int, tempo: str, 
+                        instruments: List[str], dynamic_range: float,
+                        sample_rate: Optional[int] = None,
+                        render_rate: Optional[int] = None) -> Dict[str, Any]:
+        """Create metadata for generated music"""
+        return {
+            "mood": mood,
+            "genre": genre,
+            "duration": duration,
+            "tempo": tempo,
+            "instruments": instruments,
+            "therapeutic_elements": {
+                "binaural_beats": self._should_add_binaural_beats(mood),
+                "healing_frequencies": True,
+                "stress_reduction": True,
+                "anxiety_relief": True
+            },
+            "audio_properties": {
+                "sample_rate": sample_rate or self.sample_rate,
+                "render_sample_rate": render_rate or sample_rate or self.sample_rate,
+                "channels": 1,
+                "bit_depth": 16,
+                "render_precision": self.precision,
+                "dynamic_range": dynamic_range
+            },
+            "generated_at": datetime.now().isoformat()
+        }
+
+def _encode_music_job(config: Dict[str, Any], request_data: Dict[str, Any],
+                      destination: Optional[str], progress_queue=None):
+    """Render pool job: render and encode a request, returning the render details"""
+    generator = worker_generator(TherapeuticMusicGenerator, config)
+    progress = (lambda stage, fraction: progress_queue.put((stage, fraction))) if progress_queue else None
+    return asyncio.run(generator._render_encoded(request_data, destination, progress))
+
+def _encoded_music_job(config: Dict[str, Any], request_data: Dict[str, Any]) -> bytes:
+    """Render pool job: the encoded bytes of a request"""
+    generator = worker_generator(TherapeuticMusicGenerator, config)
+    return asyncio.run(generator._encoded_bytes(request_data))
+
+def _render_music_batch_job(config: Dict[str, Any], requests: List[Dict[str, Any]]):
+    """Render pool job: PCM for a batch of requests, each exported to shared memory"""
+    generator = worker_generator(TherapeuticMusicGenerator, config)
+    rendered = asyncio.run(generator._render_batch_pcm(requests))
+    return [(export_array(pcm), render_info) for pcm, render_info in rendered]
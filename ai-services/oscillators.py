@@ -0,0 +1,93 @@
+from typing import Optional, Sequence
+import numpy as np
+
+class PhasorBank:
+    """Bank of sinusoidal partials rendered from a shared complex phasor table
+    
+    The table holds exp(i w_h k dt) for one span of samples per partial. A
+    block is split into rows of one span; each row starts from the exact
+    phasor of every partial, recomputed from the absolute sample index in
+    float64 (drift correction), and is expanded across the span by a single
+    matrix product with the table. Rendering therefore costs a few
+    multiply-adds per sample instead of one transcendental call per partial.
+    """
+    
+    def __init__(self, frequencies: Sequence[float], amplitudes: Sequence[float],
+                 step: float, phases: Optional[Sequence[float]] = None,
+                 span: int = 1024, dtype: type = np.float64):
+        self.omega = 2 * np.pi * np.asarray(frequencies, dtype=np.float64)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.phases = (
+            np.zeros_like(self.omega) if phases is None
+            else np.asarray(phases, dtype=np.float64)
+        )
+        self.step = step
+        self.span = span
+        self.dtype = np.dtype(dtype)
+        
+        table = np.exp(1j * np.outer(self.omega * step, np.arange(span)))
+        # Row coefficients [Re c | Im c] times these give sum(Im(c w^k)) and
+        # sum(Re(c w^k)) respectively
+        self._sin_table = np.vstack([table.imag, table.real]).astype(self.dtype)
+        self._cos_table = np.vstack([table.real, -table.imag]).astype(self.dtype)
+    
+    def _row_coefficients(self, start: int, rows: int) -> np.ndarray:
+        """Amplitude-scaled phasors at the first sample of each row"""
+        row_index = start + self.span * np.arange(rows, dtype=np.float64)
+        theta = np.remainder(
+            np.outer(row_index * self.step, self.omega) + self.phases, 2 * np.pi
+        )
+        coefficients = self.amplitudes * np.exp(1j * theta)
+        return np.hstack([coefficients.real, coefficients.imag]).astype(self.dtype)
+    
+    def render(self, start: int, length: int, sin_out: np.ndarray,
+               cos_out: Optional[np.ndarray] = None) -> None:
+        """Render samples [start, start + length) of the summed partials
+        
+        ``sin_out`` receives sum(a sin(w t + phase)) and the optional
+        ``cos_out`` the matching quadrature sum(a cos(w t + phase)).
+        """
+        rows, tail = divmod(length, self.span)
+        coefficients = self._row_coefficients(start, rows + (1 if tail else 0))
+        for table, out in ((self._sin_table, sin_out), (self._cos_table, cos_out)):
+            if out is None:
+                continue
+            if rows:
+                np.matmul(coefficients[:rows], table,
+                          out=out[:rows * self.span].reshape(rows, self.span))
+            if tail:
+                np.matmul(coefficients[rows:], table[:, :tail],
+                          out=out[rows * self.span:length].reshape(1, tail))
+
+def _horner_into(out: np.ndarray, x2: np.ndarray, coefficients: Sequence[float]) -> None:
+    """out = 1 + c0 x2 (1 + c1 x2 (1 + ...)) evaluated in place"""
+    out.fill(1.0)
+    for coefficient in reversed(coefficients):
+        out *= x2
+        out *= coefficient
+        out += 1.0
+
+def phase_modulated_sum(bank: PhasorBank, start: int, modulation: np.ndarray,
+                        out: np.ndarray, quadrature: np.ndarray,
+                        squared: np.ndarray, series: np.ndarray) -> None:
+    """out = sum(a sin(w t + phase + m)) for a small common modulation m
+    
+    Uses sin(x + m) = sin(x) cos(m) + cos(x) sin(m) with truncated series
+    for cos(m) and sin(m), accurate to 1e-13 for |m| <= 0.1. ``quadrature``,
+    ``squared`` and ``series`` are scratch buffers sized like ``out``.
+    """
+    length = len(modulation)
+    bank.render(start, length, out, quadrature)
+    out, quadrature = out[:length], quadrature[:length]
+    squared, series = squared[:length], series[:length]
+    np.multiply(modulation, modulation, out=squared)
+    
+    # sin(m) = m (1 - m^2/6 (1 - m^2/20 (1 - m^2/42)))
+    _horner_into(series, squared, (-1 / 6, -1 / 20, -1 / 42))
+    series *= modulation
+    quadrature *= series
+    
+    # cos(m) = 1 - m^2/2 (1 - m^2/12 (1 - m^2/30))
+    _horner_into(series, squared, (-1 / 2, -1 / 12, -1 / 30))
+    out *= series
+    out += quadrature
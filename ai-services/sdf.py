@@ -0,0 +1,114 @@
+from typing import Optional, Sequence, Tuple
+import math
+
+import numpy as np
+
+# Pixel (i, j) is sampled at its center, the point (i, j), as ImageDraw
+# treats integer coordinates; every field is in pixels, negative inside.
+# Fields over a whole box take an optional ``out`` array to fill, so that
+# callers can reuse work buffers across shapes.
+
+Grid = Tuple[np.ndarray, np.ndarray]
+
+def grid(box: Tuple[int, int, int, int]) -> Grid:
+    """Pixel-center coordinates of a box, as a row and a column that broadcast"""
+    x0, y0, x1, y1 = box
+    xs = np.arange(x0, x1, dtype=np.float32)[None, :]
+    ys = np.arange(y0, y1, dtype=np.float32)[:, None]
+    return xs, ys
+
+def circle(xs: np.ndarray, ys: np.ndarray, cx: float, cy: float, radius: float,
+           out: Optional[np.ndarray] = None) -> np.ndarray:
+    distance = np.add((ys - cy) ** 2, (xs - cx) ** 2, out=out)
+    np.sqrt(distance, out=distance)
+    distance -= radius
+    return distance
+
+def ellipse(xs: np.ndarray, ys: np.ndarray, cx: float, cy: float,
+            rx: float, ry: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Exact for circles; elsewhere the implicit function over its gradient,
+    which is close near the outline, where coverage is decided"""
+    if rx == ry:
+        return circle(xs, ys, cx, cy, rx, out)
+    u, v = (xs - cx) / rx, (ys - cy) / ry
+    distance = np.add(v * v, u * u, out=out)
+    distance -= 1
+    gradient = np.hypot(v / ry, u / rx)
+    gradient *= 2
+    # Clear of zero at the center, which is then deep inside
+    np.maximum(gradient, 1e-6, out=gradient)
+    distance /= gradient
+    return distance
+def ring(xs: np.ndarray, ys: np.ndarray, cx: float, cy: float, rx: float, ry: float,
+         width: float, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Band of ``width`` inside an ellipse's outline, as outlines are drawn;
+    the whole ellipse when it is narrower than that"""
+    distance = ellipse(xs, ys, cx, cy, rx, ry, out)
+    if rx > width and ry > width:
+        inner = ellipse(xs, ys, cx, cy, rx - width, ry - width)
+        np.negative(inner, out=inner)
+        np.maximum(distance, inner, out=distance)
+    return distance
+
+def box(xs: np.ndarray, ys: np.ndarray, x0: float, y0: float, x1: float, y1: float,
+        out: Optional[np.ndarray] = None) -> np.ndarray:
+    dx = np.maximum(x0 - xs, xs - x1)
+    dy = np.maximum(y0 - ys, ys - y1)
+    inside = np.minimum(np.maximum(dx, dy), 0)
+    distance = np.hypot(np.maximum(dx, 0), np.maximum(dy, 0), out=out)
+    distance += inside
+    return distance
+
+def segment(xs: np.ndarray, ys: np.ndarray, a: Tuple[float, float],
+            b: Tuple[float, float]) -> np.ndarray:
+    """Unsigned distance to the segment from a to b"""
+    ax, ay = a
+    ex, ey = b[0] - ax, b[1] - ay
+    length2 = ex * ex + ey * ey
+    px, py = xs - ax, ys - ay
+    if length2 == 0:
+        return np.hypot(px, py)
+    t = np.clip((px * ex + py * ey) / length2, 0, 1)
+    return np.hypot(px - t * ex, py - t * ey)
+
+def polygon(xs: np.ndarray, ys: np.ndarray, points: Sequence[Tuple[float, float]],
+            out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Distance to the outline, negative inside by the even-odd rule
+    
+    Exact within a pixel of the outline, where coverage is decided, and
+    -inf or inf beyond: each edge's distance is only computed over the
+    edge's own bounding box, and inside is found per row from where the
+    edges cross it, so the cost follows the outline rather than the area.
+    """
+    x_start, y_start = float(xs[0, 0]), float(ys[0, 0])
+    rows, columns = ys.shape[0], xs.shape[1]
+    distance = np.empty((rows, columns), dtype=np.float32) if out is None else out
+    distance.fill(np.inf)
+    # Crossings of each row, counted at the first column right of them
+    crossings = np.zeros((rows, columns + 1), dtype=np.int32)
+    row_y = ys[:, 0]
+    for a, b in zip(points, list(points[1:]) + [points[0]]):
+        (ax, ay), (bx, by) = a, b
+        c0 = max(0, math.floor(min(ax, bx) - x_start) - 1)
+        c1 = min(columns, math.ceil(max(ax, bx) - x_start) + 2)
+        r0 = max(0, math.floor(min(ay, by) - y_start) - 1)
+        r1 = min(rows, math.ceil(max(ay, by) - y_start) + 2)
+        if c0 < c1 and r0 < r1:
+            near = distance[r0:r1, c0:c1]
+            np.minimum(near, segment(xs[:, c0:c1], ys[r0:r1], a, b), out=near)
+        if ay != by:
+            crossed = np.nonzero((ay > row_y) != (by > row_y))[0]
+            x = ax + (bx - ax) * (row_y[crossed] - ay) / (by - ay)
+            # Pixels left of the crossing, x_start + column < x
+            left = np.clip(np.ceil(x - x_start), 0, columns).astype(np.intp)
+            np.add.at(crossings, (crossed, left), 1)
+    # Crossings right of each pixel: those counted past its column
+    right = np.cumsum(crossings[:, :0:-1], axis=1)[:, ::-1]
+    np.negative(distance, out=distance, where=(right & 1).astype(bool))
+    return distance
+
+def coverage(distance: np.ndarray) -> np.ndarray:
+    """Fraction of each pixel inside the shape, a one-pixel ramp across the
+    edge; computed in place of the distances"""
+    np.subtract(0.5, distance, out=distance)
+    return np.clip(distance, 0, 1, out=distance)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Build the pre-rendered stem library used by the music generator
+
+Usage: python stems.py DIRECTORY [--sample-rate 22050 ...] [--seed 0]
+"""
+from typing import Dict, Iterable, Optional, Tuple
+import argparse
+import json
+import os
+import sys
+import threading
+import uuid
+
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+def harmonics_stem(mood: str, treatment: str, sample_rate: int) -> str:
+    """Name of a mood's harmonic stack with an instrument treatment applied"""
+    return f"harmonics/{mood}/{treatment}@{sample_rate}"
+
+def sine_stem(frequency: float, sample_rate: int) -> str:
+    """Name of a unit sine (vibrato or therapeutic tone)"""
+    return f"sine/{frequency:g}@{sample_rate}"
+
+class StemLibrary:
+    """Pre-rendered loops, memory-mapped read-only from a directory
+    
+    Each stem is one loop of a periodic signal scaled to unit peak and
+    stored as a float32 .npy file; its gain and the library's loop length,
+    sample rates and version are kept in manifest.json. Opening a library
+    maps every file without reading it, so the processes that open the same
+    directory share one copy of the samples through the OS page cache.
+    """
+    
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        self.directory = directory
+        self.version = manifest["version"]
+        self.loop_seconds = manifest["loop_seconds"]
+        self.sample_rates = frozenset(manifest["sample_rates"])
+        self._stems = {
+            name: (np.load(os.path.join(directory, entry["file"]), mmap_mode="r"), entry["gain"])
+            for name, entry in manifest["stems"].items()
+        }
+    
+    def get(self, name: str) -> Optional[Tuple[np.ndarray, float]]:
+        """Mapped samples and gain of a stem, or None if it was not built"""
+        return self._stems.get(name)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._stems
+    
+    def __len__(self) -> int:
+        return len(self._stems)
+    
+    def stats(self) -> Dict[str, object]:
+        """Library version, stem count and mapped size"""
+        return {
+            "version": self.version,
+            "stems": len(self._stems),
+            "mapped_bytes": sum(samples.nbytes for samples, _ in self._stems.values())
+        }
+
+# Libraries opened by this process, by directory
+_libraries: Dict[str, StemLibrary] = {}
+_libraries_lock = threading.Lock()
+
+def open_stem_library(directory: str) -> StemLibrary:
+    """Stem library of a directory, mapped once per process"""
+    directory = os.path.abspath(directory)
+    with _libraries_lock:
+        library = _libraries.get(directory)
+        if library is None:
+            library = _libraries[directory] = StemLibrary(directory)
+        return library
+
+def build_stem_library(directory: str, sample_rates: Iterable[int] = (22050,),
+                       seed: int = 0, generator=None) -> StemLibrary:
+    """Render every stem the generator can use into directory
+    
+    Per sample rate this writes each mood's harmonic stack under every
+    instrument treatment the generator folds into it, plus a unit sine for
+    every vibrato and tone frequency its effect chains use. Phases are drawn
+    from ``seed``. Every file is replaced rather than rewritten, so
+    processes still mapping an earlier build keep reading it intact, and the
+    manifest is replaced last with a new version.
+    """
+    if generator is None:
+        from music_generator import TherapeuticMusicGenerator
+        generator = TherapeuticMusicGenerator()
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    sample_rates = sorted(set(int(rate) for rate in sample_rates))
+    
+    stems = {}
+    
+    def replace_file(file_name, write):
+        path = os.path.join(directory, file_name)
+        with open(path + ".tmp", "wb") as f:
+            write(f)
+        os.replace(path + ".tmp", path)
+    
+    def save(name, samples):
+        peak = float(np.max(np.abs(samples)))
+        file_name = name.replace("/", "_").replace("@", "_") + ".npy"
+        replace_file(file_name, lambda f: np.save(f, (samples / peak).astype(np.float32)))
+        stems[name] = {"file": file_name, "gain": peak}
+    
+    moods = generator.MOODS
+    phases = {
+        mood: rng.random(len(generator._get_mood_parameters(mood)["harmonics"])) * 2 * np.pi
+        for mood in moods
+    }
+    for sample_rate in sample_rates:
+        t = generator._loop_axis(1.0 / sample_rate)
+        for mood in moods:
+            stack = generator._harmonic_loop(generator._get_mood_parameters(mood), phases[mood], t)
+            for treatment, instruments in generator.STEM_TREATMENTS.items():
+                treated = stack.copy()
+                for op in generator._effect_ops(generator._stem_plan(mood, instruments))[0]:
+                    treated *= 1.0 + generator._loop_wave(t, op[1], op[2])
+                save(harmonics_stem(mood, treatment, sample_rate), treated)
+        for frequency in generator._stem_frequencies():
+            save(sine_stem(frequency, sample_rate), generator._loop_wave(t, frequency, 1.0))
+    
+    manifest = {
+        "version": uuid.uuid4().hex,
+        "loop_seconds": generator.LOOP_SECONDS,
+        "sample_rates": sample_rates,
+        "seed": seed,
+        "stems": stems
+    }
+    replace_file(MANIFEST, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    with _libraries_lock:
+        _libraries.pop(os.path.abspath(directory), None)
+    return open_stem_library(directory)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory", help="library directory (AI_SERVICE_STEM_DIR)")
+    parser.add_argument("--sample-rate", type=int, action="append", dest="sample_rates",
+                        help="render rate to build stems for (repeatable; default: 22050)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the stem phases")
+    args = parser.parse_args()
+    
+    library = build_stem_library(args.directory, args.sample_rates or (22050,), args.seed)
+    stats = library.stats()
+    print(
+        f"🎵 Built {stats['stems']} stems ({stats['mapped_bytes'] / 2**20:.1f} MiB) "
+        f"in {args.directory}, version {stats['version']}"
+    )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1 @@
-# AI Services Test Package
+# AI Services Test Package
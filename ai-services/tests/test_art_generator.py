@@ -0,0 +1,384 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import sys
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from art_generator import TherapeuticArtGenerator
+from caching import LRUCache
+from compositing import LayerCompositor, PixelCanvas, RecordedLayer
+import sdf
+
+STYLES = ["abstract", "geometric", "nature", "watercolor", "minimalist", "digital"]
+STRESSED = {"recentMoodHistory": [{"stress_level": 8, "anxiety_level": 8}]}
+
+def compose(generator, mood, style, seed):
+    """Base composition of a style, drawn from a fixed seed."""
+    rng = np.random.default_rng(seed)
+    image = asyncio.run(generator._create_base_composition(mood, style, "calm", "healing", 1.0, rng))
+    return np.asarray(image)
+
+@pytest.mark.parametrize("style", STYLES)
+def test_bounded_layers_match_full_canvas_layers(style):
+    """Compositing within bounding boxes is pixel-identical to full-canvas layers."""
+    bounded = TherapeuticArtGenerator()
+    reference = TherapeuticArtGenerator(bounded_layers=False)
+    for mood, seed in [("calm", 0), ("energetic", 1), ("anxious", 2)]:
+        np.testing.assert_array_equal(
+            compose(bounded, mood, style, seed), compose(reference, mood, style, seed)
+        )
+
+def test_compositor_matches_rgb_round_trip():
+    """Layers match compositing each full layer over RGB converted to RGBA and back."""
+    rng = np.random.default_rng(5)
+    base = Image.new("RGB", (256, 256), color="white")
+    expected = base
+    compositor = LayerCompositor(base)
+    for _ in range(30):
+        # Shapes partly off the canvas, at fractional coordinates
+        points = [tuple(rng.uniform(-40, 296, 2)) for _ in range(7)]
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        alpha = int(rng.integers(1, 256))
+        
+        temp_image = Image.new("RGBA", base.size, (0, 0, 0, 0))
+        ImageDraw.Draw(temp_image).polygon(points, fill=(*color, alpha))
+        expected = Image.alpha_composite(expected.convert("RGBA"), temp_image).convert("RGB")
+        with compositor.layer(color) as layer:
+            layer.polygon(points, fill=alpha)
+    
+    np.testing.assert_array_equal(np.asarray(compositor.image()), np.asarray(expected))
+
+def test_compositor_blends_only_bounding_boxes():
+    """Small shapes composite a small region and leave the mask clear."""
+    compositor = LayerCompositor(Image.new("RGB", (1024, 1024), color="white"))
+    for x in range(0, 1000, 100):
+        with compositor.layer((255, 140, 0)) as layer:
+            layer.rectangle([x, 10, x + 50, 60], fill=178)
+    
+    assert compositor.layers == 10
+    assert compositor.pixels < 10 * 60 * 60
+    assert compositor._mask.getbbox() is None
+    pixels = np.asarray(compositor.image())
+    assert tuple(pixels[30, 20]) != (255, 255, 255)
+    assert tuple(pixels[30, 70]) == (255, 255, 255)
+
+@pytest.mark.parametrize("style", STYLES)
+def test_array_pipeline_matches_pil_pipeline(style):
+    """Rendering into one pixel array gives the PIL pipeline's pixels, effects included."""
+    pil = TherapeuticArtGenerator()
+    array = TherapeuticArtGenerator(array_pipeline=True)
+    for mood, prefs in [("calm", {}), ("sad", STRESSED), ("anxious", {}), ("energetic", STRESSED)]:
+        request = {"mood": mood, "artStyle": style, "personalPreferences": prefs}
+        expected = np.asarray(asyncio.run(pil._render_image({**request, "seed": 3})))
+        canvas = asyncio.run(array._render_image({**request, "seed": 3}))
+        np.testing.assert_array_equal(canvas.rgb, expected)
+        assert (canvas.pixels[..., 3] == 255).all()
+
+@pytest.mark.parametrize("size,quality", [(2048, "full"), (512, "full"), (2048, "draft")])
+def test_pipelines_match_at_other_sizes(size, quality):
+    """Blurs scale with the canvas, and only drafts take the box blur, in both pipelines."""
+    pil = TherapeuticArtGenerator()
+    array = TherapeuticArtGenerator(array_pipeline=True)
+    request = {"mood": "anxious", "artStyle": "abstract", "personalPreferences": STRESSED,
+               "size": size, "quality": quality, "seed": 5}
+    expected = np.asarray(asyncio.run(pil._render_image(request)))
+    canvas = asyncio.run(array._render_image(request))
+    np.testing.assert_array_equal(canvas.rgb, expected)
+    
+    image = Image.fromarray(expected)
+    blur = ImageFilter.BoxBlur if quality == "draft" else ImageFilter.GaussianBlur
+    np.testing.assert_array_equal(
+        np.asarray(pil._blur(image, 1, quality == "draft")), np.asarray(image.filter(blur(image.size[0] / 1024)))
+    )
+
+@pytest.mark.parametrize("kind", ["brightness", "contrast", "color"])
+def test_pixel_canvas_enhancements_match_image_enhance(kind):
+    """Table-driven enhancements equal ImageEnhance, extrapolating factors included."""
+    enhancers = {"brightness": ImageEnhance.Brightness, "contrast": ImageEnhance.Contrast,
+                 "color": ImageEnhance.Color}
+    rng = np.random.default_rng(7)
+    pixels = rng.integers(0, 256, (150, 130, 3), dtype=np.uint8)
+    for factor in [0.8, 0.9, 1.1, 1.2, 2.5]:
+        canvas = PixelCanvas((130, 150))
+        canvas.rgb[...] = pixels
+        canvas.enhance(kind, factor)
+        expected = enhancers[kind](Image.fromarray(pixels)).enhance(factor)
+        np.testing.assert_array_equal(canvas.rgb, np.asarray(expected))
+
+def test_array_pipeline_reports_copies():
+    """Only blurs copy the canvas; PIL views and layers share its memory."""
+    canvas = PixelCanvas((64, 48), color=(10, 20, 30))
+    view = canvas.view()
+    assert view.size == (64, 48) and view.getpixel((5, 5)) == (10, 20, 30, 255)
+    with LayerCompositor(canvas).layer((200, 0, 0)) as layer:
+        layer.rectangle([0, 0, 10, 10], fill=255)
+    assert view.getpixel((5, 5)) == (200, 0, 0, 255)
+    canvas.enhance("contrast", 1.2)
+    assert canvas.copies == 0
+    canvas.blur(1)
+    assert canvas.copies == 1
+    
+    generator = TherapeuticArtGenerator(array_pipeline=True)
+    calm = asyncio.run(generator.generate_art({"mood": "calm", "artStyle": "digital"}))
+    assert calm["metadata"]["pipeline"] == {"name": "array", "layout": "RGBA", "copies": 0}
+    assert calm["metadata"]["image_properties"]["mode"] == "RGB"
+    # A blur each for stress, anxiety and the anxious mood
+    anxious = asyncio.run(generator.generate_art(
+        {"mood": "anxious", "artStyle": "digital", "personalPreferences": STRESSED}
+    ))
+    assert anxious["metadata"]["pipeline"]["copies"] == 3
+    
+    pil = asyncio.run(TherapeuticArtGenerator().generate_art({"mood": "calm"}))
+    assert pil["metadata"]["pipeline"] == {"name": "pil"}
+
+def test_sdf_polygon_uses_even_odd_rule():
+    """Signs match a brute-force even-odd test, self-intersections included."""
+    rng = np.random.default_rng(11)
+    xs, ys = sdf.grid((0, 0, 90, 70))
+    for _ in range(10):
+        points = [tuple(rng.uniform(-10, 100, 2)) for _ in range(6)]
+        inside = np.zeros((70, 90), dtype=bool)
+        for (ax, ay), (bx, by) in zip(points, points[1:] + points[:1]):
+            crosses = (ay > ys) != (by > ys)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x = ax + (bx - ax) * (ys - ay) / (by - ay)
+            inside ^= crosses & (xs < x)
+        distance = sdf.polygon(xs, ys, points)
+        np.testing.assert_array_equal(distance < 0, inside & (distance != 0))
+
+def test_sdf_layers_match_pil_shapes_away_from_edges():
+    """Distance-field shapes cover what ImageDraw fills, differing only along outlines."""
+    rng = np.random.default_rng(13)
+    xs, ys = sdf.grid((0, 0, 200, 200))
+    for _ in range(10):
+        points = [tuple(rng.uniform(0, 200, 2)) for _ in range(5)]
+        x0, x1 = sorted(rng.uniform(10, 190, 2))
+        shapes = [
+            (lambda layer: layer.polygon(points, fill=255), sdf.polygon(xs, ys, points)),
+            (lambda layer: layer.ellipse([x0, 30, x1, 170], outline=255, width=4),
+             sdf.ring(xs, ys, (x0 + x1) / 2, 100, (x1 - x0 + 1) / 2, 70.5, 4))
+        ]
+        for draw, distance in shapes:
+            images = []
+            for rasterizer in ["pil", "sdf"]:
+                compositor = LayerCompositor(Image.new("RGB", (200, 200), "white"), rasterizer=rasterizer)
+                with compositor.layer((0, 0, 0)) as layer:
+                    draw(layer)
+                images.append(np.asarray(compositor.image())[..., 0].astype(int))
+            differs = np.abs(images[0] - images[1]) > 128
+            # ImageDraw also strokes each edge, a pixel past the outline
+            assert (np.abs(distance[differs]) <= 1.5).all()
+    
+    with pytest.raises(ValueError):
+        LayerCompositor(Image.new("RGB", (8, 8)), rasterizer="svg")
+
+def test_sdf_wash_is_a_smooth_radial_falloff():
+    """A wash fades monotonically from the center, without the stacked rings' steps."""
+    compositor = LayerCompositor(Image.new("RGB", (200, 200), "white"), rasterizer="sdf")
+    with compositor.layer((0, 0, 0)) as layer:
+        layer.wash((100, 100), 80, fill=200)
+    row = np.asarray(compositor.image())[100, 100:, 0].astype(int)
+    assert row[0] < 60 and row[90] == 255
+    assert (np.diff(row) >= 0).all()
+    # A step of at most 3 levels per pixel, against a jump at every ring
+    assert np.diff(row).max() <= 3
+    assert len(np.unique(row[:80])) > 40
+
+@pytest.mark.parametrize("style", STYLES)
+def test_sdf_styles_render_close_to_pil(style):
+    """Styles selected for distance fields render close to their PIL drawing."""
+    pil = TherapeuticArtGenerator()
+    fields = TherapeuticArtGenerator(sdf_styles=[style])
+    difference = np.abs(
+        compose(pil, "calm", style, 4).astype(int) - compose(fields, "calm", style, 4).astype(int)
+    )
+    assert difference.mean() < 2
+    
+    request = {"mood": "calm", "artStyle": style}
+    assert fields._cache_params(request)["rasterizer"] == "sdf"
+    assert pil._cache_params(request)["rasterizer"] == "pil"
+    assert fields._cache_params({**request, "artStyle": "other"})["rasterizer"] == "pil"
+
+@pytest.mark.parametrize("array_pipeline", [False, True])
+def test_draft_matches_full_render_composition(array_pipeline):
+    """A draft is the full render's composition, effects included, at a quarter size."""
+    generator = TherapeuticArtGenerator(array_pipeline=array_pipeline)
+    for style in STYLES:
+        renders = {}
+        for quality in ["full", "draft"]:
+            request = {"mood": "anxious", "artStyle": style, "personalPreferences": STRESSED,
+                       "quality": quality}
+            canvas = asyncio.run(generator._render_image({**request, "seed": 9}))
+            renders[quality] = canvas.image() if isinstance(canvas, PixelCanvas) else canvas
+        assert renders["draft"].size == (256, 256)
+        reduced = np.asarray(renders["full"].resize((256, 256), Image.BILINEAR)).astype(int)
+        assert np.abs(reduced - np.asarray(renders["draft"]).astype(int)).mean() < 3
+
+def test_draft_seed_renders_again_in_full():
+    """Metadata carries the seed, which renders the draft's composition in full."""
+    generator = TherapeuticArtGenerator()
+    draft = asyncio.run(generator.generate_art({"mood": "calm", "artStyle": "abstract",
+                                                "quality": "draft"}))
+    metadata = draft["metadata"]
+    assert metadata["quality"] == "draft"
+    assert metadata["image_properties"]["size"] == (256, 256)
+    
+    request = {"mood": "calm", "artStyle": "abstract", "seed": metadata["seed"]}
+    full = asyncio.run(generator.generate_art(request))
+    assert full["metadata"]["quality"] == "full"
+    assert full["metadata"]["seed"] == metadata["seed"]
+    # Calm without a mood history takes no effects: the render is the composition
+    expected = compose(generator, "calm", "abstract", metadata["seed"])
+    rendered = asyncio.run(generator._render_image(request))
+    np.testing.assert_array_equal(np.asarray(rendered), expected)
+    
+    assert generator._cache_params(request) != generator._cache_params({**request, "quality": "draft"})
+    with pytest.raises(ValueError):
+        asyncio.run(generator.generate_art({"mood": "calm", "quality": "poster"}))
+
+def test_banded_canvas_matches_whole_canvas():
+    """Blurs and enhancements over threaded bands, with halos, equal one pass."""
+    rng = np.random.default_rng(17)
+    pixels = rng.integers(0, 256, (700, 300, 3), dtype=np.uint8)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        whole = PixelCanvas((300, 700))
+        banded = PixelCanvas((300, 700), executor=executor, bands=5)
+        assert len(banded.bands) == 5
+        for canvas in (whole, banded):
+            canvas.rgb[...] = pixels
+            canvas.blur(2.5)
+            canvas.enhance("contrast", 1.2)
+            canvas.blur(0.8, box=True)
+            canvas.enhance("color", 0.8)
+        np.testing.assert_array_equal(banded.pixels, whole.pixels)
+        assert banded.copies == whole.copies == 2
+
+@pytest.mark.parametrize("style", STYLES)
+def test_tiled_render_matches_single_thread(style):
+    """Shapes crossing band borders render exactly as on one canvas."""
+    single = TherapeuticArtGenerator(array_pipeline=True, sdf_styles=["watercolor"])
+    tiled = TherapeuticArtGenerator(array_pipeline=True, sdf_styles=["watercolor"], tile_threads=4)
+    request = {"mood": "anxious", "artStyle": style, "personalPreferences": STRESSED}
+    expected = asyncio.run(single._render_image({**request, "seed": 8})).pixels.copy()
+    canvas = asyncio.run(tiled._render_image({**request, "seed": 8}))
+    assert len(canvas.bands) == 4
+    np.testing.assert_array_equal(canvas.pixels, expected)
+
+@pytest.mark.parametrize("rasterizer", ["pil", "sdf"])
+def test_bands_composite_only_the_shapes_reaching_them(rasterizer, monkeypatch):
+    """Each band replays the shapes over its rows, scaled, as one canvas draws them."""
+    replayed = []
+    replay = RecordedLayer.replay
+    monkeypatch.setattr(
+        RecordedLayer, "replay",
+        lambda self, layer, shapes=None: replayed.append(len(shapes)) or replay(self, layer, shapes)
+    )
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        whole = PixelCanvas((300, 600))
+        banded = PixelCanvas((300, 600), executor=executor, bands=4)
+        for canvas in (whole, banded):
+            compositor = LayerCompositor(canvas, rasterizer=rasterizer, scale=0.5)
+            with compositor.layer((200, 40, 40)) as layer:
+                layer.ellipse([100, 250, 500, 950], fill=150, outline=220, width=6)
+                layer.polygon([(20, 20), (300, 60), (120, 200)], fill=180)
+            with compositor.layer((40, 40, 200)) as layer:
+                layer.line([(30, 1100), (570, 1150), (300, 1190)], fill=200, width=9)
+                layer.wash((450, 300), 160, 120)
+            compositor.image()
+        np.testing.assert_array_equal(banded.pixels, whole.pixels)
+    # Each of the four shapes is measured alone, then the 150-row bands
+    # draw the ellipse in all four, the polygon in the first, the wash in
+    # the first two and the line in the last
+    assert sum(replayed) == 4 + 4 + 1 + 2 + 1
+
+def test_rendering_in_bands_needs_the_array_pipeline():
+    """Threads for canvas bands are rejected on the PIL pipeline."""
+    with pytest.raises(ValueError):
+        TherapeuticArtGenerator(tile_threads=4)
+    assert TherapeuticArtGenerator(array_pipeline=True, tile_threads=4).tile_threads == 4
+
+def test_requested_size_scales_the_composition():
+    """Output sizes are scaled renders of the design canvas, within bounds."""
+    generator = TherapeuticArtGenerator()
+    result = asyncio.run(generator.generate_art(
+        {"mood": "calm", "artStyle": "geometric", "size": 2048, "quality": "draft"}
+    ))
+    assert result["metadata"]["image_properties"]["size"] == (512, 512)
+    
+    large = asyncio.run(generator._render_image(
+        {"mood": "calm", "artStyle": "geometric", "size": 2048, "seed": 2}
+    ))
+    assert large.size == (2048, 2048)
+    reduced = np.asarray(large.resize((1024, 1024), Image.BILINEAR)).astype(int)
+    assert np.abs(reduced - compose(generator, "calm", "geometric", 2).astype(int)).mean() < 2
+    
+    for size in [32, 8192, "big"]:
+        with pytest.raises(ValueError):
+            asyncio.run(generator.generate_art({"mood": "calm", "size": size}))
+
+@pytest.mark.parametrize("array_pipeline", [False, True])
+def test_fused_effects_match_effect_chain(array_pipeline):
+    """One blur and one table pass look like the effects applied one by one."""
+    chained = TherapeuticArtGenerator(array_pipeline=array_pipeline)
+    fused = TherapeuticArtGenerator(array_pipeline=array_pipeline, fused_effects=True,
+                                    effect_cache=LRUCache())
+    base = asyncio.run(TherapeuticArtGenerator(array_pipeline=True)._create_base_composition(
+        "calm", "abstract", "calm", "healing", 1.0, np.random.default_rng(4)
+    ))
+    for mood in ["calm", "sad", "anxious", "energetic"]:
+        for stress, anxiety in [(5, 5), (8, 5), (5, 8), (8, 8)]:
+            history = [{"stress_level": stress, "anxiety_level": anxiety}]
+            images = []
+            for generator in (chained, fused):
+                image = PixelCanvas.wrap(base.pixels.copy()) if array_pipeline else base.image()
+                image = asyncio.run(generator._apply_therapeutic_effects(image, mood, history))
+                images.append(np.asarray(image.image() if array_pipeline else image).astype(int))
+            difference = np.abs(images[0] - images[1])
+            assert difference.mean() < 1
+            assert np.percentile(difference, 99) <= 10
+
+def test_fused_effects_are_compiled_once_per_chain():
+    """Blurs merge by variance, Color factors multiply, and chains are cached."""
+    cache = LRUCache()
+    generator = TherapeuticArtGenerator(fused_effects=True, effect_cache=cache)
+    fused = generator._fused_effects("anxious", True, True)
+    assert fused["blur"] == pytest.approx(np.sqrt(1 + 0.5 ** 2 + 0.8 ** 2))
+    assert fused["color"] == pytest.approx(1.1 * 0.8)
+    assert fused["tone"] == (("brightness", 1.1),)
+    assert generator._fused_effects("anxious", True, True) is fused
+    assert generator._fused_effects("sad", False, False)["tone"] == (
+        ("brightness", 1.2), ("contrast", 1.1)
+    )
+    assert cache.hits == 1
+
+def test_color_therapy_lut_shifts_colors_in_one_pass():
+    """Each mood and palette gets one cached table, applied alike on both pipelines."""
+    cache = LRUCache()
+    generator = TherapeuticArtGenerator(effect_cache=cache)
+    rng = np.random.default_rng(7)
+    pixels = rng.integers(0, 256, (96, 80, 3), dtype=np.uint8)
+    
+    # Calm draws bluish colors towards blue and pushes reddish ones off red
+    blue, red = np.float32([[0.3, 0.3, 0.8]]), np.float32([[0.8, 0.3, 0.3]])
+    shifted = generator._color_therapy(np.concatenate([blue, red]), "calm", "calm")
+    assert shifted[0, 2] > 0.8 and shifted[1, 0] < 0.8
+    
+    for mood, palette in [("calm", "cool"), ("sad", "warm"), ("happy", "monochrome")]:
+        image = asyncio.run(generator._apply_color_therapy(Image.fromarray(pixels), mood, palette))
+        canvas = PixelCanvas.wrap(np.dstack([pixels, np.full(pixels.shape[:2], 255, np.uint8)]))
+        assert asyncio.run(generator._apply_color_therapy(canvas, mood, palette)) is canvas
+        np.testing.assert_array_equal(canvas.rgb, np.asarray(image))
+        assert canvas.copies == 0
+        assert np.abs(np.asarray(image).astype(int) - pixels).mean() > 0.1
+    assert generator._color_therapy_lut("sad", "warm") is generator._color_therapy_lut("sad", "warm")
+    assert cache.hits >= 1
+    
+    # Neither a known mood nor a known palette: nothing to apply
+    image = Image.fromarray(pixels)
+    assert asyncio.run(generator._apply_color_therapy(image, "creative", "calm")) is image
@@ -0,0 +1,149 @@
+import asyncio
+import io
+import sys
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_encoding import FORMATS, AudioEncoder, available_formats, check_output
+from music_generator import TherapeuticMusicGenerator
+
+def tone_pcm(seconds=2, sample_rate=24000):
+    """A tone with some noise, as 16-bit PCM."""
+    t = np.arange(seconds * sample_rate) / sample_rate
+    rng = np.random.default_rng(0)
+    audio = 0.5 * np.sin(2 * np.pi * 440 * t) + 0.01 * rng.standard_normal(len(t))
+    return (audio * 32767).astype(np.int16)
+
+def encode(pcm, sample_rate, output_format, quality=None, block_size=4096):
+    """Encode PCM in blocks into memory and return the bytes and stats."""
+    encoder = AudioEncoder(None, sample_rate, output_format, quality, frames=len(pcm))
+    chunks = []
+    for start in range(0, len(pcm), block_size):
+        encoder.write(pcm[start:start + block_size])
+        chunks.append(encoder.drain())
+    stats = encoder.close()
+    chunks.append(encoder.drain())
+    return b"".join(chunks), stats
+
+@pytest.mark.parametrize("output_format", ["flac", "ogg", "opus"])
+def test_drained_stream_decodes(output_format):
+    """Bytes drained block by block form a complete, decodable file."""
+    if output_format not in available_formats():
+        pytest.skip(f"libsndfile cannot encode {output_format}")
+    pcm = tone_pcm()
+    
+    data, stats = encode(pcm, 24000, output_format)
+    decoded, sample_rate = sf.read(io.BytesIO(data), dtype="int16")
+    
+    assert sample_rate == 24000
+    if output_format == "flac":
+        np.testing.assert_array_equal(decoded, pcm)
+    else:
+        assert abs(len(decoded) - len(pcm)) < 2000
+    assert stats["encoded_bytes"] == len(data)
+    assert stats["encoded_bytes"] < pcm.nbytes
+    assert stats["encode_seconds"] > 0
+
+def test_quality_trades_size():
+    """Lower Vorbis quality gives smaller files."""
+    pcm = tone_pcm()
+    
+    small, _ = encode(pcm, 24000, "ogg", quality=0.0)
+    large, _ = encode(pcm, 24000, "ogg", quality=1.0)
+    
+    assert len(small) < len(large)
+
+def test_output_checks():
+    """Unknown formats, Opus rates and out-of-range quality are rejected."""
+    check_output("flac", 22050, 0.5)
+    with pytest.raises(ValueError):
+        check_output("mp4", 22050)
+    with pytest.raises(ValueError):
+        check_output("opus", 22050)
+    with pytest.raises(ValueError):
+        check_output("ogg", 22050, 1.5)
+
+def test_generated_track_is_written_in_requested_format(tmp_path):
+    """generate_music writes the encoded track and reports its size."""
+    generator = TherapeuticMusicGenerator(output_dir=str(tmp_path))
+    
+    result = asyncio.run(generator.generate_music({"mood": "calm", "duration": 3, "format": "flac"}))
+    
+    path = tmp_path / result["file_path"]
+    assert result["file_path"].endswith(".flac")
+    encoding = result["metadata"]["encoding"]
+    assert encoding["format"] == "flac"
+    assert encoding["encoded_bytes"] == path.stat().st_size
+    info = sf.info(str(path))
+    assert info.samplerate == 22050
+    assert info.frames == 3 * 22050
+
+@pytest.mark.parametrize("output_format", ["wav", "flac"])
+def test_stored_seed_regenerates_the_track(tmp_path, output_format):
+    """The seed and parameters in the metadata give back the same bytes."""
+    generator = TherapeuticMusicGenerator(output_dir=str(tmp_path))
+    request = {"mood": "anxious", "duration": 3, "format": output_format,
+               "instruments": ["piano", "flute"]}
+    
+    result = asyncio.run(generator.generate_music(request))
+    artifact = result["metadata"]["artifact"]
+    assert artifact["stored"] == "file"
+    assert artifact["params"]["seed"] == result["metadata"]["seed"]
+    data, media_type = asyncio.run(generator.regenerate_music(artifact["params"]))
+    assert data == (tmp_path / result["file_path"]).read_bytes()
+    assert media_type == FORMATS[output_format][3]
+    
+    # Only the seed is kept: nothing is written, the bytes come back the same
+    seeded = asyncio.run(generator.generate_music({**request, "store": "seed", "fresh": True}))
+    assert not (tmp_path / seeded["file_path"]).exists()
+    assert seeded["metadata"]["artifact"]["stored"] == "seed"
+    data, _ = asyncio.run(generator.regenerate_music(seeded["metadata"]["artifact"]["params"]))
+    assert len(data) == seeded["metadata"]["encoding"]["encoded_bytes"]
+    
+    with pytest.raises(ValueError):
+        asyncio.run(generator.regenerate_music({"mood": "calm", "duration": 3}))
+
+@pytest.mark.parametrize("config", [
+    {}, {"inplace": True}, {"loop": True}, {"reduced_rate": True},
+    {"loop": True, "reduced_rate": True}, {"precision": "float32"}
+])
+def test_batch_tracks_regenerate_from_their_seeds(tmp_path, config):
+    """A track rendered in a batch gives back the same bytes on its own."""
+    generator = TherapeuticMusicGenerator(output_dir=str(tmp_path), **config)
+    requests = [
+        {"mood": "calm", "duration": 12, "instruments": ["piano"]},
+        {"mood": "calm", "duration": 12, "instruments": ["strings"]},
+        {"mood": "sad", "duration": 12, "instruments": ["flute", "strings"]},
+        {"mood": "peaceful", "duration": 3, "sampleRate": 16000, "format": "flac"},
+    ]
+    
+    results = asyncio.run(generator.generate_music_batch(requests))
+    
+    for result in results:
+        data, _ = asyncio.run(generator.regenerate_music(result["metadata"]["artifact"]["params"]))
+        assert data == (tmp_path / result["file_path"]).read_bytes()
+
+def test_unsupported_output_is_a_bad_request():
+    """Generation endpoints answer 400, not 500, to settings they reject."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import main
+    
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {os.getenv('AI_SERVICE_API_KEY', 'your-ai-service-api-key')}"}
+    for path, body in [
+        ("/music/generate", {"mood": "calm", "format": "mp3"}),
+        ("/music/generate", {"mood": "calm", "sampleRate": 4000}),
+        ("/music/generate/batch", {"requests": [{"mood": "calm", "quality": 2.0, "format": "ogg"}]}),
+        ("/music/generate", {"mood": "calm", "duration": 0}),
+        ("/music/stream", {"mood": "calm", "duration": -5}),
+        ("/music/generate/batch", {"requests": [{"mood": "calm", "duration": 3}, {"mood": "calm", "duration": 0}]}),
+    ]:
+        response = client.post(path, json=body, headers=headers)
+        assert response.status_code == 400, path
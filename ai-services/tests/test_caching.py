@@ -0,0 +1,104 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from art_generator import TherapeuticArtGenerator
+from caching import DiskCache, LRUCache, ResultCache
+from music_generator import TherapeuticMusicGenerator
+
+def test_lru_cache_evicts_least_recently_used():
+    """The entry limit evicts the least recently used key."""
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 0, "evictions": 1, "entries": 2, "bytes": 0}
+
+def test_lru_cache_bounds_bytes():
+    """The byte limit evicts old entries and skips oversized values."""
+    cache = LRUCache(max_entries=None, max_bytes=10, sizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    cache.put("c", "zzzz")
+    cache.put("huge", "w" * 11)
+    
+    assert "a" not in cache and "huge" not in cache
+    assert cache.bytes == 8
+    assert cache.get_or_create("d", lambda: "vv") == "vv"
+    assert cache.get("missing") is None
+    assert cache.stats()["misses"] == 2
+
+def test_disk_cache_evicts_oldest_files(tmp_path):
+    """The disk tier stays under its size limit, dropping stale entries first."""
+    cache = DiskCache(str(tmp_path), max_bytes=250)
+    for index in range(4):
+        cache.put(f"key{index}", {"payload": "x" * 80})
+        os.utime(tmp_path / f"key{index}.json", (index, index))
+    
+    assert cache.get("key0") is None
+    assert cache.get("key3") == {"payload": "x" * 80}
+    assert cache.bytes <= 250
+    assert cache.stats()["evictions"] >= 1
+
+def test_result_cache_promotes_disk_hits(tmp_path):
+    """A fresh process finds results on disk and promotes them to memory."""
+    key = ResultCache.key("music", {"mood": "calm", "duration": 120})
+    assert key == ResultCache.key("music", {"duration": 120, "mood": "calm"})
+    ResultCache(directory=str(tmp_path)).put(key, {"metadata": {"size": (2, 3)}})
+    
+    cache = ResultCache(directory=str(tmp_path))
+    first, first_tier = cache.get(key)
+    first["metadata"]["annotated"] = True
+    second, second_tier = cache.get(key)
+    
+    assert (first_tier, second_tier) == ("disk", "memory")
+    assert second == {"metadata": {"size": [2, 3]}}
+    assert cache.get("unknown") == (None, None)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+def test_generators_answer_repeat_requests_from_cache():
+    """Equivalent requests hit the cache unless they ask for fresh output."""
+    cache = ResultCache()
+    music = TherapeuticMusicGenerator(result_cache=cache)
+    art = TherapeuticArtGenerator(result_cache=cache)
+    request_data = {"mood": "sad", "duration": 2, "personalPreferences": {
+        "recentMoodHistory": [{"stress_level": 8, "anxiety_level": 3}]
+    }}
+    equivalent = {"mood": "sad", "duration": 2, "tempo": "medium", "personalPreferences": {
+        "recentMoodHistory": [{"stress_level": 9, "anxiety_level": 2}]
+    }}
+    
+    first = asyncio.run(music.generate_music(request_data))
+    repeat = asyncio.run(music.generate_music(equivalent))
+    fresh = asyncio.run(music.generate_music(dict(request_data, fresh=True)))
+    art_first = asyncio.run(art.generate_art({"mood": "calm", "artStyle": "geometric"}))
+    art_repeat = asyncio.run(art.generate_art({"mood": "calm", "artStyle": "geometric"}))
+    
+    assert first["metadata"]["cache"]["hit"] is False
+    assert repeat["metadata"]["cache"] == {"hit": True, "tier": "memory", "key": first["metadata"]["cache"]["key"]}
+    assert repeat["metadata"]["generated_at"] == first["metadata"]["generated_at"]
+    assert fresh["metadata"]["cache"]["hit"] is False
+    assert art_first["metadata"]["cache"]["key"] != first["metadata"]["cache"]["key"]
+    assert art_repeat["metadata"]["cache"]["hit"] is True
+    assert cache.stats()["hits"] == 2
+
+def test_art_cache_keys_differ_by_engine():
+    """Results of one rendering engine are never served for another's."""
+    cache = ResultCache()
+    request_data = {"mood": "calm", "artStyle": "geometric", "seed": 4}
+    keys = [
+        cache.key("art", TherapeuticArtGenerator(**config)._cache_params(request_data))
+        for config in [
+            {}, {"array_pipeline": True}, {"fused_effects": True}, {"bounded_layers": False},
+            {"array_pipeline": True, "tile_threads": 4}
+        ]
+    ]
+    # Bands render the same pixels as one thread
+    assert len(set(keys)) == 4 and keys[4] == keys[1]
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import os
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cold_start import DEFAULT_BUDGET, HERE, check_budget, parse_import_times, split_segments
+
+IMPORT_TIME_LINES = [
+    "import time: self [us] | cumulative | imported package",
+    "import time:       120 |        120 |     _json",
+    "import time:      1500 |       1620 |   json",
+    "import time:     30000 |     250000 | main",
+    "INFO:main:unrelated log line",
+]
+
+def test_parse_import_times():
+    """Cumulative microseconds become milliseconds; other lines are ignored."""
+    times = parse_import_times(IMPORT_TIME_LINES)
+    assert times == {"_json": 0.12, "json": 1.62, "main": 250.0}
+
+def test_segments_follow_markers():
+    """Imports are attributed to the phase whose marker precedes them."""
+    stderr = "\n".join([
+        IMPORT_TIME_LINES[3],
+        "cold-start: POST /music/generate",
+        "import time:       100 |      90000 | scipy",
+        "cold-start: warm",
+    ])
+    segments = split_segments(stderr)
+    assert parse_import_times(segments["import"]) == {"main": 250.0}
+    assert parse_import_times(segments["POST /music/generate"]) == {"scipy": 90.0}
+    assert segments["warm"] == []
+
+def test_budget_violations():
+    """Slow imports, a slow warm-up, slow or failed first hits and heavy modules are all reported."""
+    report = {
+        "modules": {"main": 2500.0, "music_generator": 20.0},
+        "ready_ms": 65000.0,
+        "first_hit": {"GET /health": 900.0},
+        "status": {"GET /health": 200, "POST /art/generate": 500},
+        "loaded": ["main", "numpy", "torch"],
+    }
+    violations = check_budget(report, DEFAULT_BUDGET)
+    assert violations == [
+        "import main: 2500 ms > 2000 ms",
+        "ready: 65000 ms > 60000 ms",
+        "first hit GET /health: 900 ms > 500 ms",
+        "first hit POST /art/generate: HTTP 500",
+        "import main loads heavy module torch",
+    ]
+    assert check_budget(dict(report, modules={}, ready_ms=0.0, first_hit={}, status={}, loaded=[]), DEFAULT_BUDGET) == []
+
+def test_server_import_skips_heavy_modules():
+    """Importing the server in a fresh interpreter loads none of the heavy modules."""
+    completed = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('\\n'.join(sys.modules))"],
+        cwd=HERE, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    loaded = set(completed.stdout.split())
+    assert loaded.isdisjoint(DEFAULT_BUDGET["heavy"])
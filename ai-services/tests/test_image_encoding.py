@@ -0,0 +1,161 @@
+import asyncio
+import io
+import threading
+import sys
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import art_generator
+from art_generator import TherapeuticArtGenerator
+from image_encoding import FORMATS, available_formats, check_output, encode_image, encode_outputs
+
+def gradient_image(width=640, height=480):
+    """A smooth image with some noise, as art renders look."""
+    y, x = np.mgrid[0:height, 0:width]
+    rng = np.random.default_rng(0)
+    pixels = np.dstack([x * 255 / width, y * 255 / height, (x + y) * 127 / (width + height)])
+    pixels += rng.normal(0, 4, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+def test_outputs_are_written_in_every_format_and_size(tmp_path):
+    """Full image and thumbnails decode, and their stats match the files."""
+    formats = [f for f in ("png", "webp", "jpeg") if f in available_formats()]
+    image = gradient_image()
+    encoding = encode_outputs(image, formats, "art/test", str(tmp_path), [512, 256, 1024, 64])
+    
+    outputs = encoding["outputs"]
+    # Thumbnails only narrower than the image, in the order asked for
+    assert [(o["size"], o["format"]) for o in outputs] == [
+        (size, f) for size in ("full", 512, 256, 64) for f in formats
+    ]
+    assert outputs[0]["file_path"] == "art/test.png"
+    for output in outputs:
+        path = tmp_path / output["file_path"]
+        assert path.stat().st_size == output["encoded_bytes"]
+        with Image.open(path) as decoded:
+            assert decoded.size == (output["width"], output["height"])
+            if output["format"] == "jpeg":
+                assert decoded.info.get("progressive")
+        assert output["encode_seconds"] >= 0
+    assert (outputs[-1]["width"], outputs[-1]["height"]) == (64, 48)
+    for f in formats:
+        assert encoding["formats"][f]["encoded_bytes"] == sum(
+            o["encoded_bytes"] for o in outputs if o["format"] == f
+        )
+    
+    # Files are never overwritten
+    with pytest.raises(FileExistsError):
+        encode_outputs(image, formats, "art/test", str(tmp_path), [])
+
+def test_settings_trade_size():
+    """Higher PNG compression and lower quality give smaller files."""
+    image = gradient_image()
+    fast = encode_image(image, "png", compress_level=0)
+    small = encode_image(image, "png", compress_level=9)
+    assert small["encoded_bytes"] < fast["encoded_bytes"]
+    
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    assert encode_image(image, "png")["encoded_bytes"] == buffer.tell()
+    low = encode_image(image, "jpeg", quality=30)
+    high = encode_image(image, "jpeg", quality=95)
+    assert low["encoded_bytes"] < high["encoded_bytes"]
+
+def test_check_output_rejects_bad_settings():
+    check_output(["png", "jpeg"], compress_level=9, quality=100, thumbnails=[128])
+    for kwargs in [
+        {"formats": []}, {"formats": ["gif"]},
+        {"formats": ["png"], "compress_level": 10},
+        {"formats": ["jpeg"], "quality": 0},
+        {"formats": ["png"], "thumbnails": [0]}
+    ]:
+        with pytest.raises(ValueError):
+            check_output(**kwargs)
+
+def test_unsupported_output_is_a_bad_request():
+    """Art endpoints answer 400, not 500 or a failing job, to settings they reject."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import main
+    
+    client = TestClient(main.app)
+    headers = {"Authorization": f"Bearer {os.getenv('AI_SERVICE_API_KEY', 'your-ai-service-api-key')}"}
+    for body in [
+        {"mood": "calm", "formats": ["gif"]},
+        {"mood": "calm", "compressLevel": 10},
+        {"mood": "calm", "formats": ["jpeg"], "imageQuality": 0},
+        {"mood": "calm", "thumbnails": [0]},
+        {"mood": "calm", "size": 9000},
+        {"mood": "calm", "quality": "poster"},
+    ]:
+        for path in ("/art/generate", "/art/jobs"):
+            response = client.post(path, json=body, headers=headers)
+            assert response.status_code == 400, (path, body)
+
+def test_art_is_encoded_off_the_event_loop(tmp_path, monkeypatch):
+    """Encoding runs on the encode threads; renders get their own paths."""
+    threads = []
+    encode = art_generator.encode_outputs
+    
+    def recording_encode(*args):
+        threads.append(threading.current_thread().name)
+        return encode(*args)
+    
+    monkeypatch.setattr(art_generator, "encode_outputs", recording_encode)
+    generator = TherapeuticArtGenerator(output_dir=str(tmp_path))
+    request = {"mood": "calm", "quality": "draft", "seed": 3, "formats": ["png", "jpeg"],
+               "thumbnails": [128], "imageQuality": 70}
+    
+    async def render_twice():
+        return await asyncio.gather(
+            generator.generate_art(request), generator.generate_art(request)
+        )
+    
+    first, second = asyncio.run(render_twice())
+    assert all(name.startswith("art-encode") for name in threads) and len(threads) == 2
+    assert first["file_path"] != second["file_path"]
+    
+    encoding = first["metadata"]["encoding"]
+    assert [(o["size"], o["format"]) for o in encoding["outputs"]] == [
+        ("full", "png"), ("full", "jpeg"), (128, "png"), (128, "jpeg")
+    ]
+    assert encoding["outputs"][1]["quality"] == 70
+    assert set(encoding["formats"]) == {"png", "jpeg"}
+    assert first["metadata"]["image_properties"]["format"] == "PNG"
+    for output in encoding["outputs"]:
+        assert (tmp_path / output["file_path"]).exists()
+    
+    with pytest.raises(ValueError):
+        asyncio.run(generator.generate_art({"mood": "calm", "formats": ["bmp"]}))
+
+def test_stored_seed_regenerates_every_output(tmp_path):
+    """Regenerated outputs are the bytes generate_art wrote, thumbnails too."""
+    generator = TherapeuticArtGenerator(output_dir=str(tmp_path))
+    request = {"mood": "anxious", "artStyle": "watercolor", "quality": "draft",
+               "formats": ["png", "jpeg"], "thumbnails": [256, 64]}
+    
+    result = asyncio.run(generator.generate_art(request))
+    seed = result["metadata"]["seed"]
+    params = result["metadata"]["artifact"]["params"]
+    assert params["seed"] == seed and result["metadata"]["artifact"]["stored"] == "file"
+    for output in result["metadata"]["encoding"]["outputs"]:
+        width = None if output["size"] == "full" else output["size"]
+        data, media_type = asyncio.run(generator.regenerate_art(params, output["format"], width))
+        assert data == (tmp_path / output["file_path"]).read_bytes()
+        assert media_type == FORMATS[output["format"]][3]
+    
+    # Only the seed is kept: nothing is written
+    seeded = asyncio.run(generator.generate_art({**request, "seed": seed, "store": "seed"}))
+    assert not list((tmp_path / "art").glob(f"{os.path.basename(seeded['file_path'])[:-4]}*"))
+    data, _ = asyncio.run(generator.regenerate_art(seeded["metadata"]["artifact"]["params"]))
+    assert data == (tmp_path / result["file_path"]).read_bytes()
+    
+    for params, width in [({"mood": "calm"}, None), (params, 100)]:
+        with pytest.raises(ValueError):
+            asyncio.run(generator.regenerate_art(params, width=width))
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import os
+import time
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import JobManager
+from music_generator import TherapeuticMusicGenerator
+
+def test_job_reports_stage_progress_and_result():
+    """Jobs publish stage progress and end with the result of their run."""
+    manager = JobManager()
+    
+    async def generate(progress):
+        progress("composition", 0.5)
+        await asyncio.sleep(0)
+        progress("composition", 1.0)
+        progress("encode", 1.0)
+        return {"file_path": "track.wav"}
+    
+    async def run():
+        job = manager.submit("music", ("composition", "encode"), generate)
+        assert job.status == "queued"
+        events = [event async for event in job.events()]
+        return job, events
+    
+    job, events = asyncio.run(run())
+    assert job.status == "completed"
+    assert job.snapshot()["result"] == {"file_path": "track.wav"}
+    assert job.progress == 1.0
+    assert events[0].startswith("event: progress")
+    assert events[-1].startswith("event: completed")
+    assert '"progress": 0.25' in events[1]
+
+def test_failed_job_keeps_error():
+    """A run that raises marks its job failed with the error message."""
+    manager = JobManager()
+    
+    async def generate(progress):
+        raise ValueError("no such mood")
+    
+    async def run():
+        job = manager.submit("art", ("composition",), generate)
+        events = [event async for event in job.events()]
+        return job, events
+    
+    job, events = asyncio.run(run())
+    assert job.status == "failed"
+    assert job.error == "no such mood"
+    assert events[-1].startswith("event: failed")
+
+def test_job_limit_and_retention():
+    """Finished jobs expire after the retention period, freeing slots."""
+    manager = JobManager(max_jobs=1, retention=0.0)
+    
+    async def generate(progress):
+        return {}
+    
+    async def run():
+        first = manager.submit("music", ("encode",), generate)
+        with pytest.raises(RuntimeError):
+            manager.submit("music", ("encode",), generate)
+        await first._task
+        time.sleep(0.01)
+        second = manager.submit("music", ("encode",), generate)
+        await second._task
+        return first, second
+    
+    first, second = asyncio.run(run())
+    assert manager.get(first.id) is None
+    assert manager.get(second.id) is second
+
+def test_music_generation_reports_every_stage():
+    """Streaming renders report composition, effects, binaural and encode."""
+    generator = TherapeuticMusicGenerator()
+    reports = []
+    
+    asyncio.run(generator.generate_music(
+        {"mood": "anxious", "duration": 2, "fresh": True},
+        lambda stage, fraction: reports.append((stage, fraction))
+    ))
+    
+    stages = {stage for stage, _ in reports}
+    assert stages == {"composition", "effects", "binaural", "encode"}
+    assert ("encode", 1.0) in reports
@@ -1,56 +1,56 @@
-import pytest
-import sys
-import os
-
-# Add the parent directory to the path so we can import our modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from art_generator import TherapeuticArtGenerator
-from music_generator import TherapeuticMusicGenerator
-
-def test_art_generator_initialization():
-    """Test that TherapeuticArtGenerator can be initialized."""
-    try:
-        generator = TherapeuticArtGenerator()
-        assert generator is not None
-        print("✅ TherapeuticArtGenerator initialization test passed")
-    except Exception as e:
-        print(f"❌ TherapeuticArtGenerator initialization failed: {e}")
-        # Don't fail the test if dependencies are missing in CI
-        pytest.skip(f"Skipping due to missing dependencies: {e}")
-
-def test_music_generator_initialization():
-    """Test that TherapeuticMusicGenerator can be initialized."""
-    try:
-        generator = TherapeuticMusicGenerator()
-        assert generator is not None
-        print("✅ TherapeuticMusicGenerator initialization test passed")
-    except Exception as e:
-        print(f"❌ TherapeuticMusicGenerator initialization failed: {e}")
-        # Don't fail the test if dependencies are missing in CI
-        pytest.skip(f"Skipping due to missing dependencies: {e}")
-
-def test_imports():
-    """Test that all required modules can be imported."""
-    try:
-        import torch
-        import transformers
-        import numpy as np
-        import PIL
-        print("✅ All imports successful")
-    except ImportError as e:
-        print(f"❌ Import failed: {e}")
-        pytest.skip(f"Skipping due to missing dependencies: {e}")
-
-def test_basic_functionality():
-    """Test basic functionality without heavy dependencies."""
-    # Test that we can import our modules
-    try:
-        import art_generator
-        import music_generator
-        assert hasattr(art_generator, 'TherapeuticArtGenerator')
-        assert hasattr(music_generator, 'TherapeuticMusicGenerator')
-        print("✅ Basic functionality test passed")
-    except Exception as e:
-        print(f"❌ Basic functionality test failed: {e}")
-        assert False, f"Basic functionality test failed: {e}"
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from art_generator import TherapeuticArtGenerator
+from music_generator import TherapeuticMusicGenerator
+
+def test_art_generator_initialization():
+    """Test that TherapeuticArtGenerator can be initialized."""
+    try:
+        generator = TherapeuticArtGenerator()
+        assert generator is not None
+        print("✅ TherapeuticArtGenerator initialization test passed")
+    except Exception as e:
+        print(f"❌ TherapeuticArtGenerator initialization failed: {e}")
+        # Don't fail the test if dependencies are missing in CI
+        pytest.skip(f"Skipping due to missing dependencies: {e}")
+
+def test_music_generator_initialization():
+    """Test that TherapeuticMusicGenerator can be initialized."""
+    try:
+        generator = TherapeuticMusicGenerator()
+        assert generator is not None
+        print("✅ TherapeuticMusicGenerator initialization test passed")
+    except Exception as e:
+        print(f"❌ TherapeuticMusicGenerator initialization failed: {e}")
+        # Don't fail the test if dependencies are missing in CI
+        pytest.skip(f"Skipping due to missing dependencies: {e}")
+
+def test_imports():
+    """Test that all required modules can be imported."""
+    try:
+        import torch
+        import transformers
+        import numpy as np
+        import PIL
+        print("✅ All imports successful")
+    except ImportError as e:
+        print(f"❌ Import failed: {e}")
+        pytest.skip(f"Skipping due to missing dependencies: {e}")
+
+def test_basic_functionality():
+    """Test basic functionality without heavy dependencies."""
+    # Test that we can import our modules
+    try:
+        import art_generator
+        import music_generator
+        assert hasattr(art_generator, 'TherapeuticArtGenerator')
+        assert hasattr(music_generator, 'TherapeuticMusicGenerator')
+        print("✅ Basic functionality test passed")
+    except Exception as e:
+        print(f"❌ Basic functionality test failed: {e}")
+        assert False, f"Basic functionality test failed: {e}"
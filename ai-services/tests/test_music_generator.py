@@ -0,0 +1,622 @@
+import asyncio
+import sys
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from buffer_pool import AudioBufferPool
+from caching import LRUCache
+from music_generator import TherapeuticMusicGenerator
+from oscillators import PhasorBank
+from stems import build_stem_library, open_stem_library
+
+STRESSED_HISTORY = [{"stress_level": 8, "anxiety_level": 9}]
+
+def render_reference(generator, request_data):
+    """Run the full-length composition, effects and binaural stages."""
+    mood = request_data.get("mood", "calm")
+    history = request_data.get("personalPreferences", {}).get("recentMoodHistory", [])
+    
+    async def run():
+        audio = await generator._create_base_composition(
+            mood, "ambient", request_data["duration"], "medium",
+            request_data.get("instruments", ["piano"]),
+            np.random.default_rng(request_data.get("seed"))
+        )
+        audio = await generator._apply_therapeutic_effects(audio, mood, history)
+        if generator._should_add_binaural_beats(mood):
+            audio = await generator._add_binaural_beats(audio, mood)
+        return audio
+    
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("anxious", ["strings"]),
+    ("energetic", []),
+])
+def test_stream_matches_full_render(mood, instruments):
+    """Concatenated stream blocks match the full-length render."""
+    generator = TherapeuticMusicGenerator()
+    request_data = {
+        "mood": mood,
+        "duration": 3,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 7,
+    }
+    
+    reference = render_reference(generator, request_data)
+    blocks = list(generator.stream_music(request_data, block_size=5000))
+    
+    assert all(len(block) == 5000 for block in blocks[:-1])
+    streamed = np.concatenate(blocks)
+    assert streamed.shape == reference.shape
+    np.testing.assert_allclose(streamed, reference, atol=1e-9)
+
+def test_stream_peak_memory_is_flat():
+    """Peak memory while streaming does not grow with the duration."""
+    generator = TherapeuticMusicGenerator()
+    
+    def peak_bytes(duration):
+        tracemalloc.start()
+        for _ in generator.stream_music({"mood": "sad", "duration": duration}):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+    
+    short_peak = peak_bytes(10)
+    long_peak = peak_bytes(200)
+    assert long_peak < short_peak * 1.5
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("energetic", ["strings"]),
+])
+def test_inplace_render_matches_reference(mood, instruments):
+    """The in-place renderer matches the reference pipeline."""
+    request_data = {
+        "mood": mood,
+        "duration": 2,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 3,
+    }
+    
+    reference = render_reference(TherapeuticMusicGenerator(), request_data)
+    
+    generator = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(4096))
+    plan = generator._plan_render(request_data)
+    audio, _, peak = generator._render_track_inplace(plan, generator.buffer_pool)
+    
+    np.testing.assert_allclose(audio, reference, atol=1e-9)
+    assert peak == pytest.approx(np.max(np.abs(reference)))
+
+def test_inplace_requests_reuse_pool_buffers():
+    """Repeat requests allocate nothing once the pool is warm."""
+    generator = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(4096))
+    request_data = {"mood": "anxious", "duration": 3, "instruments": ["strings", "flute"]}
+    
+    first = asyncio.run(generator.generate_music(request_data))
+    second = asyncio.run(generator.generate_music(request_data))
+    
+    assert first["metadata"]["buffer_pool"]["allocations"] > 0
+    assert second["metadata"]["buffer_pool"]["allocations"] == 0
+    assert second["metadata"]["buffer_pool"]["bytes_allocated"] == 0
+
+def test_pool_keeps_no_oversized_track_buffer():
+    """Tracks over the cap get a buffer of their own, which the pool drops."""
+    pool = AudioBufferPool(1024, max_track_samples=10000)
+    short = pool.track(8000)
+    assert pool.track(6000).base is short.base
+    held = pool.capacity_bytes
+    
+    pool.begin_request()
+    long = pool.track(50000)
+    assert len(long) == 50000 and long.base is not short.base
+    assert pool.request_stats()["bytes_allocated"] == long.nbytes
+    assert pool.capacity_bytes == held
+    assert pool.track(8000).base is short.base
+
+def test_inplace_stream_matches_block_stream():
+    """In-place streaming yields the same blocks as the allocating stream."""
+    request_data = {"mood": "sad", "duration": 2, "instruments": ["piano", "strings"], "seed": 11}
+    
+    expected = np.concatenate(list(TherapeuticMusicGenerator().stream_music(request_data, 4096)))
+    generator = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(4096))
+    streamed = np.concatenate([block.copy() for block in generator.stream_music(request_data)])
+    
+    np.testing.assert_allclose(streamed, expected, atol=1e-9)
+
+def test_streams_reuse_a_pool_of_their_own():
+    """In-place streams reuse one pool and leave the shared pool's block size."""
+    generator = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(8192))
+    request_data = {"mood": "calm", "duration": 2}
+    
+    list(generator.stream_music(request_data, block_size=4096))
+    pool, = generator._stream_pools
+    allocations = pool.allocations
+    collect_stream(generator.stream_audio(request_data, block_size=4096))
+    
+    assert generator._stream_pools == [pool]
+    assert pool.allocations == allocations
+    assert generator.buffer_pool.block_size == 8192
+
+def test_float32_render_matches_float64_reference():
+    """float32 rendering stays within one 16-bit LSB of the float64 reference."""
+    request_data = {
+        "mood": "anxious",
+        "duration": 60,
+        "instruments": ["strings", "piano"],
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 5,
+    }
+    
+    reference = render_reference(TherapeuticMusicGenerator(), request_data)
+    reference /= np.max(np.abs(reference))
+    
+    generator = TherapeuticMusicGenerator(precision="float32")
+    plan = generator._plan_render(request_data)
+    audio, _, peak = generator._render_track_inplace(plan, generator._get_buffer_pool())
+    assert audio.dtype == np.float32
+    
+    error = audio / peak - reference
+    snr_db = 10 * np.log10(np.sum(reference ** 2) / np.sum(error ** 2))
+    assert np.max(np.abs(error)) < 1 / 32768
+    assert snr_db > 96
+
+def test_quantize_pcm16_dithers_within_one_lsb():
+    """Quantization normalizes to int16 full scale with at most 1 LSB of dither."""
+    generator = TherapeuticMusicGenerator(precision="float32")
+    audio = (np.sin(np.linspace(0, 200, 50000)) * 0.25).astype(np.float32)
+    
+    pcm = generator._quantize_pcm16(audio, float(np.max(np.abs(audio))))
+    
+    assert pcm.dtype == np.int16
+    expected = audio / np.max(np.abs(audio)) * 32766
+    assert np.max(np.abs(pcm - expected)) <= 1.5
+    assert np.max(np.abs(pcm)) <= 32767
+
+def test_float32_generation_reports_precision():
+    """Music metadata reports the render precision."""
+    generator = TherapeuticMusicGenerator(precision="float32")
+    result = asyncio.run(generator.generate_music({"mood": "calm", "duration": 2}))
+    
+    assert generator.inplace
+    assert result["metadata"]["audio_properties"]["render_precision"] == "float32"
+    with pytest.raises(ValueError):
+        TherapeuticMusicGenerator(precision="float16")
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("anxious", ["strings"]),
+    ("energetic", []),
+])
+def test_phasor_bank_matches_reference(mood, instruments):
+    """The phasor oscillator bank matches the np.sin reference within 1e-9."""
+    request_data = {
+        "mood": mood,
+        "duration": 3,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 13,
+    }
+    
+    reference = render_reference(TherapeuticMusicGenerator(), request_data)
+    
+    generator = TherapeuticMusicGenerator(oscillator="phasor", buffer_pool=AudioBufferPool(4096))
+    plan = generator._plan_render(request_data)
+    audio = generator._render_track_inplace(plan, generator.buffer_pool)[0]
+    
+    np.testing.assert_allclose(audio, reference, atol=1e-9)
+
+def test_phasor_bank_renders_arbitrary_spans():
+    """PhasorBank sums partials exactly for partial rows and large offsets."""
+    bank = PhasorBank([220.0, 330.0], [0.8, 0.4], 1 / 22050, [0.5, 1.5], span=256)
+    start, length = 10**7 + 3, 1000
+    sin_out, cos_out = np.empty(length), np.empty(length)
+    
+    bank.render(start, length, sin_out, cos_out)
+    
+    t = (start + np.arange(length)) / 22050
+    theta = [2 * np.pi * 220.0 * t + 0.5, 2 * np.pi * 330.0 * t + 1.5]
+    np.testing.assert_allclose(sin_out, 0.8 * np.sin(theta[0]) + 0.4 * np.sin(theta[1]), atol=1e-9)
+    np.testing.assert_allclose(cos_out, 0.8 * np.cos(theta[0]) + 0.4 * np.cos(theta[1]), atol=1e-9)
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("anxious", ["strings"]),
+])
+def test_reduced_rate_render_matches_full_rate(mood, instruments):
+    """Reduced-rate synthesis plus upsampling stays within one 16-bit LSB."""
+    request_data = {
+        "mood": mood,
+        "duration": 5,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 17,
+    }
+    
+    reference = render_reference(TherapeuticMusicGenerator(), request_data)
+    
+    generator = TherapeuticMusicGenerator(reduced_rate=True, buffer_pool=AudioBufferPool(4096))
+    plan = generator._plan_render(request_data, reduce_rate=True)
+    audio, _, peak = generator._render_track_inplace(plan, generator.buffer_pool)
+    
+    assert plan["render_rate"] <= generator.sample_rate // 4
+    error = audio - reference
+    snr_db = 10 * np.log10(np.sum(reference ** 2) / np.sum(error ** 2))
+    assert np.max(np.abs(error)) / peak < 1 / 32768
+    assert snr_db > 96
+
+def test_flute_noise_renders_at_full_rate():
+    """Broadband breath noise disables the reduced render rate."""
+    generator = TherapeuticMusicGenerator(reduced_rate=True)
+    plan = generator._plan_render({"mood": "calm", "duration": 1, "instruments": ["flute"]}, True)
+    
+    assert plan["render_rate"] == generator.sample_rate
+
+def test_delivery_rate_is_selectable_per_request():
+    """sampleRate sets the delivered length and metadata on every path."""
+    request_data = {"mood": "sad", "duration": 2, "sampleRate": 44100}
+    
+    for generator in [TherapeuticMusicGenerator(), TherapeuticMusicGenerator(reduced_rate=True)]:
+        result = asyncio.run(generator.generate_music(request_data))
+        properties = result["metadata"]["audio_properties"]
+        assert properties["sample_rate"] == 44100
+        assert properties["render_sample_rate"] <= 22050
+    
+    plan = TherapeuticMusicGenerator(reduced_rate=True)._plan_render(request_data, True)
+    assert plan["num_samples"] == 88200
+    assert 44100 % plan["render_rate"] == 0
+    with pytest.raises(ValueError):
+        TherapeuticMusicGenerator()._plan_render({"sampleRate": 1000})
+
+def test_durations_out_of_range_are_rejected():
+    """Empty, negative and overlong tracks are refused before rendering."""
+    generator = TherapeuticMusicGenerator()
+    for duration in [0, -5, generator.MAX_DURATION + 1]:
+        request_data = {"mood": "calm", "duration": duration}
+        with pytest.raises(ValueError, match="duration"):
+            asyncio.run(generator.generate_music(request_data))
+        with pytest.raises(ValueError, match="duration"):
+            asyncio.run(generator.generate_music_batch([{"mood": "calm"}, request_data]))
+        with pytest.raises(ValueError, match="duration"):
+            generator.stream_audio(request_data)
+        with pytest.raises(ValueError, match="duration"):
+            TherapeuticMusicGenerator(inplace=True)._plan_render(request_data)
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("energetic", []),
+])
+def test_compiled_effect_curves_match_reference(mood, instruments):
+    """Cached effect curves reproduce the reference chain on repeat requests."""
+    request_data = {
+        "mood": mood,
+        "duration": 2,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 19,
+    }
+    
+    reference = render_reference(TherapeuticMusicGenerator(), request_data)
+    
+    cache = LRUCache(max_entries=4)
+    generator = TherapeuticMusicGenerator(
+        compiled_effects=True, effect_cache=cache, buffer_pool=AudioBufferPool(4096)
+    )
+    for _ in range(2):
+        plan = generator._plan_render(request_data)
+        audio = generator._render_track_inplace(plan, generator.buffer_pool)[0]
+        np.testing.assert_allclose(audio, reference, atol=1e-9)
+    
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+def test_compiled_effect_curves_keep_noise_draws():
+    """Breath noise stays per request and matches the per-operation path."""
+    request_data = {
+        "mood": "sad", "duration": 2, "instruments": ["flute", "strings", "piano"], "seed": 23
+    }
+    
+    generator = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(4096))
+    expected, expected_range, _ = generator._render_track_inplace(
+        generator._plan_render(request_data), generator.buffer_pool
+    )
+    expected = expected.copy()
+    
+    compiled = TherapeuticMusicGenerator(
+        compiled_effects=True, effect_cache=LRUCache(), buffer_pool=AudioBufferPool(4096)
+    )
+    audio, dynamic_range, _ = compiled._render_track_inplace(
+        compiled._plan_render(request_data), compiled.buffer_pool
+    )
+    
+    np.testing.assert_allclose(audio, expected, atol=1e-12)
+    assert dynamic_range == pytest.approx(expected_range)
+
+def test_batch_rows_match_single_track_renders():
+    """Each batch row matches the same plan rendered on its own."""
+    requests = [
+        {"mood": "calm", "duration": 2, "instruments": ["piano"], "seed": 29},
+        {"mood": "sad", "duration": 2, "instruments": ["flute", "strings", "piano"], "seed": 30},
+        {"mood": "calm", "duration": 2, "instruments": ["piano"], "seed": 31,
+         "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY}},
+        {"mood": "energetic", "duration": 2, "instruments": [], "seed": 32},
+        {"mood": "calm", "duration": 2, "instruments": ["piano"], "seed": 33},
+    ]
+    generator = TherapeuticMusicGenerator(
+        compiled_effects=True, effect_cache=LRUCache(), buffer_pool=AudioBufferPool(4096)
+    )
+    
+    plans = [generator._plan_render(request) for request in requests]
+    order = sorted(range(len(plans)), key=lambda i: generator._chain_key(plans[i]))
+    tracks, dynamic_ranges, peaks = generator._render_batch_rows(
+        [plans[i] for i in order], generator.buffer_pool
+    )
+    
+    singles = [generator._plan_render(request) for request in requests]
+    for row, i in enumerate(order):
+        expected, expected_range, expected_peak = generator._render_track_inplace(
+            singles[i], generator.buffer_pool
+        )
+        np.testing.assert_allclose(tracks[row], expected, atol=1e-9)
+        assert dynamic_ranges[row] == pytest.approx(expected_range)
+        assert peaks[row] == pytest.approx(expected_peak)
+
+def test_batch_generation_keeps_request_order():
+    """Batch results come back in request order, one per request."""
+    generator = TherapeuticMusicGenerator()
+    requests = [
+        {"mood": "happy", "duration": 2},
+        {"mood": "anxious", "duration": 1, "sampleRate": 16000},
+        {"mood": "happy", "duration": 2, "instruments": ["strings"]},
+    ]
+    
+    results = asyncio.run(generator.generate_music_batch(requests))
+    
+    assert [result["metadata"]["mood"] for result in results] == ["happy", "anxious", "happy"]
+    assert results[1]["metadata"]["audio_properties"]["sample_rate"] == 16000
+    assert results[0]["metadata"]["batch"] == {"size": 3, "rows": 2}
+    assert results[1]["metadata"]["batch"] == {"size": 3, "rows": 1}
+    
+    with pytest.raises(ValueError):
+        asyncio.run(generator.generate_music_batch(
+            [{"mood": "calm"}] * (generator.MAX_BATCH_SIZE + 1)
+        ))
+
+def test_batch_renders_loops_as_single_tracks():
+    """Looped tracks in a batch are the tracks rendered on their own."""
+    generator = TherapeuticMusicGenerator(loop=True, buffer_pool=AudioBufferPool(4096))
+    requests = [
+        {"mood": "peaceful", "duration": 12, "instruments": ["strings"], "seed": 41},
+        {"mood": "peaceful", "duration": 3, "instruments": ["strings"], "seed": 42},
+        {"mood": "sad", "duration": 12, "instruments": ["piano", "flute"], "seed": 43,
+         "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY}},
+    ]
+    
+    batch = asyncio.run(generator._render_batch_pcm(requests))
+    
+    for request, (pcm, render_info) in zip(requests, batch):
+        single, single_info = asyncio.run(generator._render_pcm(request))
+        np.testing.assert_array_equal(pcm, single)
+        assert render_info.get("loop") == single_info.get("loop")
+    assert "loop" in batch[0][1] and "loop" not in batch[1][1]
+
+def test_loop_wraps_without_a_click():
+    """The rendered loops repeat with no jump larger than a normal step."""
+    generator = TherapeuticMusicGenerator(loop=True)
+    plan = generator._plan_render({
+        "mood": "peaceful", "duration": 30, "instruments": ["strings"],
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+    })
+    
+    assert len(plan["loop"]) == generator.LOOP_SECONDS * generator.sample_rate
+    loops = [plan["loop"]] + [op[1] for op in plan["instrument_ops"] + plan["effect_ops"]
+                              if op[0].endswith("_loop")]
+    assert len(loops) == 3
+    for loop in loops:
+        assert abs(loop[0] - loop[-1]) <= np.max(np.abs(np.diff(loop)))
+
+@pytest.mark.parametrize("mood,instruments", [
+    ("calm", ["piano"]),
+    ("sad", ["strings", "piano"]),
+    ("energetic", ["flute"]),
+])
+def test_loop_render_follows_full_render(mood, instruments):
+    """Looped tracks keep the full render's loudness contour second by second."""
+    request_data = {
+        "mood": mood,
+        "duration": 25,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+        "seed": 31,
+    }
+    full = TherapeuticMusicGenerator(inplace=True, buffer_pool=AudioBufferPool(4096))
+    looped = TherapeuticMusicGenerator(loop=True, buffer_pool=AudioBufferPool(4096))
+    
+    expected = full._render_track_inplace(full._plan_render(request_data), full.buffer_pool)[0].copy()
+    audio = looped._render_track_inplace(looped._plan_render(request_data), looped.buffer_pool)[0]
+    
+    expected_rms = np.sqrt(np.mean(expected.reshape(25, -1) ** 2, axis=1))
+    rms = np.sqrt(np.mean(audio.reshape(25, -1) ** 2, axis=1))
+    np.testing.assert_allclose(rms, expected_rms, rtol=0.01)
+
+def test_loop_length_does_not_grow_with_duration():
+    """Only the loop is synthesized, whatever the requested duration."""
+    generator = TherapeuticMusicGenerator(loop=True)
+    
+    short = generator._plan_render({"mood": "anxious", "duration": 60})
+    long = generator._plan_render({"mood": "anxious", "duration": 600})
+    brief = generator._plan_render({"mood": "anxious", "duration": 5})
+    
+    assert len(short["loop"]) == len(long["loop"])
+    assert "loop" not in brief
+    result = asyncio.run(generator.generate_music({"mood": "anxious", "duration": 30}))
+    assert result["metadata"]["loop"] == {"seconds": 10, "samples": 220500}
+
+@pytest.fixture(scope="module")
+def stem_dir(tmp_path_factory):
+    """Stem library built once for the stem tests."""
+    directory = str(tmp_path_factory.mktemp("stems"))
+    build_stem_library(directory)
+    return directory
+
+def test_stem_library_is_mapped_read_only(stem_dir):
+    """Stems are unit-peak loops mapped from disk, shared per process."""
+    library = open_stem_library(stem_dir)
+    samples, gain = library.get("harmonics/calm/strings@22050")
+    
+    assert isinstance(samples, np.memmap) and not samples.flags.writeable
+    assert len(samples) == TherapeuticMusicGenerator.LOOP_SECONDS * 22050
+    assert np.max(np.abs(samples)) == pytest.approx(1.0)
+    assert gain > 1.0
+    assert "sine/5@22050" in library and "sine/40@22050" in library
+    assert open_stem_library(stem_dir) is library
+
+@pytest.mark.parametrize("mood,instruments,treatment", [
+    ("calm", ["piano"], "plain"),
+    ("sad", ["strings", "piano"], "strings"),
+    ("energetic", ["flute", "strings"], "plain"),
+])
+def test_stem_render_follows_synthesized_loop(stem_dir, mood, instruments, treatment):
+    """Tracks mixed from stems keep the synthesized loop's loudness contour."""
+    request_data = {
+        "mood": mood,
+        "duration": 25,
+        "instruments": instruments,
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+    }
+    looped = TherapeuticMusicGenerator(loop=True, buffer_pool=AudioBufferPool(4096))
+    stemmed = TherapeuticMusicGenerator(stem_dir=stem_dir, buffer_pool=AudioBufferPool(4096))
+    
+    expected = looped._render_track_inplace(looped._plan_render(request_data), looped.buffer_pool)[0].copy()
+    plan = stemmed._plan_render(request_data)
+    audio = stemmed._render_track_inplace(plan, stemmed.buffer_pool)[0]
+    
+    assert plan["stem_treatment"] == treatment
+    # Vibrato is only rendered separately when the stem cannot carry it
+    vibrato = any(op[0] == "vibrato_loop" for op in plan["instrument_ops"])
+    assert vibrato == ("strings" in instruments and treatment == "plain")
+    expected_rms = np.sqrt(np.mean(expected.reshape(25, -1) ** 2, axis=1))
+    rms = np.sqrt(np.mean(audio.reshape(25, -1) ** 2, axis=1))
+    np.testing.assert_allclose(rms, expected_rms, rtol=0.01)
+
+def test_stems_fall_back_to_synthesis(stem_dir):
+    """Rates and moods missing from the library are synthesized as before."""
+    generator = TherapeuticMusicGenerator(stem_dir=stem_dir)
+    
+    assert "stem_treatment" not in generator._plan_render({"mood": "calm", "sampleRate": 44100})
+    assert "stem_treatment" not in generator._plan_render({"mood": "unknown"})
+    result = asyncio.run(generator.generate_music({"mood": "happy", "duration": 5}))
+    assert result["metadata"]["stems"]["version"] == generator.stems.version
+    assert 0 <= result["metadata"]["stems"]["offset_seconds"] < generator.LOOP_SECONDS
+
+def test_batch_mixes_stems_as_single_tracks(stem_dir):
+    """Batched tracks mixed from stems are the tracks rendered on their own."""
+    generator = TherapeuticMusicGenerator(stem_dir=stem_dir, buffer_pool=AudioBufferPool(4096))
+    requests = [
+        {"mood": "sad", "duration": 5, "instruments": ["strings", "piano"], "seed": 51},
+        {"mood": "calm", "duration": 5, "sampleRate": 44100, "seed": 52},
+        {"mood": "energetic", "duration": 5, "instruments": ["flute", "strings"], "seed": 53},
+    ]
+    
+    batch = asyncio.run(generator._render_batch_pcm(requests))
+    
+    for request, (pcm, render_info) in zip(requests, batch):
+        single, single_info = asyncio.run(generator._render_pcm(request))
+        np.testing.assert_array_equal(pcm, single)
+        assert render_info.get("stems") == single_info.get("stems")
+    assert "stems" in batch[0][1] and "stems" not in batch[1][1]
+
+def collect_stream(chunks, limit=None):
+    """Read an async byte stream, closing it after limit chunks."""
+    async def run():
+        received = []
+        async for chunk in chunks:
+            received.append(chunk)
+            if limit is not None and len(received) == limit:
+                break
+        await chunks.aclose()
+        return received
+    
+    return asyncio.run(run())
+
+def test_audio_stream_is_a_complete_wav():
+    """Streamed WAV bytes decode to the streamed blocks at the bound's scale."""
+    import io
+    import wave
+    
+    generator = TherapeuticMusicGenerator()
+    request_data = {"mood": "sad", "duration": 2, "instruments": ["strings", "piano"], "seed": 37}
+    
+    chunks = collect_stream(generator.stream_audio(request_data, block_size=4096))
+    expected = np.concatenate(list(generator.stream_music(request_data, block_size=4096)))
+    bound = generator._peak_bound(generator._plan_render(request_data))
+    
+    with wave.open(io.BytesIO(b"".join(chunks))) as wav:
+        assert wav.getframerate() == 22050
+        assert wav.getnframes() == len(expected)
+        pcm = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    np.testing.assert_allclose(pcm, expected * 32766 / bound, atol=1.5)
+
+@pytest.mark.parametrize("mood", ["calm", "peaceful", "sad", "anxious", "happy", "energetic"])
+def test_peak_bound_covers_the_track(mood):
+    """The streaming normalization bound is never below the real peak."""
+    generator = TherapeuticMusicGenerator(inplace=True)
+    request_data = {
+        "mood": mood,
+        "duration": 3,
+        "instruments": ["strings", "piano"],
+        "personalPreferences": {"recentMoodHistory": STRESSED_HISTORY},
+    }
+    
+    plan = generator._plan_render(request_data)
+    peak = generator._render_track_inplace(plan, generator._get_buffer_pool())[2]
+    assert peak <= generator._peak_bound(plan)
+
+def test_closed_audio_stream_stops_rendering():
+    """Closing a stream early releases its render thread."""
+    import threading
+    
+    generator = TherapeuticMusicGenerator(inplace=True)
+    threads = threading.active_count()
+    
+    chunks = collect_stream(
+        generator.stream_audio({"mood": "calm", "duration": 600}, container="pcm"), limit=2
+    )
+    
+    assert len(chunks[0]) == 2 * generator.block_size
+    for _ in range(100):
+        if threading.active_count() == threads:
+            break
+        time.sleep(0.01)
+    assert threading.active_count() == threads
+    with pytest.raises(ValueError):
+        generator.stream_audio({"mood": "calm"}, container="mp3")
+
+def test_audio_stream_encodes_flac_on_the_fly():
+    """Streamed FLAC decodes to the whole track, length included."""
+    import io
+    import soundfile as sf
+    
+    generator = TherapeuticMusicGenerator()
+    chunks = collect_stream(generator.stream_audio({"mood": "happy", "duration": 2}, container="flac"))
+    
+    assert len(chunks) > 1
+    audio, sample_rate = sf.read(io.BytesIO(b"".join(chunks)), dtype="int16")
+    assert sample_rate == 22050
+    assert len(audio) == 2 * 22050
@@ -0,0 +1,98 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from warmup import Warmup
+
+def test_warmup_reports_progress_and_failures():
+    """Readiness follows task completion; failures are listed, not fatal."""
+    async def ok():
+        await asyncio.sleep(0)
+    
+    async def broken():
+        raise RuntimeError("no stems")
+    
+    warmup = Warmup([("music:calm", ok), ("art:abstract", broken), ("music:batch", ok)])
+    status = warmup.status()
+    assert not status["ready"] and status["state"] == "pending"
+    assert (status["completed"], status["total"], status["progress"]) == (0, 3, 0.0)
+    
+    asyncio.run(warmup.run())
+    status = warmup.status()
+    assert status["ready"] and status["state"] == "completed"
+    assert (status["completed"], status["progress"], status["running"]) == (3, 1.0, [])
+    assert status["errors"] == [{"task": "art:abstract", "error": "no stems"}]
+    assert status["elapsed_seconds"] >= 0
+
+def test_warmup_bounds_concurrency():
+    """No more than ``concurrency`` tasks run at once."""
+    active = []
+    peak = []
+    
+    async def task():
+        active.append(None)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+    
+    warmup = Warmup([(f"task:{i}", task) for i in range(7)], concurrency=3)
+    asyncio.run(warmup.run())
+    assert max(peak) == 3
+    assert warmup.completed == 7
+
+def test_disabled_warmup_is_ready():
+    """Without tasks the instance is ready straight away."""
+    status = Warmup([]).status()
+    assert status["ready"] and status["state"] == "disabled" and status["progress"] == 1.0
+
+def test_ready_endpoint_follows_warmup(monkeypatch):
+    """/ready answers 503 until warm-up has finished, while /health stays up."""
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import main
+    
+    async def ok():
+        pass
+    
+    warmup = Warmup([("music:calm", ok)])
+    monkeypatch.setattr(main, "warmup", warmup)
+    client = TestClient(main.app)
+    
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["state"] == "pending"
+    assert client.get("/health").status_code == 200
+    
+    asyncio.run(warmup.run())
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+
+def test_warmup_keeps_nothing(tmp_path, monkeypatch):
+    """Warm-up generations neither fill the result cache nor write outputs."""
+    pytest.importorskip("httpx")
+    import main
+    from art_generator import TherapeuticArtGenerator
+    from caching import ResultCache
+    from music_generator import TherapeuticMusicGenerator
+    
+    cache = ResultCache(directory=str(tmp_path / "cache"))
+    output_dir = str(tmp_path / "output")
+    monkeypatch.setattr(main, "music_generator", TherapeuticMusicGenerator(
+        result_cache=cache, output_dir=output_dir
+    ))
+    monkeypatch.setattr(main, "art_generator", TherapeuticArtGenerator(
+        result_cache=cache, output_dir=output_dir
+    ))
+    warmup = Warmup(main.warmup_tasks(1))
+    asyncio.run(warmup.run())
+    
+    assert warmup.status()["errors"] == []
+    stats = cache.stats()
+    assert stats["memory"]["entries"] == 0 and stats["disk"]["bytes"] == 0
+    assert not os.path.exists(output_dir)
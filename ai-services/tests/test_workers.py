@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import os
+import time
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from art_generator import TherapeuticArtGenerator, _render_art_job
+from music_generator import TherapeuticMusicGenerator, _encode_music_job
+from workers import RenderPool, SharedArray, export_array
+
+@pytest.fixture(scope="module")
+def render_pool():
+    pool = RenderPool(2)
+    yield pool
+    pool.shutdown()
+
+def test_shared_array_round_trip():
+    """Exported arrays map back with their shape and dtype, then unlink."""
+    array = np.arange(12, dtype=np.int16).reshape(3, 4)
+    handle = export_array(array)
+    
+    with SharedArray(handle) as shared:
+        np.testing.assert_array_equal(shared, array)
+        assert shared.dtype == np.int16
+    with pytest.raises(FileNotFoundError):
+        SharedArray(handle).__enter__()
+
+def test_render_pool_matches_in_process_jobs(render_pool, tmp_path):
+    """Worker renders equal the same job run in process with the same seed."""
+    music = TherapeuticMusicGenerator(render_pool=render_pool)
+    art = TherapeuticArtGenerator(render_pool=render_pool, array_pipeline=True)
+    music_request = {"mood": "anxious", "duration": 2, "instruments": ["strings"], "seed": 5}
+    art_request = {"mood": "calm", "artStyle": "watercolor", "seed": 5}
+    
+    async def run():
+        return await asyncio.gather(
+            render_pool.run(
+                _encode_music_job, music._worker_config(), music_request, str(tmp_path / "worker.wav")
+            ),
+            render_pool.run(_render_art_job, art._worker_config(), art_request)
+        )
+    
+    music_info, (art_handle, art_info) = asyncio.run(run())
+    expected_info = _encode_music_job(
+        music._worker_config(), music_request, str(tmp_path / "process.wav")
+    )
+    assert (tmp_path / "worker.wav").read_bytes() == (tmp_path / "process.wav").read_bytes()
+    assert music_info["dynamic_range"] == expected_info["dynamic_range"]
+    assert music_info["encoding"]["encoded_bytes"] == expected_info["encoding"]["encoded_bytes"]
+    
+    # The array pipeline in the worker against the PIL pipeline in process
+    expected_handle, expected_info = _render_art_job({}, art_request)
+    with SharedArray(art_handle) as pixels, SharedArray(expected_handle) as expected:
+        np.testing.assert_array_equal(pixels, expected)
+    assert (art_info["name"], expected_info["name"]) == ("array", "pil")
+
+def test_render_pool_keeps_event_loop_responsive(render_pool):
+    """The event loop keeps ticking while a long render runs in a worker."""
+    generator = TherapeuticMusicGenerator(render_pool=render_pool)
+    
+    async def run():
+        ticks = 0
+        task = asyncio.ensure_future(generator.generate_music({"mood": "sad", "duration": 60}))
+        while not task.done():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            assert time.perf_counter() - start < 0.5
+            ticks += 1
+        return task.result(), ticks
+    
+    result, ticks = asyncio.run(run())
+    assert ticks > 5
+    assert result["metadata"]["audio_properties"]["sample_rate"] == 22050
+
+def test_render_pool_relays_progress(render_pool):
+    """Progress reported inside a worker reaches the caller's callback."""
+    generator = TherapeuticArtGenerator(render_pool=render_pool)
+    reports = []
+    
+    asyncio.run(generator.generate_art(
+        {"mood": "happy", "artStyle": "geometric", "fresh": True},
+        lambda stage, fraction: reports.append(stage)
+    ))
+    
+    assert reports == ["composition", "effects", "color", "encode"]
+
+def test_render_pool_runs_batches(render_pool):
+    """Batch renders in a worker return one track per request."""
+    generator = TherapeuticMusicGenerator(render_pool=render_pool)
+    requests = [{"mood": "calm", "duration": 1}, {"mood": "sad", "duration": 2}]
+    
+    results = asyncio.run(generator.generate_music_batch(requests))
+    
+    assert [result["metadata"]["duration"] for result in results] == [1, 2]
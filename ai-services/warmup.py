@@ -0,0 +1,79 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# A named warm-up step: (name, coroutine function running it)
+WarmupTask = Tuple[str, Callable[[], Awaitable[Any]]]
+
+class Warmup:
+    """Startup warm-up of the generators, tracked for the readiness probe
+    
+    Tasks are representative generations. They run concurrently, up to
+    ``concurrency`` at once, so every render worker is spawned and warmed
+    rather than one worker doing all the work. The instance is ready once
+    every task has finished. A failed task is logged and listed but does not
+    hold readiness back, since real requests would hit the same failure
+    either way. With no tasks, warm-up is disabled and the instance is
+    ready at once.
+    """
+    
+    def __init__(self, tasks: Sequence[WarmupTask], concurrency: int = 4):
+        self.tasks = list(tasks)
+        self.concurrency = max(1, concurrency)
+        self.state = "pending" if self.tasks else "disabled"
+        self.completed = 0
+        self.running: List[str] = []
+        self.errors: List[Dict[str, str]] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    @property
+    def ready(self) -> bool:
+        return self.state in ("completed", "disabled")
+    
+    async def run(self) -> None:
+        """Run every task once; safe to call again after it finished"""
+        if self.state != "pending":
+            return
+        self.state = "running"
+        self.started_at = time.monotonic()
+        slots = asyncio.Semaphore(self.concurrency)
+        
+        async def run_task(name, task):
+            async with slots:
+                self.running.append(name)
+                try:
+                    await task()
+                except Exception as e:
+                    logger.error(f"Warm-up task {name} failed: {str(e)}")
+                    self.errors.append({"task": name, "error": str(e)})
+                finally:
+                    self.running.remove(name)
+                    self.completed += 1
+        
+        await asyncio.gather(*(run_task(name, task) for name, task in self.tasks))
+        self.finished_at = time.monotonic()
+        self.state = "completed"
+        logger.info(
+            f"Warm-up completed: {self.completed} tasks in "
+            f"{self.finished_at - self.started_at:.1f}s, {len(self.errors)} failed"
+        )
+    
+    def status(self) -> Dict[str, Any]:
+        """JSON-ready readiness and warm-up progress"""
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.monotonic()) - self.started_at, 3)
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "completed": self.completed,
+            "total": len(self.tasks),
+            "progress": round(self.completed / len(self.tasks), 4) if self.tasks else 1.0,
+            "running": list(self.running),
+            "errors": list(self.errors),
+            "elapsed_seconds": elapsed
+        }
@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# (shared memory block name, shape, dtype) of an exported array
+ArrayHandle = Tuple[str, Tuple[int, ...], str]
+
+def export_array(array: np.ndarray) -> ArrayHandle:
+    """Copy an array into a new shared memory block and return its handle
+    
+    The block outlives this process's reference to it; the receiving side
+    unlinks it through SharedArray.
+    """
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        return shm.name, array.shape, array.dtype.str
+    finally:
+        shm.close()
+
+class SharedArray:
+    """Context manager mapping an exported array without copying it
+    
+    The block's name is unlinked on entry, so the memory is released once
+    the mapping is closed even if the caller fails. The array must not be
+    used after the ``with`` block.
+    """
+    
+    def __init__(self, handle: ArrayHandle):
+        self.name, self.shape, self.dtype = handle
+        self._shm: Optional[SharedMemory] = None
+    
+    def __enter__(self) -> np.ndarray:
+        self._shm = SharedMemory(name=self.name)
+        self._shm.unlink()
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf)
+    
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view escaped the block; the mapping goes when it is collected
+            logger.debug(f"Shared array {self.name} still referenced after use")
+        self._shm = None
+
+class RenderPool:
+    """Process pool for the CPU-bound generation stages
+    
+    Rendering NumPy/PIL work in worker processes keeps the event loop free
+    for other requests. Workers are started lazily with the spawn method,
+    which is safe from a threaded server process, and sized to the core
+    count unless ``max_workers`` is given. Large results travel back
+    through shared memory (see export_array and SharedArray); progress
+    reports travel through a manager queue.
+    """
+    
+    progress_interval = 0.05  # Seconds between progress queue polls
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=get_context("spawn")
+                )
+            return self._executor
+    
+    def _get_manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = get_context("spawn").Manager()
+            return self._manager
+    
+    async def run(self, func: Callable[..., Any], *args: Any,
+                  progress: Optional[Callable[[str, float], None]] = None) -> Any:
+        """Run a picklable top-level function in a worker and await its result
+        
+        With ``progress`` the function also receives a ``progress_queue``
+        keyword argument; (stage, fraction) pairs it puts there are passed
+        to ``progress`` on the event loop while the job runs.
+        """
+        loop = asyncio.get_running_loop()
+        if progress is None:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        
+        queue = self._get_manager().Queue()
+        future = loop.run_in_executor(
+            self._get_executor(), partial(func, *args, progress_queue=queue)
+        )
+        while True:
+            finished = future.done()
+            while True:
+                try:
+                    stage, fraction = queue.get_nowait()
+                except Empty:
+                    break
+                progress(stage, fraction)
+            if finished:
+                return future.result()
+            await asyncio.wait({future}, timeout=self.progress_interval)
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes; the pool restarts on next use"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+        if manager is not None:
+            manager.shutdown()
+
+# Generators constructed inside this worker process, by class and config
+_worker_generators: Dict[Tuple[Any, ...], Any] = {}
+
+def worker_generator(generator_class: type, config: Dict[str, Any]) -> Any:
+    """Generator instance owned by the current worker process
+    
+    Reusing one instance per configuration keeps its buffer pool and
+    caches warm across the jobs the worker runs.
+    """
+    key = (generator_class.__name__,) + tuple(sorted(config.items()))
+    generator = _worker_generators.get(key)
+    if generator is None:
+        generator = _worker_generators[key] = generator_class(**config)
+    return generator